@@ -0,0 +1,110 @@
+# ✅ BENCHMARK D'ENVOI EMAIL (puits SMTP local, aucun email réel)
+# Usage: python bench_email_sender.py --sizes 1000 10000 --latency-ms 5 --mode pooled serial
+import sys
+import time
+import uuid
+import logging
+import argparse
+
+from services.smtp_sink_server import start_smtp_sink
+from services.smtp_sender import SMTPSender, SMTPConnectionPool
+from services.rate_limiter import TokenBucketLimiter, rate_limiter
+from services.email_composer import EmailComposer
+from services.email_outbox import EmailOutbox
+
+def build_prospects(count, domains):
+    return [{
+        'id': f"bench_{i}",
+        'personal_info': {'full_name': f"Prénom{i} Nom{i}", 'company': f"Entreprise {i % domains}"},
+        'enrichment_data': {'email': f"contact{i}@domaine{i % domains}.example"}
+    } for i in range(count)]
+
+def build_composer(port, args, pool_size, workers):
+    """Composer réel pointé sur le puits (pool dédié, limiteur en mémoire ou partagé)"""
+    limiter = rate_limiter if args.shared_limiter else TokenBucketLimiter(None)
+    pool = SMTPConnectionPool('127.0.0.1', port, 'bench', 'bench', starttls=False, size=pool_size,
+                              max_messages_per_connection=args.max_messages_per_connection)
+    composer = EmailComposer()
+    composer.sender = SMTPSender(pool, 'bench@cold-outreach.example', max_workers=workers,
+                                 domain_rate=args.domain_rate, account_rate=args.account_rate,
+                                 domain_burst=max(1, int(args.domain_rate)), account_burst=max(1, int(args.account_rate)),
+                                 limiter=limiter)
+    composer.is_configured = True
+    return composer
+
+def run(mode, size, args):
+    sink, port = start_smtp_sink(latency_ms=args.latency_ms, temp_failure_rate=args.temp_failure_rate,
+                                 reject_rate=args.reject_rate, disconnect_rate=args.disconnect_rate, seed=args.seed)
+    # serial: une session, un worker (comportement historique sans le sleep(1))
+    pool_size, workers = (1, 1) if mode == 'serial' else (args.pool_size, args.pool_size)
+    composer = build_composer(port, args, pool_size, workers)
+    prospects = build_prospects(size, args.domains)
+
+    started = time.perf_counter()
+    if mode == 'outbox':
+        from database_fixed import db
+        if not db.conn:
+            sink.stop()
+            return None
+        campaign_id = f"bench_{uuid.uuid4().hex[:8]}"
+        outbox = EmailOutbox(db, composer.sender, batch_size=args.outbox_batch, base_backoff=0.5, max_backoff=2)
+        results = outbox.send_campaign(campaign_id, prospects, composer)
+        # Nouveaux essais planifiés (backoff): on attend qu'ils soient échus
+        while results['pending']:
+            time.sleep(0.5)
+            outbox.drain(campaign_id)
+            results = outbox.campaign_results(campaign_id)
+        with db.conn.cursor() as cur:
+            cur.execute("DELETE FROM email_outbox WHERE campaign_id = %s", (campaign_id,))
+    else:
+        results = composer.send_campaign(prospects)
+    elapsed = time.perf_counter() - started
+
+    pool_stats = composer.sender.pool.stats
+    sender_stats = composer.sender.get_stats()
+    composer.sender.pool.close_all()
+    sink.stop()
+    return {
+        'mode': mode,
+        'size': size,
+        'elapsed_s': round(elapsed, 2),
+        'msg_per_s': round(results['sent'] / elapsed, 1) if elapsed else 0,
+        'sent': results['sent'],
+        'failed': results['failed'],
+        'connections': pool_stats['connections_opened'],
+        'reuse_ratio': round(pool_stats['connections_reused'] / max(1, results['sent'] + results['failed']), 3),
+        'transport_retries': sender_stats['retries'],
+        'sink_temp_failures': sink.stats['temp_failures'],
+        'sink_disconnects': sink.stats['disconnects'],
+        'legacy_estimate_s': size  # Ancien send_campaign: sleep(1) après chaque email
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Débit d'envoi email contre un puits SMTP local")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--mode', nargs='+', default=['serial', 'pooled'], choices=['serial', 'pooled', 'outbox'])
+    parser.add_argument('--pool-size', type=int, default=8)
+    parser.add_argument('--domains', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=5)
+    parser.add_argument('--temp-failure-rate', type=float, default=0.0)
+    parser.add_argument('--reject-rate', type=float, default=0.0)
+    parser.add_argument('--disconnect-rate', type=float, default=0.0)
+    parser.add_argument('--domain-rate', type=float, default=0, help="Messages/s par domaine (0 = illimité)")
+    parser.add_argument('--account-rate', type=float, default=0, help="Messages/s par compte (0 = illimité)")
+    parser.add_argument('--max-messages-per-connection', type=int, default=100)
+    parser.add_argument('--outbox-batch', type=int, default=50)
+    parser.add_argument('--shared-limiter', action='store_true', help="Limiteur partagé PostgreSQL au lieu du seau en mémoire")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    columns = ['mode', 'size', 'elapsed_s', 'msg_per_s', 'sent', 'failed', 'connections', 'reuse_ratio',
+               'transport_retries', 'sink_temp_failures', 'sink_disconnects', 'legacy_estimate_s']
+    print(' | '.join(columns))
+    for size in args.sizes:
+        for mode in args.mode:
+            row = run(mode, size, args)
+            if row is None:
+                print(f"{mode} | {size} | ⚠️ PostgreSQL indisponible", file=sys.stderr)
+                continue
+            print(' | '.join(str(row[c]) for c in columns), flush=True)
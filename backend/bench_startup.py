@@ -0,0 +1,100 @@
+# ✅ BENCHMARK DE DÉMARRAGE (import de main.py, première réponse, préchauffage)
+# Usage: python bench_startup.py --runs 5 --mode lazy eager --top-imports 10
+# Chaque mesure tourne dans un interpréteur neuf (modules non chargés, comme un worker qui démarre).
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def measure(mode):
+    """Processus enfant: mesure et imprime une ligne JSON"""
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter() - started
+
+    if mode == 'eager':
+        # Comportement d'avant: tout est prêt (base, index, clients, SMTP) avant de servir la première requête
+        main.warmup.start()
+        for name in main.warmup.get_status()['tasks']:
+            main.warmup.wait(name)
+
+    response = main.app.test_client().get('/api/health')
+    first_response = time.perf_counter() - started
+
+    while not main.warmup.is_ready():
+        time.sleep(0.005)
+    ready = time.perf_counter() - started
+
+    status = main.warmup.get_status()
+    main.shutdown_workers()
+    print(json.dumps({
+        'mode': mode,
+        'import_s': round(imported, 3),
+        'first_response_s': round(first_response, 3),
+        'first_status': response.status_code,
+        'ready_s': round(ready, 3),
+        'tasks': {name: task['seconds'] for name, task in status['tasks'].items()}
+    }))
+
+def run_child(mode):
+    output = subprocess.run([sys.executable, __file__, '--child', mode], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, env={**os.environ, 'PYTHONPATH': BACKEND_DIR})
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(f"Mesure {mode} en échec:\n{output.stderr[-2000:]}")
+
+def top_imports(count):
+    """Modules importés directement par main.py, triés par temps cumulé (python -X importtime)"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, env={**os.environ, 'PYTHONPATH': BACKEND_DIR})
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith(' ' * 5) or not name.startswith(' ' * 3):
+            continue  # Niveau 1 uniquement (imports directs de main)
+        rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Temps de démarrage d'un worker (import, première réponse, prêt)")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--mode', nargs='+', default=['lazy', 'eager'], choices=['lazy', 'eager'])
+    parser.add_argument('--top-imports', type=int, default=0, help="Affiche les N imports directs les plus lents")
+    parser.add_argument('--child', choices=['lazy', 'eager'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child)
+        sys.exit(0)
+
+    columns = ['mode', 'run', 'import_s', 'first_response_s', 'ready_s', 'tasks']
+    print(' | '.join(columns))
+    results = {mode: [] for mode in args.mode}
+    for run in range(1, args.runs + 1):
+        for mode in args.mode:
+            row = {**run_child(mode), 'run': run}
+            results[mode].append(row)
+            row['tasks'] = ' '.join(f"{name}={seconds}" for name, seconds in row['tasks'].items())
+            print(' | '.join(str(row[c]) for c in columns), flush=True)
+
+    print("\nmode | median_import_s | median_first_response_s | median_ready_s")
+    for mode, rows in results.items():
+        print(f"{mode} | {statistics.median(r['import_s'] for r in rows):.3f} | "
+              f"{statistics.median(r['first_response_s'] for r in rows):.3f} | "
+              f"{statistics.median(r['ready_s'] for r in rows):.3f}")
+
+    if args.top_imports:
+        print("\nimport direct | cumulé_s")
+        for seconds, name in top_imports(args.top_imports):
+            print(f"{name} | {seconds:.3f}")
@@ -1,39 +1,224 @@
+import os
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
 import json
 from datetime import datetime
 import logging
+import threading
+from contextlib import contextmanager
+from services.prospect_dedup import canonical_identity_keys
+from services.icp_matcher import icp_matchers
+from services.metrics import metrics, timed_methods
 
 logger = logging.getLogger(__name__)
 
+def safe_json_loads(data, default=None):
+    """Parsing JSON robuste: JSONB déjà désérialisé, texte JSON ou NULL"""
+    if default is None:
+        default = {}
+    if data is None:
+        return default
+    if isinstance(data, (dict, list)):
+        return data  # Déjà désérialisé
+    if isinstance(data, str):
+        try:
+            return json.loads(data)
+        except:
+            return default
+    return default
+
+# Statuts de prospect connus
+PROSPECT_STATUSES = ('new', 'approved', 'rejected', 'contacted')
+
+# Transitions de statut autorisées: nouveau statut → statuts précédents acceptés (garde optimiste)
+PROSPECT_TRANSITIONS = {
+    'approved': ('new', 'rejected'),
+    'rejected': ('new', 'approved'),
+    'contacted': ('new', 'approved'),
+}
+
 class DatabaseManager:
+    # Événements temps réel du dashboard (LISTEN/NOTIFY, voir services/event_bus.py)
+    EVENTS_CHANNEL = 'dashboard_events'
+    EVENT_PAYLOAD_LIMIT = 7500      # pg_notify refuse les charges de plus de 8000 octets
+    EVENT_PROSPECTS_LIMIT = 20      # Résumés de prospects joints à un événement 'prospects'
+    # Tables dont chaque écriture incrémente un compteur (data_versions, lectures conditionnelles)
+    VERSIONED_TABLES = ('prospects', 'activity_logs', 'icp_configs')
+
     def __init__(self):
-        self.conn = None
-        self.connect_simple()
-        if self.conn:
-            self.create_tables()
+        self._conn = None
+        self._connect_attempted = False
+        self._connection_ready = False
+        self._schema_ready = False
+        self._connect_lock = threading.RLock()   # Réentrant: create_tables relit self.conn dans le même thread
+        # Transactions: petit pool de connexions (une par transaction en cours, jamais partagée entre threads)
+        self.tx_pool_size = max(1, int(os.getenv('DB_TX_POOL_SIZE', 4)))
+        self._tx_pool = None
+        self._tx_slots = threading.BoundedSemaphore(self.tx_pool_size)   # Pool plein: attente au lieu de PoolError
+        self._tx_lock = threading.Lock()
+        self.local_events = None    # Sans base: callable(type, data) diffusant les événements dans le processus
+
+    @property
+    def conn(self):
+        """
+        Connexion ouverte au premier accès (aucune connexion à l'import du module).
+        Une seule tentative par processus: en cas d'échec, mode sans base de données comme avant
+        """
+        if not self._connection_ready:
+            with self._connect_lock:
+                if not self._connect_attempted:
+                    self._connect_attempted = True
+                    if self.connect_simple() and not self._schema_ready:
+                        self.create_tables()
+                        self._schema_ready = True
+                    self._connection_ready = True
+        return self._conn
+
+    @property
+    def connected(self):
+        """Connexion déjà ouverte, sans jamais en ouvrir une (sondes de santé, statistiques)"""
+        conn = self._conn
+        return conn is not None and not conn.closed
+
+    def _connection_params(self):
+        # ⭐ CONNEXION DIRECTE SANS VARIABLES D'ENVIRONNEMENT ⭐
+        return dict(
+            host="localhost",
+            database="cold_outreach", 
+            user="postgres",
+            password="system",  # Votre mot de passe
+            port="5432",
+            # Base injoignable: échec rapide (mode sans base) au lieu du délai TCP complet
+            connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT', 5))
+        )
+
+    def _open_connection(self):
+        return psycopg2.connect(**self._connection_params())
 
     def connect_simple(self):
         """Connexion PostgreSQL ULTRA SIMPLIFIÉE"""
         try:
-            # ⭐ CONNEXION DIRECTE SANS VARIABLES D'ENVIRONNEMENT ⭐
-            self.conn = psycopg2.connect(
-                host="localhost",
-                database="cold_outreach", 
-                user="postgres",
-                password="system",  # Votre mot de passe
-                port="5432"
-            )
-            self.conn.autocommit = True
+            self._conn = self._open_connection()
+            self._conn.autocommit = True
             logger.info("✅ Connecté à PostgreSQL avec succès!")
             return True
             
         except Exception as e:
             logger.error(f"❌ Erreur connexion PostgreSQL: {str(e)}")
             logger.info("🔧 Mode sans base de données activé")
-            self.conn = None
+            self._conn = None
             return False
 
+    def close(self):
+        """Ferme les connexions (processus maître avant le fork des workers)"""
+        try:
+            if self._conn is not None and not self._conn.closed:
+                self._conn.close()
+        except Exception:
+            pass
+        with self._tx_lock:
+            pool, self._tx_pool = self._tx_pool, None
+        if pool is not None:
+            try:
+                pool.closeall()
+            except Exception:
+                pass
+
+    def reconnect(self):
+        """Connexions propres au processus (après fork: jamais de socket partagée), rouvertes au prochain accès"""
+        with self._tx_lock:
+            self._tx_pool = None    # Connexions du processus parent abandonnées sans les fermer (socket partagée)
+        with self._connect_lock:
+            self._conn = None
+            self._connect_attempted = False
+            self._connection_ready = False
+
+    def _transaction_pool(self):
+        with self._tx_lock:
+            if self._tx_pool is None:
+                self._tx_pool = ThreadedConnectionPool(0, self.tx_pool_size, **self._connection_params())
+            return self._tx_pool
+
+    @contextmanager
+    def transaction(self):
+        """
+        Curseur en transaction explicite sur une connexion du pool: commit si tout réussit, rollback sinon
+        (la connexion principale reste en autocommit). Les transactions de threads différents sont
+        concurrentes: une transaction qui attend un verrou consultatif ne bloque pas les autres écritures.
+        """
+        with self._tx_slots:
+            pool = self._transaction_pool()
+            conn = pool.getconn()
+            try:
+                with conn:
+                    with conn.cursor() as cur:
+                        yield cur
+            finally:
+                if pool.closed:
+                    conn.close()    # Pool fermé pendant la transaction (arrêt du worker)
+                else:
+                    # Connexion rompue (redémarrage du serveur...): fermée, le pool en rouvrira une
+                    pool.putconn(conn, close=bool(conn.closed))
+
+    @staticmethod
+    def _prospect_event_summary(prospect):
+        """Champs affichés par le dashboard (le prospect complet est relu via /api/prospects)"""
+        personal = prospect.get('personal_info') or {}
+        enrichment = prospect.get('enrichment_data') or {}
+        email = enrichment.get('email')
+        return {
+            'id': prospect['id'],
+            'name': personal.get('full_name'),
+            'title': personal.get('position'),
+            'company': personal.get('company'),
+            'location': personal.get('location'),
+            'email': email,
+            'enrichment_score': enrichment.get('enrichment_score', 1 if email else 0),
+            'status': prospect.get('status', 'new'),
+            'detected_at': prospect.get('timestamp')
+        }
+
+    def _notify(self, cur, event_type, data):
+        """
+        NOTIFY sur le curseur de l'écriture: dans une transaction, l'événement part au commit
+        (jamais pour une écriture annulée)
+        """
+        data = dict(data)
+        payload = json.dumps({'type': event_type, 'data': data}, default=str)
+        while len(payload.encode()) > self.EVENT_PAYLOAD_LIMIT and data.get('prospects'):
+            data['prospects'] = data['prospects'][:len(data['prospects']) // 2]
+            payload = json.dumps({'type': event_type, 'data': data}, default=str)
+        cur.execute("SELECT pg_notify(%s, %s)", (self.EVENTS_CHANNEL, payload))
+
+    def _notify_prospects(self, cur, prospects):
+        self._notify(cur, 'prospects', {
+            'count': len(prospects),
+            'prospects': [self._prospect_event_summary(p) for p in prospects[:self.EVENT_PROSPECTS_LIMIT]]
+        })
+
+    def publish_local(self, event_type, data):
+        """
+        Mode sans base: l'événement que porterait NOTIFY est diffusé aux abonnés de ce processus
+        ('prospects': liste de prospects complets, résumés comme pour NOTIFY)
+        """
+        if self.local_events is None: return
+        if event_type == 'prospects':
+            data = {'count': len(data),
+                    'prospects': [self._prospect_event_summary(p) for p in data[:self.EVENT_PROSPECTS_LIMIT]]}
+        try:
+            self.local_events(event_type, data)
+        except Exception as e:
+            logger.error(f"❌ Erreur diffusion locale {event_type}: {e}")
+
+    def notify_event(self, event_type, data):
+        if not self.conn: return
+        try:
+            with self.conn.cursor() as cur:
+                self._notify(cur, event_type, data)
+        except Exception as e:
+            logger.error(f"❌ Erreur notification événement {event_type}: {e}")
+
     def test_connection(self):
         """Test de connexion simple"""
         return self.conn is not None and not self.conn.closed
@@ -109,6 +294,174 @@ class DatabaseManager:
                     )
                 """)
 
+                cur.execute("ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS status TEXT")
+                cur.execute("ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP")
+                cur.execute("ALTER TABLE icp_configs ADD COLUMN IF NOT EXISTS interval_minutes INTEGER")
+                cur.execute("ALTER TABLE icp_configs ADD COLUMN IF NOT EXISTS exclusions JSONB DEFAULT '[]'")
+                cur.execute("ALTER TABLE icp_configs ADD COLUMN IF NOT EXISTS synonyms JSONB DEFAULT '{}'")
+                # Version d'un ICP: clé du cache des matchers compilés (valable dans tous les workers)
+                cur.execute("ALTER TABLE icp_configs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now()")
+
+                # Clés d'identité canoniques (déduplication inter-scans)
+                cur.execute("ALTER TABLE prospects ADD COLUMN IF NOT EXISTS identity_url_key TEXT")
+                cur.execute("ALTER TABLE prospects ADD COLUMN IF NOT EXISTS identity_name_key TEXT")
+                cur.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_prospects_identity_url
+                    ON prospects (identity_url_key) WHERE identity_url_key IS NOT NULL
+                """)
+                cur.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_prospects_identity_name
+                    ON prospects (identity_name_key) WHERE identity_name_key IS NOT NULL
+                """)
+
+                # Table de l'état de la surveillance planifiée (reprise après redémarrage)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS monitoring_schedule (
+                        icp_id TEXT PRIMARY KEY,
+                        interval_minutes INTEGER,
+                        last_run_at TIMESTAMP,
+                        next_run_at TIMESTAMP,
+                        last_status TEXT,
+                        last_prospects INTEGER,
+                        updated_at TIMESTAMP
+                    )
+                """)
+
+                # Watermarks des scans incrémentaux (par ICP et par source)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS scan_watermarks (
+                        icp_id TEXT,
+                        source TEXT,
+                        watermark_at TIMESTAMP,
+                        cursor TEXT,
+                        updated_at TIMESTAMP,
+                        PRIMARY KEY (icp_id, source)
+                    )
+                """)
+
+                # Registre durable des moniteurs ICP avec baux (répartition multi-workers)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS monitor_leases (
+                        monitor_id TEXT PRIMARY KEY,
+                        icp_id TEXT,
+                        status TEXT,
+                        owner_id TEXT,
+                        lease_expires_at TIMESTAMP,
+                        updated_at TIMESTAMP
+                    )
+                """)
+                # Le bail ne référence que l'ICP: la configuration courante est relue à chaque tick
+                cur.execute("ALTER TABLE monitor_leases DROP COLUMN IF EXISTS icp_config")
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS monitor_workers (
+                        worker_id TEXT PRIMARY KEY,
+                        started_at TIMESTAMP,
+                        heartbeat_at TIMESTAMP
+                    )
+                """)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS email_outbox (
+                        id BIGSERIAL PRIMARY KEY,
+                        idempotency_key TEXT NOT NULL UNIQUE,
+                        campaign_id TEXT,
+                        prospect_id TEXT,
+                        recipient TEXT NOT NULL,
+                        subject TEXT,
+                        body TEXT,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        max_attempts INTEGER NOT NULL DEFAULT 5,
+                        next_attempt_at TIMESTAMP NOT NULL DEFAULT now(),
+                        locked_by TEXT,
+                        locked_until TIMESTAMP,
+                        last_error TEXT,
+                        created_at TIMESTAMP DEFAULT now(),
+                        sent_at TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT now()
+                    )
+                """)
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at)")
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_campaign ON email_outbox (campaign_id, status)")
+                # État applicatif partagé entre workers (remplace les variables de module)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS app_state (
+                        key TEXT PRIMARY KEY,
+                        value JSONB,
+                        version BIGINT NOT NULL DEFAULT 1,
+                        updated_at TIMESTAMP DEFAULT now()
+                    )
+                """)
+
+                # Recherches asynchrones: état des jobs + résultats par lot (lecture incrémentale)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS search_jobs (
+                        id TEXT PRIMARY KEY,
+                        status TEXT NOT NULL DEFAULT 'queued',
+                        stage TEXT,
+                        params JSONB,
+                        stats JSONB,
+                        result_count INTEGER NOT NULL DEFAULT 0,
+                        error TEXT,
+                        worker_id TEXT,
+                        created_at TIMESTAMP DEFAULT now(),
+                        updated_at TIMESTAMP DEFAULT now(),
+                        completed_at TIMESTAMP
+                    )
+                """)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS search_job_results (
+                        job_id TEXT NOT NULL,
+                        seq INTEGER NOT NULL,
+                        prospects JSONB,
+                        PRIMARY KEY (job_id, seq)
+                    )
+                """)
+
+                # Compte expéditeur (plafonds journaliers des fenêtres d'envoi)
+                cur.execute("ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS account TEXT")
+                # Fuseau du destinataire retenu à la planification (reprise du lissage par compte et fuseau)
+                cur.execute("ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS send_timezone TEXT")
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                        bucket_key TEXT PRIMARY KEY,
+                        tokens DOUBLE PRECISION NOT NULL,
+                        rate DOUBLE PRECISION NOT NULL,
+                        capacity DOUBLE PRECISION NOT NULL,
+                        last_granted BOOLEAN DEFAULT TRUE,
+                        updated_at TIMESTAMP DEFAULT now()
+                    )
+                """)
+
+                # Compteurs de modification par table (ETag / Last-Modified des lectures HTTP).
+                # Triggers par instruction: toute écriture compte, quel que soit le chemin de code.
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS data_versions (
+                        scope TEXT PRIMARY KEY,
+                        version BIGINT NOT NULL DEFAULT 0,
+                        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                """)
+                cur.execute("""
+                    CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+                    BEGIN
+                        INSERT INTO data_versions (scope, version, updated_at) VALUES (TG_TABLE_NAME, 1, now())
+                        ON CONFLICT (scope) DO UPDATE
+                        SET version = data_versions.version + 1, updated_at = now();
+                        RETURN NULL;
+                    END;
+                    $$ LANGUAGE plpgsql
+                """)
+                for table in self.VERSIONED_TABLES:
+                    cur.execute("""
+                        SELECT 1 FROM pg_trigger WHERE tgname = %s AND tgrelid = %s::regclass
+                    """, (f"{table}_data_version", table))
+                    if not cur.fetchone():
+                        cur.execute(f"""
+                            CREATE TRIGGER {table}_data_version
+                            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                            FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()
+                        """)
+
                 logger.info("✅ Tables PostgreSQL créées")
                 
         except Exception as e:
@@ -117,12 +470,20 @@ class DatabaseManager:
     # ⭐ MÉTHODES ESSENTIELES ⭐
     
     def save_icp_config(self, icp_config):
+        # Ce processus oublie le matcher tout de suite; les autres workers voient un nouvel updated_at
+        icp_matchers.invalidate(icp_config['id'])
         if not self.conn: return
         try:
             with self.conn.cursor() as cur:
                 cur.execute("""
-                    INSERT INTO icp_configs (id, name, keywords, locations, industries, company_context, limit_count, created_at, status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    INSERT INTO icp_configs (id, name, keywords, locations, industries, company_context, limit_count, created_at, status, interval_minutes, exclusions, synonyms)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = EXCLUDED.name, keywords = EXCLUDED.keywords, locations = EXCLUDED.locations,
+                        industries = EXCLUDED.industries, company_context = EXCLUDED.company_context,
+                        limit_count = EXCLUDED.limit_count, status = EXCLUDED.status,
+                        interval_minutes = EXCLUDED.interval_minutes, exclusions = EXCLUDED.exclusions,
+                        synonyms = EXCLUDED.synonyms, updated_at = clock_timestamp()
                 """, (
                     icp_config['id'], icp_config['name'],
                     json.dumps(icp_config.get('keywords', [])),
@@ -131,31 +492,168 @@ class DatabaseManager:
                     json.dumps(icp_config.get('company_context', {})),
                     icp_config.get('limit', 10),
                     icp_config.get('created_at'),
-                    icp_config.get('status', 'active')
+                    icp_config.get('status', 'active'),
+                    icp_config.get('interval_minutes'),
+                    json.dumps(icp_config.get('exclusions', [])),
+                    json.dumps(icp_config.get('synonyms', {}))
                 ))
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde ICP: {e}")
 
+    # ON CONFLICT: un prospect déjà connu (id ou identité) n'est pas réinséré
+    PROSPECT_INSERT_SQL = """
+        INSERT INTO prospects (id, personal_info, linkedin_info, enrichment_data, status, source, timestamp, icp_id,
+                               identity_url_key, identity_name_key)
+        VALUES %s
+        ON CONFLICT DO NOTHING
+        RETURNING id
+    """
+
+    def _prospect_row(self, prospect):
+        identity_keys = prospect.get('identity_keys') or canonical_identity_keys(prospect)
+        return (
+            prospect['id'],
+            json.dumps(prospect.get('personal_info', {})),
+            json.dumps(prospect.get('linkedin_info', {})),
+            json.dumps(prospect.get('enrichment_data', {})),
+            prospect.get('status', 'new'),
+            prospect.get('source', ''),
+            prospect.get('timestamp'),
+            prospect.get('icp_id'),
+            identity_keys.get('url'),
+            identity_keys.get('name')
+        )
+
     def save_prospect(self, prospect):
         if not self.conn: return
         try:
             with self.conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO prospects (id, personal_info, linkedin_info, enrichment_data, status, source, timestamp, icp_id)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    prospect['id'],
-                    json.dumps(prospect.get('personal_info', {})),
-                    json.dumps(prospect.get('linkedin_info', {})),
-                    json.dumps(prospect.get('enrichment_data', {})),
-                    prospect.get('status', 'new'),
-                    prospect.get('source', ''),
-                    prospect.get('timestamp'),
-                    prospect.get('icp_id')
-                ))
+                execute_values(cur, self.PROSPECT_INSERT_SQL, [self._prospect_row(prospect)])
+                if cur.rowcount:
+                    self._notify_prospects(cur, [prospect])
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde prospect: {e}")
 
+    def save_scan_batch(self, prospects, icp_id, source, watermark_at, cursor=None):
+        """
+        Persiste un lot de prospects ET avance le watermark dans la même transaction.
+        icp_id peut être une liste (scan fan-out: un watermark par ICP servi)
+        """
+        if not self.conn: return False
+        icp_ids = list(icp_id) if isinstance(icp_id, (list, tuple)) else [icp_id] if icp_id else []
+        try:
+            with self.transaction() as cur:
+                if prospects:
+                    inserted = {row[0] for row in execute_values(
+                        cur, self.PROSPECT_INSERT_SQL, [self._prospect_row(p) for p in prospects], fetch=True)}
+                    # Lignes écartées par ON CONFLICT (déjà connues): aucun événement
+                    if inserted:
+                        self._notify_prospects(cur, [p for p in prospects if p['id'] in inserted])
+                if watermark_at and icp_ids:
+                    # GREATEST: le watermark ne recule jamais
+                    execute_values(cur, """
+                        INSERT INTO scan_watermarks (icp_id, source, watermark_at, cursor, updated_at)
+                        VALUES %s
+                        ON CONFLICT (icp_id, source) DO UPDATE SET
+                            watermark_at = GREATEST(scan_watermarks.watermark_at, EXCLUDED.watermark_at),
+                            cursor = COALESCE(EXCLUDED.cursor, scan_watermarks.cursor),
+                            updated_at = now()
+                    """, [(i, source, watermark_at, cursor) for i in icp_ids], template="(%s, %s, %s, %s, now())")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Erreur sauvegarde lot de scan: {e}")
+            return False
+
+    def get_scan_watermark(self, icp_id, source):
+        if not self.conn: return None
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT watermark_at, cursor FROM scan_watermarks WHERE icp_id = %s AND source = %s",
+                            (icp_id, source))
+                row = cur.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"❌ Erreur récupération watermark: {e}")
+            return None
+
+    def backfill_identity_keys(self):
+        """
+        Calcule les clés d'identité des prospects enregistrés avant la déduplication.
+        Un seul worker à la fois (verrou consultatif de transaction, les autres n'attendent pas);
+        une mise à jour ensembliste par lot. Doublon historique: la clé reste vide, la ligne la plus
+        ancienne fait foi. Retourne les clés écrites [(url, nom)]
+        """
+        if not self.conn: return []
+        try:
+            with self.transaction() as cur:
+                cur.execute("SELECT pg_try_advisory_xact_lock(hashtext('identity_backfill'))")
+                if not cur.fetchone()[0]:
+                    return []
+                cur.execute("""
+                    SELECT id, personal_info, linkedin_info FROM prospects
+                    WHERE identity_url_key IS NULL AND identity_name_key IS NULL
+                    ORDER BY timestamp NULLS LAST, id
+                """)
+                rows, seen = [], set()
+                for prospect_id, personal_info, linkedin_info in cur.fetchall():
+                    keys = canonical_identity_keys({
+                        'personal_info': safe_json_loads(personal_info),
+                        'linkedin_info': safe_json_loads(linkedin_info)
+                    })
+                    url_key = keys['url'] if ('url', keys['url']) not in seen else None
+                    name_key = keys['name'] if ('name', keys['name']) not in seen else None
+                    if url_key or name_key:
+                        seen.update({('url', url_key), ('name', name_key)})
+                        rows.append((prospect_id, url_key, name_key))
+                if not rows:
+                    return []
+                # Clé déjà portée par une autre ligne (index unique): laissée vide
+                written = execute_values(cur, """
+                    UPDATE prospects p SET
+                        identity_url_key = CASE WHEN EXISTS (SELECT 1 FROM prospects o WHERE o.identity_url_key = v.url_key)
+                                                THEN NULL ELSE v.url_key END,
+                        identity_name_key = CASE WHEN EXISTS (SELECT 1 FROM prospects o WHERE o.identity_name_key = v.name_key)
+                                                 THEN NULL ELSE v.name_key END
+                    FROM (VALUES %s) AS v(id, url_key, name_key)
+                    WHERE p.id = v.id
+                    RETURNING p.identity_url_key, p.identity_name_key
+                """, rows, page_size=1000, fetch=True)
+                keys = [tuple(row) for row in written if row[0] or row[1]]
+            logger.info(f"🔑 Clés d'identité calculées pour {len(keys)} prospects antérieurs")
+            return keys
+        except Exception as e:
+            logger.error(f"❌ Erreur calcul clés d'identité: {e}")
+            return []
+
+    def get_identity_keys(self):
+        if not self.conn: return []
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT identity_url_key, identity_name_key FROM prospects
+                    WHERE identity_url_key IS NOT NULL OR identity_name_key IS NOT NULL
+                """)
+                return cur.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Erreur récupération clés d'identité: {e}")
+            return []
+
+    def find_existing_identity_keys(self, url_keys, name_keys):
+        """Retourne les clés (type, valeur) déjà présentes en base"""
+        if not self.conn: return set()
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT identity_url_key, identity_name_key FROM prospects
+                WHERE identity_url_key = ANY(%s) OR identity_name_key = ANY(%s)
+            """, (list(url_keys), list(name_keys)))
+            existing = set()
+            for url_key, name_key in cur.fetchall():
+                if url_key in url_keys:
+                    existing.add(('url', url_key))
+                if name_key in name_keys:
+                    existing.add(('name', name_key))
+            return existing
+
     def get_all_prospects(self, status_filter='all'):
         if not self.conn: return []
         try:
@@ -171,19 +669,6 @@ class DatabaseManager:
                     prospect = dict(row)
                     
                     # ⭐ CORRECTION : Gestion robuste du parsing JSON ⭐
-                    def safe_json_loads(data):
-                        if data is None:
-                            return {}
-                        if isinstance(data, (dict, list)):
-                            return data  # Déjà désérialisé
-                        if isinstance(data, str):
-                            try:
-                                return json.loads(data)
-                            except:
-                                return {}
-                        return {}
-                    
-                    # Application de la correction
                     prospect['personal_info'] = safe_json_loads(prospect.get('personal_info'))
                     prospect['linkedin_info'] = safe_json_loads(prospect.get('linkedin_info'))
                     prospect['enrichment_data'] = safe_json_loads(prospect.get('enrichment_data'))
@@ -194,14 +679,64 @@ class DatabaseManager:
             logger.error(f"❌ Erreur récupération prospects: {e}")
             return []
 
+    def get_prospects_by_ids(self, prospect_ids):
+        """Prospects demandés en une requête (ordre de la base)"""
+        if not self.conn or not prospect_ids: return []
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT * FROM prospects WHERE id = ANY(%s)", (list(prospect_ids),))
+                prospects = []
+                for row in cur.fetchall():
+                    prospect = dict(row)
+                    prospect['personal_info'] = safe_json_loads(prospect.get('personal_info'))
+                    prospect['linkedin_info'] = safe_json_loads(prospect.get('linkedin_info'))
+                    prospect['enrichment_data'] = safe_json_loads(prospect.get('enrichment_data'))
+                    prospects.append(prospect)
+                return prospects
+        except Exception as e:
+            logger.error(f"❌ Erreur récupération prospects par id: {e}")
+            return []
+
+    def transition_prospects(self, prospect_ids, status, expected_statuses=None, stamp=None):
+        """
+        Changement de statut en une requête pour tout le lot.
+        Garde optimiste: seuls les prospects encore dans un des statuts attendus sont modifiés
+        (par défaut PROSPECT_TRANSITIONS); la date de transition (<statut>_at) est fusionnée dans enrichment_data.
+        Retourne les ids effectivement modifiés; une erreur de base est propagée
+        (jamais confondue avec un conflit de statut).
+        """
+        if not self.conn or not prospect_ids: return []
+        expected = list(expected_statuses or PROSPECT_TRANSITIONS.get(status, ()))
+        stamp = stamp or {f"{status}_at": datetime.now().isoformat()}
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE prospects
+                    SET status = %s, enrichment_data = COALESCE(enrichment_data, '{}'::jsonb) || %s::jsonb
+                    WHERE id = ANY(%s) AND (cardinality(%s::text[]) = 0 OR COALESCE(status, 'new') = ANY(%s::text[]))
+                    RETURNING id
+                """, (status, json.dumps(stamp), list(prospect_ids), expected, expected))
+                updated = [row[0] for row in cur.fetchall()]
+                if updated:
+                    self._notify(cur, 'prospect_status', {'status': status, 'ids': updated[:self.EVENT_PROSPECTS_LIMIT],
+                                                          'count': len(updated)})
+                return updated
+        except Exception as e:
+            logger.error(f"❌ Erreur transition prospects ({status}): {e}")
+            raise
+
     def log_activity(self, agent, level, message):
-        if not self.conn: return
+        timestamp = datetime.now().isoformat()
+        if not self.conn:
+            return self.publish_local('log', {'timestamp': timestamp, 'level': level, 'message': message[:2000],
+                                              'agent': agent})
         try:
             with self.conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO activity_logs (timestamp, level, message, agent)
                     VALUES (%s, %s, %s, %s)
-                """, (datetime.now().isoformat(), level, message, agent))
+                """, (timestamp, level, message, agent))
+                self._notify(cur, 'log', {'timestamp': timestamp, 'level': level, 'message': message[:2000], 'agent': agent})
         except Exception as e:
             logger.error(f"❌ Erreur log activité: {e}")
 
@@ -216,10 +751,16 @@ class DatabaseManager:
                 icps = []
                 for row in rows:
                     icp = dict(row)
-                    icp['keywords'] = json.loads(icp['keywords']) if icp['keywords'] else []
-                    icp['locations'] = json.loads(icp['locations']) if icp['locations'] else []
-                    icp['industries'] = json.loads(icp['industries']) if icp['industries'] else []
-                    icp['company_context'] = json.loads(icp['company_context']) if icp['company_context'] else {}
+                    icp['keywords'] = safe_json_loads(icp['keywords'], [])
+                    icp['locations'] = safe_json_loads(icp['locations'], [])
+                    icp['industries'] = safe_json_loads(icp['industries'], [])
+                    icp['company_context'] = safe_json_loads(icp['company_context'])
+                    icp['exclusions'] = safe_json_loads(icp.get('exclusions'), [])
+                    icp['synonyms'] = safe_json_loads(icp.get('synonyms'), {})
+                    icp['limit'] = icp.get('limit_count') or 10
+                    for field in ('created_at', 'updated_at'):
+                        if isinstance(icp.get(field), datetime):
+                            icp[field] = icp[field].isoformat()
                     icps.append(icp)
                 return icps
         except Exception as e:
@@ -305,8 +846,8 @@ class DatabaseManager:
                 row = cur.fetchone()
                 if row:
                     approval = dict(row)
-                    approval['prospects'] = json.loads(approval['prospects']) if approval['prospects'] else []
-                    approval['previews'] = json.loads(approval['previews']) if approval['previews'] else []
+                    approval['prospects'] = safe_json_loads(approval['prospects'], [])
+                    approval['previews'] = safe_json_loads(approval['previews'], [])
                     return approval
                 return None
         except Exception as e:
@@ -321,23 +862,524 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"❌ Erreur suppression approbation: {e}")
 
+    def update_pending_approval_status(self, approval_id, status, expected_status='pending'):
+        """Transition d'une approbation; False si elle n'était plus dans l'état attendu (double clic, autre relecteur)"""
+        if not self.conn: return True
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE pending_approvals SET status = %s
+                    WHERE approval_id = %s AND COALESCE(status, 'pending') = %s
+                """, (status, approval_id, expected_status))
+                return cur.rowcount == 1
+        except Exception as e:
+            logger.error(f"❌ Erreur mise à jour approbation: {e}")
+            return False
+
     def save_campaign(self, campaign_record):
         if not self.conn: return
         try:
             with self.conn.cursor() as cur:
                 cur.execute("""
-                    INSERT INTO campaigns (id, approval_id, template_type, prospects_count, results, sent_at)
-                    VALUES (%s, %s, %s, %s, %s, %s)
+                    INSERT INTO campaigns (id, approval_id, template_type, prospects_count, results, sent_at, status)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
                 """, (
                     campaign_record['id'],
                     campaign_record.get('approval_id'),
                     campaign_record.get('template_type'),
                     campaign_record.get('prospects_count'),
                     json.dumps(campaign_record.get('results', {})),
-                    datetime.now().isoformat()
+                    datetime.now().isoformat(),
+                    campaign_record.get('status', 'completed')
                 ))
         except Exception as e:
             logger.error(f"❌ Erreur sauvegarde campagne: {e}")
 
+    def update_campaign(self, campaign_id, status, results=None):
+        if not self.conn: return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE campaigns
+                    SET status = %s, results = COALESCE(%s::jsonb, results),
+                        completed_at = CASE WHEN %s IN ('completed', 'failed') THEN now() ELSE completed_at END
+                    WHERE id = %s
+                """, (status, json.dumps(results) if results is not None else None, status, campaign_id))
+        except Exception as e:
+            logger.error(f"❌ Erreur mise à jour campagne: {e}")
+
+    def get_campaign(self, campaign_id):
+        if not self.conn: return None
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT * FROM campaigns WHERE id = %s", (campaign_id,))
+                row = cur.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"❌ Erreur récupération campagne: {e}")
+            return None
+
+    def get_campaigns_by_status(self, status):
+        if not self.conn: return []
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT * FROM campaigns WHERE status = %s", (status,))
+                return [dict(row) for row in cur.fetchall()]
+        except Exception as e:
+            logger.error(f"❌ Erreur récupération campagnes: {e}")
+            return []
+
+    def mark_campaign_contacted(self, campaign_id):
+        """Prospects dont l'email est parti passent à 'contacted' (une requête pour tout le lot envoyé depuis la dernière fois)"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE prospects p
+                SET status = 'contacted',
+                    enrichment_data = COALESCE(p.enrichment_data, '{}'::jsonb)
+                        || jsonb_build_object('contacted_at', o.sent_at, 'campaign_id', o.campaign_id)
+                FROM email_outbox o
+                WHERE o.campaign_id = %s AND o.status = 'sent'
+                  AND p.id = o.prospect_id AND p.status IS DISTINCT FROM 'contacted'
+            """, (campaign_id,))
+            contacted = cur.rowcount
+            if contacted:
+                self._notify(cur, 'prospect_status', {'status': 'contacted', 'campaign_id': campaign_id, 'count': contacted})
+            return contacted
+
+    def get_monitoring_schedule(self, icp_ids=None):
+        if not self.conn: return {}
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT * FROM monitoring_schedule WHERE %s OR icp_id = ANY(%s)",
+                            (icp_ids is None, [str(icp_id) for icp_id in icp_ids or []]))
+                return {row['icp_id']: dict(row) for row in cur.fetchall()}
+        except Exception as e:
+            logger.error(f"❌ Erreur récupération planning surveillance: {e}")
+            return {}
+
+    def save_monitoring_run(self, icp_id, interval_minutes, last_run_at, next_run_at, last_status, last_prospects=0):
+        if not self.conn: return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO monitoring_schedule (icp_id, interval_minutes, last_run_at, next_run_at, last_status, last_prospects, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (icp_id) DO UPDATE SET
+                        interval_minutes = EXCLUDED.interval_minutes,
+                        last_run_at = EXCLUDED.last_run_at,
+                        next_run_at = EXCLUDED.next_run_at,
+                        last_status = EXCLUDED.last_status,
+                        last_prospects = EXCLUDED.last_prospects,
+                        updated_at = EXCLUDED.updated_at
+                """, (icp_id, interval_minutes, last_run_at, next_run_at, last_status, last_prospects, datetime.now()))
+        except Exception as e:
+            logger.error(f"❌ Erreur sauvegarde planning surveillance: {e}")
+
+    # ⭐ BAUX DES MONITEURS (horloge du serveur PostgreSQL pour tous les workers) ⭐
+
+    def register_monitor(self, monitor_id, icp_id, status='active'):
+        if not self.conn: return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO monitor_leases (monitor_id, icp_id, status, updated_at)
+                    VALUES (%s, %s, %s, now())
+                    ON CONFLICT (monitor_id) DO UPDATE SET
+                        status = EXCLUDED.status,
+                        updated_at = now()
+                """, (monitor_id, str(icp_id), status))
+                self._notify(cur, 'monitors', {'monitor_id': monitor_id, 'status': status})
+        except Exception as e:
+            logger.error(f"❌ Erreur enregistrement moniteur: {e}")
+
+    def ensure_monitors(self, monitors):
+        """Crée, actifs, les moniteurs manquants ({monitor_id: icp_id}); retourne le nombre créé"""
+        if not self.conn or not monitors: return 0
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO monitor_leases (monitor_id, icp_id, status, updated_at)
+                SELECT monitor_id, icp_id, 'active', now()
+                FROM unnest(%s::text[], %s::text[]) AS m(monitor_id, icp_id)
+                ON CONFLICT (monitor_id) DO NOTHING
+            """, (list(monitors), [str(icp_id) for icp_id in monitors.values()]))
+            created = cur.rowcount
+            if created:
+                self._notify(cur, 'monitors', {'created': created, 'status': 'active'})
+            return created
+
+    def set_monitors_status(self, status, monitor_ids=None):
+        """Active/arrête des moniteurs (tous si monitor_ids est None); un arrêt libère les baux"""
+        if not self.conn: return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE monitor_leases
+                    SET status = %s,
+                        owner_id = CASE WHEN %s = 'active' THEN owner_id ELSE NULL END,
+                        updated_at = now()
+                    WHERE %s OR monitor_id = ANY(%s)
+                """, (status, status, monitor_ids is None, monitor_ids or []))
+                if cur.rowcount:
+                    self._notify(cur, 'monitors', {'monitor_ids': monitor_ids, 'status': status})
+        except Exception as e:
+            logger.error(f"❌ Erreur statut moniteurs: {e}")
+
+    def heartbeat_worker(self, worker_id, ttl_seconds):
+        """Signale le worker vivant, purge les workers morts et retourne le nombre de workers vivants"""
+        if not self.conn: return 1
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO monitor_workers (worker_id, started_at, heartbeat_at)
+                VALUES (%s, now(), now())
+                ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = now()
+            """, (worker_id,))
+            cur.execute("DELETE FROM monitor_workers WHERE heartbeat_at < now() - make_interval(secs => %s)",
+                        (ttl_seconds,))
+            cur.execute("SELECT COUNT(*) FROM monitor_workers")
+            return cur.fetchone()[0]
+
+    def remove_worker(self, worker_id):
+        if not self.conn: return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("UPDATE monitor_leases SET owner_id = NULL, lease_expires_at = NULL WHERE owner_id = %s",
+                            (worker_id,))
+                cur.execute("DELETE FROM monitor_workers WHERE worker_id = %s", (worker_id,))
+        except Exception as e:
+            logger.error(f"❌ Erreur retrait worker: {e}")
+
+    def count_active_monitors(self):
+        if not self.conn: return 0
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM monitor_leases WHERE status = 'active'")
+            return cur.fetchone()[0]
+
+    def renew_monitor_leases(self, worker_id, ttl_seconds):
+        """Prolonge les baux encore détenus; retourne {monitor_id: icp_id}"""
+        if not self.conn: return {}
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE monitor_leases
+                SET lease_expires_at = now() + make_interval(secs => %s)
+                WHERE owner_id = %s AND status = 'active' AND lease_expires_at >= now()
+                RETURNING monitor_id, icp_id
+            """, (ttl_seconds, worker_id))
+            return dict(cur.fetchall())
+
+    def claim_monitor_leases(self, worker_id, ttl_seconds, limit):
+        """Réclame des moniteurs libres ou dont le bail a expiré (SKIP LOCKED entre workers)"""
+        if not self.conn or limit <= 0: return {}
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE monitor_leases
+                SET owner_id = %s, lease_expires_at = now() + make_interval(secs => %s), updated_at = now()
+                WHERE monitor_id IN (
+                    SELECT monitor_id FROM monitor_leases
+                    WHERE status = 'active' AND (owner_id IS NULL OR lease_expires_at < now())
+                    ORDER BY monitor_id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING monitor_id, icp_id
+            """, (worker_id, ttl_seconds, limit))
+            return dict(cur.fetchall())
+
+    def release_monitor_leases(self, worker_id, monitor_ids):
+        if not self.conn or not monitor_ids: return
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE monitor_leases SET owner_id = NULL, lease_expires_at = NULL, updated_at = now()
+                WHERE owner_id = %s AND monitor_id = ANY(%s)
+            """, (worker_id, list(monitor_ids)))
+
+    def get_monitor_leases(self):
+        if not self.conn: return []
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT monitor_id, icp_id, status, owner_id, lease_expires_at
+                    FROM monitor_leases ORDER BY monitor_id
+                """)
+                return [dict(row) for row in cur.fetchall()]
+        except Exception as e:
+            logger.error(f"❌ Erreur récupération baux: {e}")
+            return []
+
+    def take_rate_limit_tokens(self, bucket_key, rate, capacity, tokens=1):
+        """
+        Recharge + prélèvement atomiques d'un seau à jetons partagé (ligne verrouillée par l'upsert).
+        Retourne (accordé, jetons restants).
+        """
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO rate_limit_buckets AS b (bucket_key, tokens, rate, capacity, last_granted, updated_at)
+                VALUES (%(key)s, %(capacity)s - %(tokens)s, %(rate)s, %(capacity)s, TRUE, now())
+                ON CONFLICT (bucket_key) DO UPDATE SET
+                    last_granted = LEAST(EXCLUDED.capacity, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * EXCLUDED.rate) >= %(tokens)s,
+                    tokens = LEAST(EXCLUDED.capacity, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * EXCLUDED.rate)
+                             - CASE WHEN LEAST(EXCLUDED.capacity, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * EXCLUDED.rate) >= %(tokens)s
+                                    THEN %(tokens)s ELSE 0 END,
+                    rate = EXCLUDED.rate,
+                    capacity = EXCLUDED.capacity,
+                    updated_at = now()
+                RETURNING last_granted, tokens
+            """, {'key': bucket_key, 'rate': rate, 'capacity': capacity, 'tokens': tokens})
+            granted, remaining = cur.fetchone()
+            return granted, remaining
+
+    def drain_rate_limit_bucket(self, bucket_key, rate, capacity, seconds):
+        """Vide le seau pour `seconds` secondes (ex: HTTP 429), pour tous les workers"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO rate_limit_buckets AS b (bucket_key, tokens, rate, capacity, updated_at)
+                VALUES (%s, %s, %s, %s, now())
+                ON CONFLICT (bucket_key) DO UPDATE SET
+                    tokens = LEAST(b.tokens, EXCLUDED.tokens), updated_at = now()
+            """, (bucket_key, -rate * seconds, rate, capacity))
+
+    # ✉️ OUTBOX EMAIL (envois durables et idempotents)
+
+    def enqueue_outbox_messages(self, messages):
+        """
+        Insère les messages; une clé d'idempotence déjà présente est ignorée. Retourne les clés insérées.
+        send_at (instant absolu) prime sur delay_seconds (relatif à l'horloge de la base).
+        status / last_error optionnels: un message rejeté avant envoi est inséré directement en 'dead'
+        """
+        if not messages: return []
+        with self.conn.cursor() as cur:
+            return self._insert_outbox_messages(cur, messages)
+
+    @staticmethod
+    def _insert_outbox_messages(cur, messages):
+        if not messages: return []
+        rows = execute_values(cur, """
+            INSERT INTO email_outbox (idempotency_key, campaign_id, prospect_id, recipient, subject, body,
+                                      max_attempts, account, next_attempt_at, status, last_error, send_timezone)
+            SELECT v.key, v.campaign_id, v.prospect_id, v.recipient, v.subject, v.body,
+                   v.max_attempts, v.account, COALESCE(v.send_at::timestamp, now() + make_interval(secs => v.delay)),
+                   v.status, v.last_error, v.send_timezone
+            FROM (VALUES %s) AS v(key, campaign_id, prospect_id, recipient, subject, body, max_attempts, account,
+                                  delay, send_at, status, last_error, send_timezone)
+            ON CONFLICT (idempotency_key) DO NOTHING
+            RETURNING idempotency_key
+        """, [(m['idempotency_key'], m.get('campaign_id'), m.get('prospect_id'), m['recipient'],
+               m.get('subject'), m.get('body'), m.get('max_attempts', 5), m.get('account'),
+               float(m.get('delay_seconds', 0)), m.get('send_at'), m.get('status', 'pending'), m.get('last_error'),
+               m.get('send_timezone'))
+              for m in messages],
+           template="(%s, %s, %s, %s, %s, %s, %s::int, %s, %s::float, %s::timestamptz, %s, %s, %s)", fetch=True)
+        return [row[0] for row in rows]
+
+    def enqueue_planned_outbox_messages(self, account, account_timezone, plan):
+        """
+        Planification + insertion atomiques pour un compte expéditeur (verrou consultatif de transaction):
+        deux processus qui planifient en même temps ne dépassent pas le plafond journalier.
+        plan(day_counts, next_slots) retourne les messages à insérer, à partir de:
+        - day_counts: {date locale du compte: envois planifiés ou faits}
+        - next_slots: {fuseau destinataire: dernier envoi en attente (UTC)}
+        Retourne les clés insérées
+        """
+        if not self.conn: return []
+        with self.transaction() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"outbox_plan:{account}",))
+            # Colonnes TIMESTAMP en heure de session: ::timestamptz puis journée du fuseau du compte
+            cur.execute("""
+                SELECT (COALESCE(sent_at, next_attempt_at)::timestamptz AT TIME ZONE %s)::date AS day, COUNT(*)
+                FROM email_outbox
+                WHERE account = %s AND status <> 'dead'
+                  AND COALESCE(sent_at, next_attempt_at) > now() - interval '2 days'
+                GROUP BY day
+            """, (account_timezone, account))
+            day_counts = dict(cur.fetchall())
+            cur.execute("""
+                SELECT send_timezone, MAX(next_attempt_at)::timestamptz
+                FROM email_outbox
+                WHERE account = %s AND status IN ('pending', 'sending') AND send_timezone IS NOT NULL
+                GROUP BY send_timezone
+            """, (account,))
+            next_slots = dict(cur.fetchall())
+            return self._insert_outbox_messages(cur, plan(day_counts, next_slots))
+
+    def claim_outbox_messages(self, worker_id, limit, lease_seconds, campaign_id=None):
+        """Réclame des messages échus (ou dont le bail d'envoi a expiré) sans bloquer les autres expéditeurs"""
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                UPDATE email_outbox
+                SET status = 'sending', locked_by = %s, locked_until = now() + make_interval(secs => %s),
+                    attempts = attempts + 1, updated_at = now()
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE ((status = 'pending' AND next_attempt_at <= now())
+                           OR (status = 'sending' AND locked_until < now()))
+                      AND (%s::text IS NULL OR campaign_id = %s)
+                    ORDER BY next_attempt_at, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, idempotency_key, campaign_id, prospect_id, recipient, subject, body, attempts, max_attempts
+            """, (worker_id, lease_seconds, campaign_id, campaign_id, limit))
+            return [dict(row) for row in cur.fetchall()]
+
+    def mark_outbox_sent(self, message_id, worker_id):
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE email_outbox
+                SET status = 'sent', sent_at = now(), last_error = NULL, locked_by = NULL, locked_until = NULL, updated_at = now()
+                WHERE id = %s AND locked_by = %s
+            """, (message_id, worker_id))
+
+    def mark_outbox_failed(self, message_id, worker_id, error, retry_in_seconds=None):
+        """Échec: nouvel essai planifié (retry_in_seconds) ou dead-letter (None)"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE email_outbox
+                SET status = CASE WHEN %s::float IS NULL THEN 'dead' ELSE 'pending' END,
+                    next_attempt_at = now() + make_interval(secs => COALESCE(%s::float, 0)),
+                    last_error = %s, locked_by = NULL, locked_until = NULL, updated_at = now()
+                WHERE id = %s AND locked_by = %s
+            """, (retry_in_seconds, retry_in_seconds, error, message_id, worker_id))
+
+    def get_outbox_status(self, campaign_id=None):
+        if not self.conn: return {}
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT status, COUNT(*) FROM email_outbox
+                    WHERE %s::text IS NULL OR campaign_id = %s
+                    GROUP BY status
+                """, (campaign_id, campaign_id))
+                return dict(cur.fetchall())
+        except Exception as e:
+            logger.error(f"❌ Erreur statut outbox: {e}")
+            return {}
+
+    def get_outbox_messages(self, campaign_id):
+        if not self.conn: return []
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT prospect_id, recipient, status, attempts, last_error, sent_at
+                FROM email_outbox WHERE campaign_id = %s ORDER BY id
+            """, (campaign_id,))
+            return [dict(row) for row in cur.fetchall()]
+
+    def get_data_versions(self, scopes):
+        """Compteurs de modification: scope → (version, updated_at); version 0 si jamais écrit"""
+        if not self.conn: return None
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT scope, version, updated_at FROM data_versions WHERE scope = ANY(%s)", (list(scopes),))
+                versions = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+                return {scope: versions.get(scope, (0, None)) for scope in scopes}
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture versions de données: {e}")
+            return None
+
+    def get_app_state(self, key):
+        if not self.conn: return None
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT value FROM app_state WHERE key = %s", (key,))
+                row = cur.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture état partagé ({key}): {e}")
+            return None
+
+    def set_app_state(self, key, value):
+        if not self.conn: return None
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO app_state (key, value) VALUES (%s, %s::jsonb)
+                    ON CONFLICT (key) DO UPDATE
+                    SET value = EXCLUDED.value, version = app_state.version + 1, updated_at = now()
+                    RETURNING version
+                """, (key, json.dumps(value)))
+                return cur.fetchone()[0]
+        except Exception as e:
+            logger.error(f"❌ Erreur écriture état partagé ({key}): {e}")
+            return None
+
+    def delete_app_state(self, key):
+        if not self.conn: return
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM app_state WHERE key = %s", (key,))
+        except Exception as e:
+            logger.error(f"❌ Erreur suppression état partagé ({key}): {e}")
+
+    def create_search_job(self, job):
+        if not self.conn: return
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO search_jobs (id, status, stage, params, worker_id) VALUES (%s, %s, %s, %s, %s)
+            """, (job['id'], job['status'], job.get('stage'), json.dumps(job.get('params', {})), job.get('worker_id')))
+
+    def update_search_job(self, job_id, status=None, stage=None, stats=None, error=None):
+        if not self.conn: return self.publish_local('search_job', {'job_id': job_id})
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE search_jobs
+                    SET status = COALESCE(%s, status), stage = COALESCE(%s, stage),
+                        stats = COALESCE(%s::jsonb, stats), error = COALESCE(%s, error), updated_at = now(),
+                        completed_at = CASE WHEN %s IN ('completed', 'failed') THEN now() ELSE completed_at END
+                    WHERE id = %s
+                """, (status, stage, json.dumps(stats, default=str) if stats is not None else None, error, status, job_id))
+                # Flux NDJSON du job (/api/search-jobs/<id>/stream), quel que soit le worker qui l'exécute
+                self._notify(cur, 'search_job', {'job_id': job_id})
+        except Exception as e:
+            logger.error(f"❌ Erreur mise à jour job de recherche {job_id}: {e}")
+
+    def append_search_job_results(self, job_id, seq, prospects):
+        """Lot de résultats + compteur du job dans la même transaction (un lecteur ne voit jamais l'un sans l'autre)"""
+        with self.transaction() as cur:
+            cur.execute(
+                "INSERT INTO search_job_results (job_id, seq, prospects) VALUES (%s, %s, %s)",
+                (job_id, seq, json.dumps(prospects, default=str))
+            )
+            cur.execute("""
+                UPDATE search_jobs SET result_count = result_count + %s, updated_at = now() WHERE id = %s
+            """, (len(prospects), job_id))
+            self._notify(cur, 'search_job', {'job_id': job_id, 'seq': seq})
+
+    def get_search_job(self, job_id):
+        if not self.conn: return None
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT * FROM search_jobs WHERE id = %s", (job_id,))
+            row = cur.fetchone()
+            return dict(row) if row else None
+
+    def get_search_job_results(self, job_id, after_seq=0):
+        """Lots produits après le curseur: [(seq, prospects)]"""
+        if not self.conn: return []
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT seq, prospects FROM search_job_results WHERE job_id = %s AND seq > %s ORDER BY seq
+            """, (job_id, after_seq))
+            return [(row[0], safe_json_loads(row[1], [])) for row in cur.fetchall()]
+
+    def fail_stale_search_jobs(self, stale_seconds):
+        """Jobs sans progression (worker arrêté en cours de route) marqués en échec"""
+        if not self.conn: return 0
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE search_jobs SET status = 'failed', error = 'worker interrompu', completed_at = now()
+                    WHERE status IN ('queued', 'running') AND updated_at < now() - make_interval(secs => %s)
+                    RETURNING id
+                """, (stale_seconds,))
+                failed = [row[0] for row in cur.fetchall()]
+                for job_id in failed:
+                    self._notify(cur, 'search_job', {'job_id': job_id})
+                return len(failed)
+        except Exception as e:
+            logger.error(f"❌ Erreur nettoyage jobs de recherche: {e}")
+            return 0
+
+# Durée de chaque appel par méthode (/metrics); cycle de vie de la connexion exclu
+timed_methods(DatabaseManager, metrics, 'db_query_duration_seconds',
+              exclude=('connect_simple', 'close', 'reconnect', 'transaction', 'test_connection'))
+
 # Instance globale
 db = DatabaseManager()
\ No newline at end of file
@@ -0,0 +1,68 @@
+# ✅ CONFIGURATION GUNICORN (multi-workers, production)
+# Lancement: gunicorn -c gunicorn.conf.py wsgi:app   (depuis backend/)
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Workers processus (un cœur chacun) × threads (E/S: base, SMTP, LLM)
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Flux SSE du dashboard (/api/events): un thread gthread par onglet ouvert pendant toute la connexion.
+# Au plus la moitié des threads d'un worker (le reste sert les requêtes), flux recyclés toutes les 5 min
+os.environ.setdefault('SSE_MAX_STREAMS_PER_WORKER', str(max(1, threads // 2)))
+os.environ.setdefault('SSE_MAX_STREAM_SECONDS', '300')
+
+# Préchargement: seul l'import (modules, code) est fait dans le maître et partagé par fork;
+# connexions, index, caches et clients sont préparés dans chaque worker après le fork (WarmUp)
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Requêtes longues (recherche LLM), arrêt propre: les baux et messages en cours sont rendus
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recyclage périodique des workers (fuites mémoire), étalé pour ne pas tous les redémarrer ensemble
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# Métriques agrégées entre workers (/metrics): un instantané par processus dans ce répertoire
+os.environ.setdefault('METRICS_MULTIPROC_DIR', os.path.join(
+    tempfile.gettempdir(), f"cold_outreach_metrics_{bind.replace(':', '_').replace('/', '_')}"))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Nouveau maître: les compteurs des exécutions précédentes ne sont pas repris
+    shutil.rmtree(os.environ['METRICS_MULTIPROC_DIR'], ignore_errors=True)
+
+
+def when_ready(server):
+    # Aucune connexion ne doit passer le fork (le maître n'en ouvre pas; fermeture par sécurité)
+    from database_fixed import db
+    db.close()
+    server.log.info(f"🚀 Maître prêt: {workers} workers × {threads} threads sur {bind}")
+
+
+def post_fork(server, worker):
+    from database_fixed import db
+    db.reconnect()
+
+
+def post_worker_init(worker):
+    # Préchauffage lancé sans attendre la première requête (base, index, boucles de fond)
+    from wsgi import ensure_monitoring_worker
+    ensure_monitoring_worker()
+    worker.log.info(f"✅ Worker {worker.pid} prêt")
+
+
+def worker_exit(server, worker):
+    from wsgi import shutdown_workers
+    shutdown_workers()
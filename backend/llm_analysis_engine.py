@@ -1,6 +1,6 @@
 import os
-from openai import OpenAI
 import logging
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -13,17 +13,28 @@ class LLMAnalysisEngine:
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
         self.model = os.getenv('OPENAI_MODEL', 'llama-3.1-8b-instant')
         
+        self._client = None
+        self._client_lock = threading.Lock()
+        
         if self.openai_api_key:
-            self.client = OpenAI(
-                api_key=self.openai_api_key,
-                base_url="https://api.groq.com/openai/v1"
-            )
+            # Client (et import du SDK openai, ~0,7 s) créé à la première utilisation ou au préchauffage
             self.llm_available = True
             logger.info("✅ Service d'analyse LLM RÉEL configuré (Groq)")
         else:
             self.llm_available = False
             logger.warning("⚠️ Mode démo - API non configurée")
     
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                from openai import OpenAI
+                self._client = OpenAI(
+                    api_key=self.openai_api_key,
+                    base_url="https://api.groq.com/openai/v1"
+                )
+            return self._client
+    
     def analyze_prospect_profile(self, prospect, icp_config):
         if not self.llm_available:
             return self._fallback_analysis(prospect)
@@ -1,17 +1,35 @@
 # ✅ BACKEND PRINCIPAL AVEC LES 3 AGENTS MIT
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import os
 from flask import send_from_directory
 import time
 import logging
 import random
-from database_fixed import db
+import uuid
+from database_fixed import db, PROSPECT_STATUSES, PROSPECT_TRANSITIONS
 
 from llm_email_composer import llm_email_composer
 from llm_analysis_engine import llm_analysis_engine
+from services.prospect_pipeline import ProspectPipeline
+from services.monitoring_scheduler import MonitoringScheduler
+from services.monitor_registry import MonitorLeaseRegistry
+from services.rate_limiter import rate_limiter
+from services.email_outbox import EmailOutbox
+from services.send_scheduler import send_scheduler
+from services.campaign_runner import CampaignRunner
+from services.app_state import AppState
+from services.search_jobs import SearchJobManager
+from services.prospect_dedup import ProspectDeduplicator
+from services.campaign_templates import template_registry
+from services.event_bus import EventBus
+from services.http_cache import HttpCache
+from services.prospect_store import ProspectStore
+from services.warmup import WarmUp
+from services.metrics import metrics
+from services.request_profiler import RequestProfiler
 
 # Configuration logging
 logging.basicConfig(level=logging.INFO)
@@ -21,10 +39,80 @@ app = Flask(__name__)
 CORS(app)
 
 # =============================================
-# 🔥 VARIABLES GLOBALES MANQUANTES - AJOUT CRITIQUE
+# 📈 MÉTRIQUES HTTP (exposées sur /metrics)
 # =============================================
-monitoring_active = False
-prospects_data = []      # Stockage temporaire des prospects
+# Enregistrés en premier: la mesure englobe les autres hooks et voit la taille après compression
+@app.before_request
+def start_request_metrics():
+    # Règle de routage (/api/search-jobs/<job_id>), jamais l'URL brute: nombre de séries borné
+    rule = request.url_rule
+    labels = (request.method, rule.rule if rule else 'unmatched')
+    g.request_metrics = (labels, time.perf_counter())
+    metrics.inc('http_requests_in_flight', labels)
+
+@app.after_request
+def record_request_metrics(response):
+    labels, started = g.get('request_metrics', (None, None))
+    if labels:
+        metrics.observe('http_request_duration_seconds', labels, time.perf_counter() - started)
+        metrics.inc('http_requests_total', labels + (str(response.status_code),))
+        size = response.calculate_content_length()
+        if size is not None:
+            metrics.observe('http_response_size_bytes', labels, size)
+    return response
+
+@app.teardown_request
+def end_request_metrics(exc):
+    # Flux (SSE, NDJSON): la requête reste "en cours" jusqu'à la fermeture du flux
+    labels, _ = g.pop('request_metrics', (None, None))
+    if labels:
+        metrics.inc('http_requests_in_flight', labels, -1)
+
+# =============================================
+# 🔬 PROFILAGE À LA DEMANDE (une requête, jeton PROFILER_TOKEN)
+# =============================================
+# En-tête "X-Profile: <jeton>" uniquement (jamais dans l'URL: journaux d'accès, proxys, historique).
+# "X-Profile-Threads: all" échantillonne aussi les threads de fond (jobs de recherche, pools d'enrichissement).
+# Profil récupérable sur /api/profiles/<id>.
+request_profiler = RequestProfiler.from_env(rate_limiter)
+PROFILE_ENDPOINTS = ('list_request_profiles', 'get_request_profile')   # Lecture des profils: jamais profilée
+
+@app.before_request
+def start_request_profile():
+    supplied = request.headers.get('X-Profile')
+    if not supplied or not request_profiler.enabled or request.endpoint in PROFILE_ENDPOINTS:
+        return
+    rule = request.url_rule
+    all_threads = request.headers.get('X-Profile-Threads') == 'all'
+    session, status = request_profiler.start(supplied, request.method, rule.rule if rule else 'unmatched', all_threads)
+    g.request_profile = session
+    g.request_profile_status = status
+
+@app.after_request
+def tag_request_profile(response):
+    status = g.get('request_profile_status')
+    if status:
+        response.headers['X-Profile-Status'] = status
+        session = g.get('request_profile')
+        if session:
+            response.headers['X-Profile-Id'] = session.id
+            response.headers['X-Profile-Url'] = f"/api/profiles/{session.id}"
+            g.request_profile_code = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_profile(exc):
+    # Flux (SSE, NDJSON): le profil couvre la génération complète du corps
+    session = g.pop('request_profile', None)
+    if session:
+        request_profiler.finish(session, g.get('request_profile_code', 500))
+
+# =============================================
+# 🔥 STOCKAGE DE SECOURS (MODE SANS BASE DE DONNÉES)
+# =============================================
+# Avec PostgreSQL, la base est la seule source de vérité (partagée entre workers gunicorn);
+# ces structures ne servent qu'en mode mono-processus sans base.
+prospects_data = ProspectStore.from_env()   # Prospects (borné, LRU, index id / statut)
 icp_configs = []         # Configurations ICP
 pending_approvals = {}   # Approbations en attente
 campaigns_history = []   # Historique des campagnes
@@ -65,7 +153,7 @@ def load_mit_agents_safely():
         # 3. AGENT EMAIL
         try:
             from services.email_composer import email_composer
-            if hasattr(email_composer, 'yag') and email_composer.yag:
+            if getattr(email_composer, 'is_configured', False):
                 agents_status['email'] = email_composer
                 logger.info("✅ Agent Email RÉEL chargé avec succès")
             else:
@@ -90,12 +178,34 @@ def load_mit_agents_safely():
 # =============================================
 
 class DemoLinkedInAgent:
-    def monitor_keywords_icp(self, icp_config):
-        """Surveillance LinkedIn simulée avec données françaises réalistes"""
+    source_name = 'linkedin_demo'
+    
+    def monitor_keywords_icp(self, icp_config, since=None):
+        """Surveillance LinkedIn simulée avec données françaises réalistes (since: watermark)"""
         logger.info(f"🔍 Simulation prospection LinkedIn: {icp_config['name']}")
         time.sleep(1.5)
         
-        prospects = []
+        limit = min(icp_config.get('limit', 5), 8)
+        prospects = list(self._iter_demo_prospects(limit, since))
+        
+        logger.info(f"✅ {len(prospects)} prospects démo générés")
+        return prospects
+    
+    def iter_keywords_icp(self, icp_config, since=None, chunk_size=10):
+        """Variante streaming: lots produits au fil de la génération"""
+        logger.info(f"🔍 Simulation prospection LinkedIn (streaming): {icp_config['name']}")
+        limit = min(icp_config.get('limit', 5), int(os.getenv('MAX_STREAM_LIMIT', 1000)))
+        
+        chunk = []
+        for prospect in self._iter_demo_prospects(limit, since):
+            chunk.append(prospect)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def _iter_demo_prospects(self, limit, since):
         french_names = [
             ("Jean", "Martin"), ("Marie", "Dubois"), ("Pierre", "Bernard"),
             ("Sophie", "Thomas"), ("Michel", "Robert"), ("Nathalie", "Richard")
@@ -103,14 +213,20 @@ class DemoLinkedInAgent:
         
         french_companies = ["Capgemini", "BNP Paribas", "Total", "Orange", "Renault"]
         
-        limit = min(icp_config.get('limit', 5), 8)
+        if isinstance(since, str):
+            since = datetime.fromisoformat(since)
         
-        for i in range(limit):
+        # Résultats répartis sur 24h, dans l'ordre chronologique; seuls ceux postérieurs au watermark sont retournés
+        activity_times = sorted(datetime.now() - timedelta(seconds=random.uniform(0, 86400)) for _ in range(limit))
+        
+        for activity_at in activity_times:
+            if since and activity_at <= since:
+                continue
             first_name, last_name = random.choice(french_names)
             company = random.choice(french_companies)
             
-            prospect = {
-                'id': f"demo_{first_name}_{last_name}_{int(time.time())}_{i}",
+            yield {
+                'id': f"demo_{first_name}_{last_name}_{int(time.time())}_{uuid.uuid4().hex[:6]}",
                 'personal_info': {
                     'full_name': f"{first_name} {last_name}",
                     'position': "CTO",
@@ -120,17 +236,14 @@ class DemoLinkedInAgent:
                 },
                 'linkedin_info': {
                     'profile_url': f"https://linkedin.com/in/{first_name.lower()}-{last_name.lower()}",
-                    'connections': random.randint(300, 1200)
+                    'connections': random.randint(300, 1200),
+                    'activity_at': activity_at.isoformat()
                 },
                 'enrichment_data': {},
                 'status': 'new',
                 'source': 'linkedin_demo',
                 'timestamp': datetime.now().isoformat()
             }
-            prospects.append(prospect)
-        
-        logger.info(f"✅ {len(prospects)} prospects démo générés")
-        return prospects
     
     def get_activity_logs(self):
         return [{
@@ -179,41 +292,25 @@ class DemoEnrichmentService:
 
 class DemoEmailComposer:
     def personalize_email(self, prospect, template_type="prospection_standard"):
-        templates = {
-            'prospection_standard': {
-                'subject': f"Collaboration avec {prospect['personal_info']['company']}",
-                'body': f"""Bonjour {prospect['personal_info']['full_name']},
-
-Votre profil de {prospect['personal_info']['position']} chez {prospect['personal_info']['company']} a retenu notre attention.
-
-Nous avons une solution qui pourrait vous intéresser...
-
-Cordialement,
-L'équipe""",
-                'personalization_score': 85
-            }
-        }
-        return templates.get(template_type, templates['prospection_standard'])
+        return template_registry.get(template_type).render(prospect)
     
-    def send_campaign(self, prospects, template_type="prospection_standard"):
-        logger.info(f"✉️  Simulation envoi de {len(prospects)} emails")
+    def send_campaign(self, prospects, template_type="prospection_standard", previews=None):
+        if previews is None:
+            previews = template_registry.render_campaign(prospects, template_type)
+        logger.info(f"✉️  Simulation envoi de {len(previews)} emails")
         time.sleep(1)
         
         results = {
-            'sent': len(prospects),
+            'sent': len(previews),
             'failed': 0,
             'success_rate': 100.0,
-            'details': []
-        }
-        
-        for prospect in prospects:
-            email_content = self.personalize_email(prospect, template_type)
-            results['details'].append({
-                'prospect_id': prospect['id'],
-                'email': prospect['enrichment_data']['email'],
+            'details': [{
+                'prospect_id': preview['prospect_id'],
+                'email': preview['to'],
                 'status': 'sent',
-                'subject': email_content['subject']
-            })
+                'subject': preview['subject']
+            } for preview in previews]
+        }
         
         return results
     
@@ -279,6 +376,106 @@ email_composer = agents['email']
 
 print("✅ Tous les agents MIT sont opérationnels!")
 
+# =============================================
+# 🔁 PIPELINE DE PROSPECTION + SURVEILLANCE PLANIFIÉE
+# =============================================
+def get_active_icps():
+    """ICPs actifs: base de données en priorité, sinon liste globale"""
+    icps = db.get_all_icps() if db.conn else icp_configs
+    return [icp for icp in icps if icp.get('status', 'active') == 'active']
+
+prospect_deduplicator = ProspectDeduplicator(db, known_capacity=prospects_data.capacity)
+
+prospect_pipeline = ProspectPipeline(linkedin_agent, enrichment_service, llm_analysis_engine, db, prospects_data,
+                                     deduplicator=prospect_deduplicator)
+# Réglages partagés entre workers (table app_state)
+app_state = AppState(db)
+# Chaque worker ne planifie que les ICPs dont il détient le bail (configuration relue à chaque tick)
+monitor_registry = MonitorLeaseRegistry(db, icp_provider=get_active_icps, settings=app_state)
+# Recherches manuelles en arrière-plan: la requête rend un job_id, les résultats arrivent par lots
+search_jobs = SearchJobManager(prospect_pipeline, db)
+monitoring_scheduler = MonitoringScheduler(prospect_pipeline, monitor_registry.owned_icps, db, settings=app_state)
+monitor_registry.bind_scheduler(monitoring_scheduler)
+
+# File d'envoi durable: reprise exacte après redémarrage, plusieurs expéditeurs en parallèle
+email_outbox = EmailOutbox(db, getattr(email_composer, 'sender', None), scheduler=send_scheduler)
+# Campagnes approuvées exécutées en arrière-plan (la requête d'approbation rend la main immédiatement)
+campaign_runner = CampaignRunner(db, email_outbox, email_composer, history=campaigns_history)
+# Événements temps réel du dashboard (SSE): remplace le polling périodique
+event_bus = EventBus.from_env(db, channel=db.EVENTS_CHANNEL)
+# Sans base: les écritures en mémoire (prospects, statuts, logs, moniteurs) publient dans ce processus
+db.local_events = event_bus.publish
+prospects_data.listener = db.publish_local
+# Lectures conditionnelles (ETag / 304 depuis les compteurs data_versions) + compression gzip / brotli
+http_cache = HttpCache(db)
+
+def start_background_workers():
+    """Le worker rejoint le pool de surveillance (heartbeat des baux + planificateur) et vide l'outbox"""
+    metrics.start()
+    if not monitor_registry.is_running:
+        monitor_registry.start()
+        monitoring_scheduler.start()
+    if not email_outbox.is_running:
+        email_outbox.start()
+        campaign_runner.resume()
+
+def warm_database():
+    """Connexion + schéma (premier accès)"""
+    if db.conn is None:
+        raise RuntimeError("PostgreSQL indisponible, mode sans base de données")
+
+def backfill_identity_keys():
+    """Clés d'identité des prospects antérieurs à la déduplication (un seul worker), ajoutées au filtre local"""
+    prospect_deduplicator.add_identity_keys(db.backfill_identity_keys())
+
+def warm_llm_clients():
+    # Import du SDK openai et création des clients hors du chemin de la première requête
+    for engine in (llm_email_composer, llm_analysis_engine):
+        if engine.llm_available:
+            engine.client
+
+def warm_enrichment():
+    if hasattr(enrichment_service, 'warm_up'):
+        enrichment_service.warm_up()
+
+def warm_smtp():
+    if hasattr(email_composer, 'check_connection'):
+        email_composer.check_connection()
+
+# Préchauffage en arrière-plan: aucune E/S à l'import, le worker sert des requêtes dès son démarrage.
+# Requis pour être "prêt": base, filtre de déduplication et boucles de fond; LLM et SMTP sont facultatifs.
+warmup = WarmUp()
+warmup.register('database', warm_database)
+warmup.register('dedup', prospect_deduplicator.warm_up)
+warmup.register('background_workers', start_background_workers)
+warmup.register('llm', warm_llm_clients, required=False)
+warmup.register('enrichment', warm_enrichment, required=False)
+warmup.register('smtp', warm_smtp, required=False)
+# Hors du chemin de disponibilité: rattrapage ponctuel, l'index unique reste la garantie finale
+warmup.register('identity_backfill', backfill_identity_keys, required=False)
+
+def ensure_monitoring_worker():
+    """Démarre le préchauffage du processus (une seule fois, après le fork des workers)"""
+    warmup.start()
+
+def shutdown_workers():
+    """Arrêt propre d'un worker: baux libérés, boucles de fond arrêtées (les autres workers reprennent)"""
+    event_bus.stop()
+    metrics.stop()
+    campaign_runner.stop()
+    email_outbox.stop()
+    monitoring_scheduler.stop()
+    monitor_registry.stop()
+
+@app.before_request
+def join_monitoring_pool():
+    # Démarrage paresseux: seul un processus qui sert des requêtes détient des baux
+    ensure_monitoring_worker()
+
+@app.after_request
+def compress_response(response):
+    return http_cache.compress(response)
+
 # =============================================
 # 🆕 CORRECTION DES ROUTES AVEC GESTION DB
 # =============================================
@@ -358,17 +555,63 @@ def llm_health_check():
 def health_check():
     """Vérification du statut des agents"""
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if warmup.is_ready() else 'warming_up',
+        'ready': warmup.is_ready(),
+        'warmup': warmup.get_status(),
         'timestamp': datetime.now().isoformat(),
         'agents': {
             'linkedin': hasattr(linkedin_agent, 'api') and linkedin_agent.api is not None,
             'enrichment': hasattr(enrichment_service, 'hunter') and enrichment_service.hunter is not None,
-            'email': hasattr(email_composer, 'yag') and email_composer.yag is not None
+            'email': getattr(email_composer, 'is_configured', False)
         },
         'demo_mode': isinstance(linkedin_agent, DemoLinkedInAgent),
-        'mit_agent': not isinstance(linkedin_agent, DemoLinkedInAgent)
+        'mit_agent': not isinstance(linkedin_agent, DemoLinkedInAgent),
+        'rate_limits': rate_limiter.get_stats(),
+        'profiler': request_profiler.get_stats(),
+        'http_cache': http_cache.get_stats(),
+        'dedup': prospect_deduplicator.get_stats()   # Compteurs propres au processus
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métriques Prometheus (tous les workers): requêtes par route, durées, tailles, appels base de données"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def profiler_access_denied():
+    """404 si le profilage est désactivé, 403 si le jeton est absent ou invalide"""
+    if not request_profiler.enabled:
+        return jsonify({'status': 'error', 'message': 'Profilage désactivé (PROFILER_TOKEN)'}), 404
+    if not request_profiler.is_authorized(request.headers.get('X-Profile')):
+        return jsonify({'status': 'error', 'message': 'Jeton de profilage invalide'}), 403
+    return None
+
+@app.route('/api/profiles', methods=['GET'])
+def list_request_profiles():
+    """Profils conservés (méthode, route, durée, échantillons), du plus récent au plus ancien"""
+    denied = profiler_access_denied()
+    if denied:
+        return denied
+    return jsonify({'status': 'success', 'profiles': request_profiler.list_profiles(),
+                    'profiler': request_profiler.get_stats()})
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_request_profile(profile_id):
+    """Profil au format replié: flamegraph.pl, speedscope (import direct) ou inferno"""
+    denied = profiler_access_denied()
+    if denied:
+        return denied
+    folded = request_profiler.load(profile_id)
+    if folded is None:
+        return jsonify({'status': 'error', 'message': 'Profil introuvable'}), 404
+    return Response(folded, content_type='text/plain; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename="{profile_id}.folded"'})
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Sonde de disponibilité (déploiement progressif, autoscaling): 503 tant que le préchauffage n'est pas fini"""
+    ready = warmup.is_ready()
+    return jsonify({'ready': ready, 'warmup': warmup.get_status()}), 200 if ready else 503
+
 @app.route('/api/config/icp', methods=['POST'])
 def config_icp():
     """Configuration de l'ICP depuis le frontend - CORRIGÉE"""
@@ -386,20 +629,21 @@ def config_icp():
             'keywords': data.get('keywords', []),
             'locations': data.get('locations', []),
             'industries': data.get('industries', []),
+            'exclusions': data.get('exclusions', []),      # Termes éliminatoires (ex: "stagiaire")
+            'synonyms': data.get('synonyms', {}),          # {keyword: [variantes]} en plus des synonymes intégrés
             'company_context': data.get('company_context', {}),
             'limit': data.get('limit', 10),
+            'interval_minutes': data.get('interval_minutes'),  # None = intervalle global de surveillance
             'created_at': datetime.now().isoformat(),
             'status': 'active'
         }
         
-        # Sauvegarde dans la liste globale ET en base de données
-        icp_configs.append(icp_config)
-        
-        try:
+        # Sauvegarde en base de données (liste globale uniquement sans base)
+        if db.conn:
             db.save_icp_config(icp_config)
             db.log_activity('system', 'INFO', f"ICP créé: {icp_config['name']}")
-        except Exception as db_error:
-            logger.warning(f"⚠️ Base de données non disponible: {db_error}")
+        else:
+            icp_configs.append(icp_config)
         
         logger.info(f"✅ ICP configuré: {icp_config['name']} avec {len(icp_config['keywords'])} keywords")
         
@@ -415,14 +659,12 @@ def config_icp():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/icp', methods=['GET'])
+@http_cache.conditional('icp_configs')
 def get_icps():
     """Récupère tous les ICPs"""
     try:
-        # Essaye d'abord la base de données, sinon utilise la liste globale
-        try:
-            icps = db.get_all_icps()
-        except:
-            icps = icp_configs
+        # Base de données, sinon liste globale (mode sans base)
+        icps = db.get_all_icps() if db.conn else icp_configs
             
         return jsonify({
             "icps": icps,
@@ -448,8 +690,10 @@ def monitoring_status():
                 logs.append(f"{log['timestamp'][11:16]} - {log['message']}")
         
         return jsonify({
-            "is_monitoring": monitoring_active,
+            "is_monitoring": monitor_registry.is_active(),
             "agent_type": "MIT LinkedIn Agent" if not isinstance(linkedin_agent, DemoLinkedInAgent) else "Demo Agent",
+            "scheduler": monitoring_scheduler.get_status(),
+            "leases": monitor_registry.get_status(),
             "logs": logs[-10:]  # Les 10 derniers logs
         })
     except Exception as e:
@@ -458,18 +702,16 @@ def monitoring_status():
 @app.route('/api/monitoring/start', methods=['POST'])
 def start_monitoring():
     """Démarrage de la surveillance automatique - CORRIGÉE"""
-    global monitoring_active
     try:
         data = request.get_json()
         interval = data.get('interval_minutes', 60)
         
-        monitoring_active = True
-        
-        # Démarrer la surveillance avec votre agent MIT
-        if hasattr(linkedin_agent, 'start_monitoring'):
-            active_icp = next((icp for icp in icp_configs if icp.get('status') == 'active'), None)
-            if active_icp:
-                monitoring_result = linkedin_agent.start_monitoring(active_icp, interval)
+        # Intervalle partagé: tous les workers planifient avec la même valeur (ICPs sans intervalle propre)
+        app_state.set('monitoring.default_interval_minutes', interval)
+        # Active un moniteur par ICP actif (et pour les ICPs créés ensuite); les workers se les répartissent par baux
+        active_icps = get_active_icps()
+        monitor_registry.activate(active_icps)
+        scheduler_status = monitoring_scheduler.get_status()
         
         db.log_activity('system', 'INFO', f"Surveillance démarrée - Intervalle: {interval}min")
         
@@ -477,6 +719,8 @@ def start_monitoring():
             "status": "success",
             "message": f"Surveillance MIT programmée toutes les {interval} minutes",
             "interval_minutes": interval,
+            "active_icps": len(active_icps),
+            "scheduler": scheduler_status,
             "agent": "MIT LinkedIn Agent" if not isinstance(linkedin_agent, DemoLinkedInAgent) else "Demo Agent"
         })
     except Exception as e:
@@ -485,13 +729,10 @@ def start_monitoring():
 @app.route('/api/monitoring/stop', methods=['POST'])
 def stop_monitoring():
     """Arrêt de la surveillance automatique - CORRIGÉE"""
-    global monitoring_active
     try:
-        monitoring_active = False
-        
-        # Arrêter la surveillance avec votre agent MIT
-        if hasattr(linkedin_agent, 'stop_monitoring'):
-            linkedin_agent.stop_monitoring()
+        # Arrête tous les moniteurs: les baux sont libérés sur tous les workers
+        monitor_registry.deactivate()
+        monitor_registry.heartbeat()
         
         db.log_activity('system', 'INFO', "Surveillance arrêtée")
         
@@ -504,9 +745,13 @@ def stop_monitoring():
 
 @app.route('/api/search-prospects', methods=['POST'])
 def search_prospects():
-    """Recherche manuelle de prospects - AMÉLIORÉE AVEC LLM"""
+    """
+    Recherche manuelle de prospects (découverte → enrichissement → analyse LLM)
+    Par défaut asynchrone: 202 + job_id à suivre sur /api/search-jobs/<job_id>.
+    'stream': NDJSON dans la réponse; 'sync': ancienne réponse bloquante.
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         
         # Création d'un ICP temporaire pour la recherche
         temp_icp = {
@@ -517,22 +762,32 @@ def search_prospects():
             'limit': data.get('limit', 10)
         }
         
-        # Utilisation de votre agent LinkedIn
-        prospects = linkedin_agent.monitor_keywords_icp(temp_icp)
-        
-        # Enrichissement des prospects
-        enriched_prospects = enrichment_service.batch_enrich_prospects(prospects)
+        if data.get('stream'):
+            # NDJSON: chaque lot est renvoyé dès qu'il est enrichi, analysé et sauvegardé
+            def generate():
+                count, stats = 0, {}
+                for analyzed, stats in prospect_pipeline.iter_scan(temp_icp):
+                    count += len(analyzed)
+                    yield json.dumps({"type": "prospects", "prospects": analyzed, "scan_stats": stats}, default=str) + "\n"
+                db.log_activity('linkedin', 'INFO', 
+                               f"Recherche manuelle (streaming): {count} prospects trouvés et analysés par LLM")
+                yield json.dumps({"type": "done", "status": "success", "count": count, "scan_stats": stats}, default=str) + "\n"
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
         
-        # ⭐ NOUVEAU: Analyse LLM des prospects
-        analyzed_prospects = llm_analysis_engine.batch_analyze_prospects(enriched_prospects, temp_icp)
+        if not data.get('sync'):
+            job = search_jobs.submit(temp_icp)
+            return jsonify({
+                "status": "success",
+                "job_id": job['id'],
+                "job_status": job['status'],
+                "status_url": f"/api/search-jobs/{job['id']}",
+                "stream_url": f"/api/search-jobs/{job['id']}/stream"
+            }), 202
         
-        # Sauvegarde des prospects
-        for prospect in analyzed_prospects:
-            prospects_data.append(prospect)
-            try:
-                db.save_prospect(prospect)
-            except Exception as db_error:
-                logger.warning(f"⚠️ Base de données non disponible: {db_error}")
+        # Découverte LinkedIn → enrichissement → analyse LLM → sauvegarde
+        scan_result = prospect_pipeline.run_scan(temp_icp)
+        analyzed_prospects = scan_result['prospects']
         
         db.log_activity('linkedin', 'INFO', 
                        f"Recherche manuelle: {len(analyzed_prospects)} prospects trouvés et analysés par LLM")
@@ -542,26 +797,61 @@ def search_prospects():
             "count": len(analyzed_prospects),
             "prospects": analyzed_prospects,
             "llm_analysis": True,
+            "scan_stats": scan_result['stats'],
             "agent_used": "MIT LinkedIn Agent" if not isinstance(linkedin_agent, DemoLinkedInAgent) else "Demo Agent"
         })
         
     except Exception as e:
         db.log_activity('linkedin', 'ERROR', f"Erreur recherche prospects: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
+@app.route('/api/search-jobs/<job_id>', methods=['GET'])
+def search_job_status(job_id):
+    """Étape, statistiques et nouveaux résultats d'une recherche (curseur ?after=<cursor>)"""
+    job = search_jobs.get(job_id, request.args.get('after', 0, type=int))
+    if job is None:
+        return jsonify({"status": "error", "message": "Job de recherche non trouvé"}), 404
+    return jsonify({"status": "success", **job})
+
+@app.route('/api/search-jobs/<job_id>/stream', methods=['GET'])
+def search_job_stream(job_id):
+    """NDJSON: une ligne par changement d'étape ou nouveau lot, jusqu'à la fin du job"""
+    if search_jobs.get(job_id) is None:
+        return jsonify({"status": "error", "message": "Job de recherche non trouvé"}), 404
+    
+    def generate():
+        cursor, last_stage = request.args.get('after', 0, type=int), None
+        # Relecture à chaque progression notifiée (LISTEN/NOTIFY du bus d'événements), pas de polling;
+        # relecture de secours toutes les 15 s si une notification est perdue
+        with event_bus.watch('search_job', lambda data: data.get('job_id') == job_id) as changed:
+            while not event_bus.stopped:
+                job = search_jobs.get(job_id, cursor)
+                if job is None:
+                    # Job supprimé entre-temps: ligne d'erreur finale puis fin du flux
+                    yield json.dumps({'job_id': job_id, 'status': 'error', 'error': 'Job de recherche non trouvé',
+                                      'done': True}) + "\n"
+                    return
+                if job['prospects'] or job['stage'] != last_stage or job['done']:
+                    yield json.dumps(job, default=str) + "\n"
+                cursor, last_stage = job['cursor'], job['stage']
+                if job['done']:
+                    return
+                changed.wait(15)
+                changed.clear()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/prospects', methods=['GET'])
+@http_cache.conditional('prospects')
 def get_prospects():
     """Liste tous les prospects - CORRIGÉE"""
     try:
         status_filter = request.args.get('status', 'all')
         
-        # Essaye d'abord la base de données, sinon utilise la liste globale
-        try:
+        # Base de données, sinon liste globale (mode sans base)
+        if db.conn:
             prospects = db.get_all_prospects(status_filter)
-        except:
-            if status_filter == 'all':
-                prospects = prospects_data
-            else:
-                prospects = [p for p in prospects_data if p.get('status') == status_filter]
+        else:
+            prospects = prospects_data.list(status_filter)
         
         prospects_with_emails = len([p for p in prospects if p.get('enrichment_data', {}).get('email')])
         
@@ -573,33 +863,61 @@ def get_prospects():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def compute_dashboard_stats():
+    """Statistiques du dashboard: base de données, sinon listes globales (mode sans base)"""
+    if db.conn:
+        stats = db.get_statistics()
+    else:
+        total_prospects = prospects_data.count()
+        approved_prospects = prospects_data.count('approved')
+        contacted_prospects = prospects_data.count('contacted')
+        
+        approval_rate = (approved_prospects/total_prospects*100) if total_prospects > 0 else 0
+        
+        stats = {
+            "total_prospects": total_prospects,
+            "total_approvals": approved_prospects,
+            "emails_sent": contacted_prospects,
+            "approval_rate": f"{approval_rate:.1f}%",
+            "mit_agent_active": not isinstance(linkedin_agent, DemoLinkedInAgent)
+        }
+    
+    return stats
+
+# Événements dérivés: recalculés (une fois par processus) quand une écriture les concerne, envoyés en delta
+event_bus.derive('stats', ('prospects', 'prospect_status'), compute_dashboard_stats)
+event_bus.derive('monitoring', ('monitors',), lambda: {'is_monitoring': monitor_registry.is_active()})
+
 @app.route('/api/dashboard-stats', methods=['GET'])
+@http_cache.conditional('prospects')
 def dashboard_stats():
     """Statistiques pour le dashboard - CORRIGÉE"""
     try:
-        # Essaye d'abord la base de données, sinon utilise les listes globales
-        try:
-            stats = db.get_statistics()
-        except:
-            total_prospects = len(prospects_data)
-            approved_prospects = len([p for p in prospects_data if p.get('status') == 'approved'])
-            contacted_prospects = len([p for p in prospects_data if p.get('status') == 'contacted'])
-            
-            approval_rate = (approved_prospects/total_prospects*100) if total_prospects > 0 else 0
-            
-            stats = {
-                "total_prospects": total_prospects,
-                "total_approvals": approved_prospects,
-                "emails_sent": contacted_prospects,
-                "approval_rate": f"{approval_rate:.1f}%",
-                "mit_agent_active": not isinstance(linkedin_agent, DemoLinkedInAgent)
-            }
-        
-        return jsonify(stats)
+        return jsonify(compute_dashboard_stats())
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/events', methods=['GET'])
+def dashboard_events():
+    """
+    Flux SSE du dashboard: état complet à la connexion ('stats', 'monitoring'), puis
+    'stats' (delta), 'monitoring', 'prospects', 'prospect_status' et 'log' au fil des écritures.
+    Un onglet ouvert occupe un thread du worker (gthread) sans aucune requête tant que rien ne change:
+    au-delà de SSE_MAX_STREAMS_PER_WORKER flux, 503 (le navigateur réessaie, éventuellement sur un autre worker).
+    """
+    if not event_bus.accepting():
+        response = jsonify({'error': 'Trop de flux ouverts sur ce worker'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '10'
+        return response
+    initial_events = [('stats', event_bus.snapshot('stats')), ('monitoring', event_bus.snapshot('monitoring'))]
+    response = Response(stream_with_context(event_bus.stream(initial_events)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'   # Pas de mise en tampon par un proxy nginx
+    return response
+
 @app.route('/api/logs', methods=['GET'])
+@http_cache.conditional('activity_logs')
 def get_logs():
     """Récupération des journaux - CORRIGÉE"""
     try:
@@ -637,9 +955,34 @@ def get_logs():
 # =============================================
 # 🆕 ROUTES MANQUANTES - AJOUT CRITIQUE
 # =============================================
+PROSPECT_DECISIONS = ('approved', 'rejected')
+
+def find_prospects(prospect_ids):
+    """Prospects par id: base de données (une requête), sinon stockage mémoire (index par id)"""
+    prospects = db.get_prospects_by_ids(prospect_ids) if db.conn else []
+    if not prospects:
+        prospects = prospects_data.get_many(prospect_ids)
+    return prospects
+
+def apply_decision(prospects, decision, expected_statuses=None):
+    """
+    Transition groupée; retourne (ids modifiés, ids en conflit: statut changé entre-temps).
+    Erreur de base propagée: la route répond 500, jamais "conflit" ni succès
+    """
+    ids = [p['id'] for p in prospects]
+    if db.conn:
+        updated = set(db.transition_prospects(ids, decision, expected_statuses))
+    else:
+        updated = set(prospects_data.transition(ids, decision, expected_statuses or PROSPECT_TRANSITIONS.get(decision, ())))
+    for prospect in prospects:
+        if prospect['id'] in updated:
+            prospect['status'] = decision
+    conflicts = [p['id'] for p in prospects if p['id'] not in updated and p.get('status') != decision]
+    return [i for i in ids if i in updated], conflicts
+
 @app.route('/api/approve-prospect', methods=['POST'])
 def approve_prospect():
-    """Approbation d'un prospect individuel - CORRIGÉE"""
+    """Approbation d'un prospect individuel"""
     try:
         data = request.get_json()
         prospect_id = data.get('prospect_id')
@@ -647,25 +990,19 @@ def approve_prospect():
         
         logger.info(f"📋 Approbation prospect: {prospect_id} - Décision: {decision}")
         
-        if not prospect_id or not decision:
+        if not prospect_id or decision not in PROSPECT_DECISIONS:
             return jsonify({"status": "error", "message": "prospect_id et decision requis"}), 400
         
-        # Recherche du prospect dans la base de données
-        try:
-            prospects = db.get_all_prospects('all')
-            prospect = next((p for p in prospects if p['id'] == prospect_id), None)
-        except:
-            # Fallback sur la liste globale
-            prospect = next((p for p in prospects_data if p['id'] == prospect_id), None)
-        
-        if not prospect:
+        prospects = find_prospects([prospect_id])
+        if not prospects:
             return jsonify({"status": "error", "message": "Prospect non trouvé"}), 404
+        prospect = prospects[0]
+        
+        _, conflicts = apply_decision(prospects, decision)
+        if conflicts:
+            return jsonify({"status": "error", "message": f"Transition impossible depuis '{prospect.get('status')}'"}), 409
         
-        # Mise à jour du statut
         if decision == 'approved':
-            prospect['status'] = 'approved'
-            prospect['approved_at'] = datetime.now().isoformat()
-            
             # Génération de l'email personnalisé
             try:
                 email_content = email_composer.personalize_email(prospect)
@@ -677,17 +1014,6 @@ def approve_prospect():
                     'personalization_score': 75
                 }
             
-            # Sauvegarde en base
-            try:
-                # Mettre à jour le prospect en base
-                with db.conn.cursor() as cur:
-                    cur.execute(
-                        "UPDATE prospects SET status = %s, enrichment_data = jsonb_set(enrichment_data, %s, %s) WHERE id = %s",
-                        ('approved', '{approved_at}', json.dumps(datetime.now().isoformat()), prospect_id)
-                    )
-            except Exception as db_error:
-                logger.warning(f"⚠️ Erreur DB: {db_error}")
-            
             db.log_activity('system', 'INFO', f"Prospect approuvé: {prospect_id}")
             
             return jsonify({
@@ -698,47 +1024,128 @@ def approve_prospect():
                     "prospect_id": prospect_id
                 }
             })
-        else:
-            # Rejet du prospect
-            prospect['status'] = 'rejected'
-            
-            try:
-                with db.conn.cursor() as cur:
-                    cur.execute(
-                        "UPDATE prospects SET status = %s WHERE id = %s",
-                        ('rejected', prospect_id)
-                    )
-            except Exception as db_error:
-                logger.warning(f"⚠️ Erreur DB: {db_error}")
-                
-            db.log_activity('system', 'INFO', f"Prospect rejeté: {prospect_id}")
-            
-            return jsonify({
-                "status": "success", 
-                "message": "Prospect rejeté"
-            })
+        
+        db.log_activity('system', 'INFO', f"Prospect rejeté: {prospect_id}")
+        
+        return jsonify({
+            "status": "success", 
+            "message": "Prospect rejeté"
+        })
             
     except Exception as e:
         logger.error(f"❌ Erreur approbation prospect: {e}")
         db.log_activity('system', 'ERROR', f"Erreur approbation: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/prospects/bulk-decision', methods=['POST'])
+def bulk_prospect_decision():
+    """Approbation / rejet de centaines de prospects en une requête (une seule mise à jour SQL)"""
+    try:
+        data = request.get_json() or {}
+        prospect_ids = data.get('prospect_ids') or []
+        decision = data.get('decision')
+        expected_statuses = data.get('expected_statuses')
+        
+        # Listes uniquement: une chaîne ("new") serait itérée caractère par caractère
+        if (not isinstance(prospect_ids, list) or not prospect_ids
+                or not all(isinstance(i, str) for i in prospect_ids) or decision not in PROSPECT_DECISIONS):
+            return jsonify({"status": "error", "message": "prospect_ids (liste) et decision requis"}), 400
+        if expected_statuses is not None and (not isinstance(expected_statuses, list)
+                                              or any(s not in PROSPECT_STATUSES for s in expected_statuses)):
+            return jsonify({"status": "error",
+                            "message": f"expected_statuses: liste de statuts parmi {', '.join(PROSPECT_STATUSES)}"}), 400
+        prospect_ids = list(dict.fromkeys(prospect_ids))
+        
+        prospects = find_prospects(prospect_ids)
+        found = {p['id'] for p in prospects}
+        updated, conflicts = apply_decision(prospects, decision, expected_statuses)
+        
+        db.log_activity('system', 'INFO', f"Décision groupée '{decision}': {len(updated)} prospects")
+        
+        return jsonify({
+            "status": "success",
+            "decision": decision,
+            "updated": updated,
+            "unchanged": [i for i in found if i not in updated and i not in conflicts],
+            "conflicts": conflicts,
+            "not_found": [i for i in prospect_ids if i not in found]
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Erreur décision groupée: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/campaign/prepare', methods=['POST'])
+def prepare_campaign():
+    """Prépare une campagne: rendu unique de tous les emails, stocké pour approbation"""
+    try:
+        data = request.get_json() or {}
+        template_type = data.get('template_type', 'standard')
+        prospect_ids = data.get('prospect_ids') or []
+        
+        prospects = find_prospects(prospect_ids)
+        if not prospects:
+            return jsonify({"status": "error", "message": "Aucun prospect trouvé"}), 404
+        
+        previews = template_registry.render_campaign(prospects, template_type, data.get('modifications'))
+        approval = {
+            'approval_id': f"approval_{uuid.uuid4().hex[:12]}",
+            'prospects': [p['id'] for p in prospects],
+            'template_type': template_type,
+            'previews': previews,
+            'created_at': datetime.now().isoformat(),
+            'status': 'pending'
+        }
+        if db.conn:
+            db.save_pending_approval(approval)
+        else:
+            pending_approvals[approval['approval_id']] = approval
+        
+        preview_limit = int(data.get('preview_limit', 20))
+        return jsonify({
+            'status': 'success',
+            'approval_id': approval['approval_id'],
+            'template_hash': template_registry.get(template_type).template_hash,
+            'recipients': len(previews),
+            'skipped_without_email': len(prospects) - len(previews),
+            'previews': previews[:preview_limit]
+        })
+    except Exception as e:
+        logger.error(f"❌ Erreur préparation campagne: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def load_pending_approval(approval_id):
+    """Approbation en base (visible de tous les workers), en mémoire sans base"""
+    return db.get_pending_approval(approval_id) if db.conn else pending_approvals.get(approval_id)
+
 @app.route('/api/campaign/approve', methods=['POST'])
 def approve_campaign():
-    """Approuve une campagne - ROUTE MANQUANTE"""
+    """Approuve une campagne: envoi asynchrone, la réponse n'attend pas les emails"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         approval_id = data.get('approval_id')
         
-        logger.info(f"✅ Approbation campagne: {approval_id}")
+        approval = load_pending_approval(approval_id)
+        if not approval:
+            return jsonify({'status': 'error', 'message': 'Approbation non trouvée'}), 404
+        if (approval.get('status') or 'pending') != 'pending' or not db.update_pending_approval_status(approval_id, 'approved'):
+            return jsonify({'status': 'error', 'message': 'Approbation déjà traitée'}), 409
+        if not db.conn:
+            pending_approvals.pop(approval_id, None)
+        
+        campaign = campaign_runner.submit(approval, schedule=bool(data.get('schedule')))
+        logger.info(f"✅ Approbation campagne: {approval_id} → {campaign['id']} ({campaign['prospects_count']} emails)")
+        db.log_activity('email', 'INFO', f"Campagne approuvée: {campaign['id']} ({campaign['prospects_count']} emails)")
         
-        # Simulation d'approbation réussie
         return jsonify({
             'status': 'success',
-            'message': 'Campagne approuvée avec succès',
+            'message': 'Campagne approuvée, envoi en cours',
             'approval_id': approval_id,
-            'emails_sent': 5  # Exemple
-        })
+            'campaign_id': campaign['id'],
+            'emails_queued': campaign['prospects_count'] - campaign['rejected_count'],
+            'emails_rejected': campaign['rejected_count'],
+            'progress_url': f"/api/campaign/{campaign['id']}/progress"
+        }), 202
         
     except Exception as e:
         logger.error(f"❌ Erreur approbation: {e}")
@@ -746,13 +1153,22 @@ def approve_campaign():
 
 @app.route('/api/campaign/reject', methods=['POST'])
 def reject_campaign():
-    """Rejette une campagne - ROUTE MANQUANTE"""
+    """Rejette une campagne: l'approbation est close, aucun email n'est envoyé"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         approval_id = data.get('approval_id')
         reason = data.get('reason', 'Raison non spécifiée')
         
+        approval = load_pending_approval(approval_id)
+        if not approval:
+            return jsonify({'status': 'error', 'message': 'Approbation non trouvée'}), 404
+        if (approval.get('status') or 'pending') != 'pending' or not db.update_pending_approval_status(approval_id, 'rejected'):
+            return jsonify({'status': 'error', 'message': 'Approbation déjà traitée'}), 409
+        if not db.conn:
+            pending_approvals.pop(approval_id, None)
+        
         logger.info(f"❌ Rejet campagne: {approval_id} - Raison: {reason}")
+        db.log_activity('email', 'INFO', f"Campagne rejetée: {approval_id} - {reason}")
         
         return jsonify({
             'status': 'success',
@@ -763,6 +1179,23 @@ def reject_campaign():
     except Exception as e:
         logger.error(f"❌ Erreur rejet: {e}")
         return jsonify({'error': str(e)}), 500
+
+@app.route('/api/campaign/<campaign_id>/progress', methods=['GET'])
+def campaign_progress(campaign_id):
+    """Progression d'une campagne: envoyés, échecs, restants"""
+    progress = campaign_runner.progress(campaign_id)
+    if progress is None:
+        return jsonify({'status': 'error', 'message': 'Campagne non trouvée'}), 404
+    return jsonify({'status': 'success', 'progress': progress})
+
+@app.route('/api/outbox/status', methods=['GET'])
+def outbox_status():
+    """État de la file d'envoi (globale ou par campagne)"""
+    return jsonify({
+        'status': 'success',
+        'outbox': email_outbox.get_status(request.args.get('campaign_id'))
+    })
+
 @app.route('/api/dashboard/llm-stats', methods=['GET'])
 def get_llm_dashboard_stats():
     """Nouvelles métriques LLM pour le dashboard"""
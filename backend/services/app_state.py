@@ -0,0 +1,57 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class AppState:
+    """
+    État applicatif partagé entre workers (table app_state, clé → JSONB)
+    - remplace les variables de module, propres à chaque processus en déploiement multi-workers
+    - lectures mises en cache quelques secondes (valeurs lues à chaque tick des boucles de fond)
+    - sans base de données: dictionnaire du processus (mode mono-processus)
+    """
+
+    def __init__(self, db, cache_seconds=2.0):
+        self.db = db
+        self.cache_seconds = cache_seconds
+        self._local = {}
+        self._cache = {}          # clé → (valeur, lue à)
+        self._lock = threading.Lock()
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    def get(self, key, default=None):
+        if not self._db_available():
+            with self._lock:
+                return self._local.get(key, default)
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and now - cached[1] < self.cache_seconds:
+            value = cached[0]
+        else:
+            value = self.db.get_app_state(key)
+            with self._lock:
+                self._cache[key] = (value, now)
+        return default if value is None else value
+
+    def set(self, key, value):
+        """Écrit une valeur; retourne sa version (incrémentée à chaque écriture)"""
+        if not self._db_available():
+            with self._lock:
+                self._local[key] = value
+            return None
+        version = self.db.set_app_state(key, value)
+        with self._lock:
+            self._cache[key] = (value, time.monotonic())
+        return version
+
+    def delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+            self._cache.pop(key, None)
+        if self._db_available():
+            self.db.delete_app_state(key)
@@ -0,0 +1,169 @@
+import uuid
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from services.campaign_templates import preview_intact
+
+logger = logging.getLogger(__name__)
+
+class CampaignRunner:
+    """
+    Exécution asynchrone des campagnes approuvées
+    - l'approbation rend la main immédiatement: mise en file et envoi dans des workers d'arrière-plan
+    - envoi via l'outbox durable (prévisualisations approuvées réutilisées, reprise après redémarrage)
+    - statuts prospects mis à jour par lots ('contacted'), progression sent / failed / remaining
+    - sans base de données: envoi direct par le composer, progression en mémoire
+    """
+
+    def __init__(self, db, outbox, composer, max_workers=2, sync_seconds=2, history=None):
+        self.db = db
+        self.outbox = outbox
+        self.composer = composer
+        self.sync_seconds = sync_seconds
+        self.history = history if history is not None else []
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="campaign")
+        self._campaigns = {}          # campaign_id → enregistrement (campagnes suivies par ce processus)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._monitor = None
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    def submit(self, approval, schedule=False):
+        """Lance la campagne d'une approbation; retourne son enregistrement sans attendre l'envoi"""
+        campaign = {
+            'id': f"campaign_{uuid.uuid4().hex[:12]}",
+            'approval_id': approval['approval_id'],
+            'template_type': approval.get('template_type'),
+            'prospects_count': len(approval.get('previews') or []),
+            # Aperçus modifiés depuis l'approbation: jamais envoyés, comptés en échec (content_hash_mismatch)
+            'rejected_count': sum(not preview_intact(p) for p in approval.get('previews') or []),
+            'status': 'queued',
+            'scheduled': schedule,
+            'enqueued': False,        # Tant que la mise en file n'est pas finie, 0 ligne ne signifie pas "terminée"
+            'created_at': datetime.now().isoformat(),
+            'results': {}
+        }
+        with self._lock:
+            self._campaigns[campaign['id']] = campaign
+        self.db.save_campaign(campaign)
+        self.history.append(campaign)
+        self._executor.submit(self._run, campaign, approval, schedule)
+        return campaign
+
+    def _run(self, campaign, approval, schedule):
+        try:
+            campaign['status'] = 'running'
+            self.db.update_campaign(campaign['id'], 'running')
+            previews = approval.get('previews') or []
+            prospects = self.db.get_prospects_by_ids(approval.get('prospects') or []) if schedule else []
+
+            if not self._db_available():
+                results = self.composer.send_campaign(prospects, approval.get('template_type'), previews=previews)
+                self._finish(campaign, results)
+                return
+
+            self.outbox.enqueue_campaign(campaign['id'], prospects, approval.get('template_type'), previews, schedule)
+            campaign['enqueued'] = True
+            self._ensure_monitor()
+            # Envoi immédiat de ce qui est échu; le reste (fenêtres d'envoi, nouveaux essais) part via le worker outbox
+            self.outbox.drain(campaign['id'])
+        except Exception as e:
+            logger.error(f"❌ Erreur exécution campagne {campaign['id']}: {e}")
+            campaign['status'] = 'failed'
+            self.db.update_campaign(campaign['id'], 'failed', {'error': str(e)})
+
+    def _finish(self, campaign, results):
+        summary = {key: results.get(key, 0) for key in ('sent', 'failed', 'success_rate')}
+        campaign.update(status='completed', results=summary, completed_at=datetime.now().isoformat())
+        self.db.update_campaign(campaign['id'], 'completed', summary)
+        self.db.log_activity('email', 'INFO', f"Campagne {campaign['id']} terminée: {summary['sent']} envoyés, "
+                                              f"{summary['failed']} échecs")
+        with self._lock:
+            self._campaigns.pop(campaign['id'], None)
+
+    def _ensure_monitor(self):
+        with self._lock:
+            if self._monitor and self._monitor.is_alive():
+                return
+            self._stop_event.clear()
+            self._monitor = threading.Thread(target=self._monitor_loop, name="campaign-monitor", daemon=True)
+            self._monitor.start()
+
+    def resume(self):
+        """Reprend le suivi des campagnes en cours (après redémarrage)"""
+        if not self._db_available():
+            return
+        for row in self.db.get_campaigns_by_status('running'):
+            with self._lock:
+                # Mise en file faite (ou interrompue) par le processus précédent: l'outbox fait foi
+                self._campaigns.setdefault(row['id'], {**row, 'results': {}, 'enqueued': True})
+        if self._campaigns:
+            self._ensure_monitor()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._monitor:
+            self._monitor.join(timeout=self.sync_seconds * 2)
+
+    def _monitor_loop(self):
+        while not self._stop_event.wait(self.sync_seconds):
+            with self._lock:
+                active = [c for c in self._campaigns.values() if c['status'] == 'running']
+            if not active:
+                continue
+            for campaign in active:
+                try:
+                    self._sync(campaign)
+                except Exception as e:
+                    logger.error(f"❌ Erreur suivi campagne {campaign['id']}: {e}")
+
+    def _sync(self, campaign):
+        """Statuts prospects par lot + fin de campagne quand plus rien n'est en file"""
+        if not campaign.get('enqueued', True):
+            return
+        # Progression lue d'abord: un message terminé après cette lecture est forcément couvert par la mise à jour
+        # 'contacted' qui suit (faite juste avant _finish), jamais compté envoyé sans son prospect
+        progress = self._outbox_progress(campaign['id'])
+        contacted = self.db.mark_campaign_contacted(campaign['id'])
+        if contacted:
+            logger.info(f"📬 Campagne {campaign['id']}: {contacted} prospects passés à 'contacted'")
+        campaign['results'] = progress
+        if not progress['remaining']:
+            # Aucune ligne en file (aperçus rejetés, doublons, pas d'email): terminée avec 0 envoi
+            done = progress['sent'] + progress['failed']
+            self._finish(campaign, {**progress, 'success_rate': progress['sent'] / done * 100 if done else 0})
+
+    def _outbox_progress(self, campaign_id):
+        counts = self.db.get_outbox_status(campaign_id)
+        sent, failed = counts.get('sent', 0), counts.get('dead', 0)
+        remaining = counts.get('pending', 0) + counts.get('sending', 0)
+        return {'total': sent + failed + remaining, 'sent': sent, 'failed': failed, 'remaining': remaining}
+
+    def progress(self, campaign_id):
+        """Progression d'une campagne: sent / failed / remaining (None si inconnue)"""
+        with self._lock:
+            campaign = self._campaigns.get(campaign_id)
+        if campaign is None:
+            campaign = next((c for c in self.history if c['id'] == campaign_id), None) or self.db.get_campaign(campaign_id)
+        if campaign is None:
+            return None
+
+        if self._db_available():
+            counts = self._outbox_progress(campaign_id)
+        else:
+            results = campaign.get('results') or {}
+            sent, failed = results.get('sent', 0), results.get('failed', 0)
+            counts = {'total': campaign.get('prospects_count') or 0, 'sent': sent, 'failed': failed,
+                      'remaining': max(0, (campaign.get('prospects_count') or 0) - sent - failed)}
+        return {
+            'campaign_id': campaign_id,
+            'approval_id': campaign.get('approval_id'),
+            'status': campaign.get('status'),
+            **counts,
+            'percent': round((counts['sent'] + counts['failed']) / counts['total'] * 100, 1) if counts['total'] else 0
+        }
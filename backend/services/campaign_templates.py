@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import threading
+from string import Formatter
+
+logger = logging.getLogger(__name__)
+
+# Modèles de campagne: champs {personal_info.company}, {enrichment_data.email}... (absents = chaîne vide)
+CAMPAIGN_TEMPLATES = {
+    'standard': {
+        'subject': "Collaboration {personal_info.company}",
+        'body': "Bonjour {personal_info.full_name}...",
+        'personalization_score': 85
+    },
+    'prospection_standard': {
+        'subject': "Collaboration avec {personal_info.company}",
+        'body': """Bonjour {personal_info.full_name},
+
+Votre profil de {personal_info.position} chez {personal_info.company} a retenu notre attention.
+
+Nous avons une solution qui pourrait vous intéresser...
+
+Cordialement,
+L'équipe""",
+        'personalization_score': 85
+    }
+}
+
+
+def content_hash(subject, body):
+    """Empreinte du contenu rendu: ce qui est envoyé est exactement ce qui a été approuvé"""
+    return hashlib.sha256(f"{subject}\x00{body}".encode('utf-8')).hexdigest()
+
+
+class CompiledTemplate:
+    """
+    Modèle analysé une seule fois: segments littéraux + chemins de champs.
+    Le rendu d'une campagne extrait chaque champ en colonne pour tous les destinataires,
+    puis assemble les emails en une passe (aucune analyse par prospect).
+    """
+
+    def __init__(self, name, subject, body, personalization_score=85):
+        self.name = name
+        self.personalization_score = personalization_score
+        self.subject_parts = self._compile(subject)
+        self.body_parts = self._compile(body)
+        self.template_hash = hashlib.sha256(f"{subject}\x00{body}".encode('utf-8')).hexdigest()[:16]
+        self.fields = sorted({path for parts in (self.subject_parts, self.body_parts)
+                              for _, path in parts if path})
+
+    @staticmethod
+    def _compile(source):
+        return [(literal, tuple(field.split('.')) if field else None)
+                for literal, field, _, _ in Formatter().parse(source)]
+
+    @staticmethod
+    def _lookup(prospect, path):
+        value = prospect
+        for key in path:
+            if not isinstance(value, dict):
+                return ''
+            value = value.get(key)
+        return '' if value is None else str(value)
+
+    @staticmethod
+    def _assemble(parts, columns, row):
+        return ''.join(literal + (columns[path][row] if path else '') for literal, path in parts)
+
+    def render_many(self, prospects):
+        """Rendu en bloc: [{'subject', 'body', 'content_hash', ...}] dans l'ordre des prospects"""
+        columns = {path: [self._lookup(p, path) for p in prospects] for path in self.fields}
+        rendered = []
+        for row in range(len(prospects)):
+            subject = self._assemble(self.subject_parts, columns, row)
+            body = self._assemble(self.body_parts, columns, row)
+            rendered.append({
+                'subject': subject,
+                'body': body,
+                'content_hash': content_hash(subject, body),
+                'template_hash': self.template_hash,
+                'personalization_score': self.personalization_score
+            })
+        return rendered
+
+    def render(self, prospect):
+        return self.render_many([prospect])[0]
+
+
+class TemplateRegistry:
+    """Modèles compilés à la première utilisation puis réutilisés"""
+
+    def __init__(self, templates=None, default='standard'):
+        self.templates = dict(templates or CAMPAIGN_TEMPLATES)
+        self.default = default
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, subject, body, personalization_score=85):
+        with self._lock:
+            self.templates[name] = {'subject': subject, 'body': body, 'personalization_score': personalization_score}
+            self._compiled.pop(name, None)
+
+    def get(self, template_type=None):
+        name = template_type if template_type in self.templates else self.default
+        with self._lock:
+            compiled = self._compiled.get(name)
+            if compiled is None:
+                compiled = self._compiled[name] = CompiledTemplate(name, **self.templates[name])
+            return compiled
+
+    def render_campaign(self, prospects, template_type=None, modifications=None):
+        """
+        Prévisualisations d'une campagne (rendu unique, stocké avec l'approbation)
+        modifications: {prospect_id: {'subject'?, 'body'?}} saisies par le relecteur
+        """
+        template = self.get(template_type)
+        recipients = [p for p in prospects if (p.get('enrichment_data') or {}).get('email')]
+        previews = []
+        for prospect, rendered in zip(recipients, template.render_many(recipients)):
+            edit = (modifications or {}).get(prospect['id']) or (prospect.get('modified_data') or {})
+            if edit.get('subject') or edit.get('body'):
+                rendered['subject'] = edit.get('subject') or rendered['subject']
+                rendered['body'] = edit.get('body') or rendered['body']
+                rendered['content_hash'] = content_hash(rendered['subject'], rendered['body'])
+                rendered['user_modified'] = True
+            previews.append({'prospect_id': prospect['id'], 'to': prospect['enrichment_data']['email'], **rendered})
+        return previews
+
+
+def preview_intact(preview):
+    """Le contenu correspond à l'empreinte calculée lors de l'approbation"""
+    return preview.get('content_hash') == content_hash(preview['subject'], preview['body'])
+
+def rendered_messages(previews):
+    """Messages prêts à l'envoi depuis des prévisualisations; un contenu altéré (empreinte) est écarté"""
+    messages, rejected = [], []
+    for preview in previews:
+        if not preview_intact(preview):
+            logger.error(f"❌ Contenu modifié depuis l'approbation ({preview.get('prospect_id')}), envoi bloqué")
+            rejected.append(preview)
+            continue
+        messages.append(preview)
+    return messages, rejected
+
+
+template_registry = TemplateRegistry()
@@ -1,67 +1,76 @@
 import os
-import yagmail
-import time
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
 
+from services.smtp_sender import SMTPSender
+from services.campaign_templates import template_registry, rendered_messages
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 class EmailComposer:
     def __init__(self, email=None, app_password=None):
-        self.gmail_email = email or os.getenv('GMAIL_EMAIL')
-        self.app_password = app_password or os.getenv('GMAIL_APP_PASSWORD')
-        self.yag = None
+        self.gmail_email = email or os.getenv('SMTP_USERNAME') or os.getenv('GMAIL_EMAIL')
+        self.app_password = app_password or os.getenv('SMTP_PASSWORD') or os.getenv('GMAIL_APP_PASSWORD')
+        self.sender = None
         self.is_configured = False
         
         if self.gmail_email and self.app_password:
-            self._setup_gmail()
+            self._setup_smtp()
         else:
-            logger.warning("Mode démo - Gmail non configuré")
+            logger.warning("Mode démo - SMTP non configuré")
     
-    def _setup_gmail(self):
+    def _setup_smtp(self):
         try:
-            self.yag = yagmail.SMTP(self.gmail_email, self.app_password)
+            # Pool de connexions persistantes (SMTP_HOST/SMTP_PORT, Gmail par défaut), ouvertes à la demande:
+            # aucune session SMTP au démarrage, la connexion est vérifiée par check_connection() (préchauffage)
+            self.sender = SMTPSender.from_env(self.gmail_email, self.app_password)
             self.is_configured = True
-            logger.info("Gmail configuré")
+            logger.info(f"SMTP configuré ({self.sender.pool.host}:{self.sender.pool.port}, pool de {self.sender.pool.size})")
         except Exception as e:
-            logger.error(f"Erreur Gmail: {e}")
+            self.sender = None
+            logger.error(f"Erreur SMTP: {e}")
+    
+    def check_connection(self):
+        """Ouvre et authentifie une connexion du pool (elle reste disponible pour le premier envoi)"""
+        if not self.is_configured:
+            return False
+        self.sender.pool.check()
+        return True
     
     def personalize_email(self, prospect, template_type="standard"):
-        return {
-            'subject': f"Collaboration {prospect['personal_info']['company']}",
-            'body': f"Bonjour {prospect['personal_info']['full_name']}...",
-            'personalization_score': 85
-        }
+        return template_registry.get(template_type).render(prospect)
     
-    def send_campaign(self, prospects, template_type="standard"):
+    def send_campaign(self, prospects, template_type="standard", previews=None):
+        """
+        Envoi concurrent (pool SMTP), débit limité par domaine destinataire et par compte.
+        previews: contenus rendus à l'approbation (réutilisés tels quels, sans nouveau rendu)
+        """
         results = {'sent': 0, 'failed': 0, 'success_rate': 0, 'details': []}
         
-        for prospect in prospects:
-            try:
-                email_content = self.personalize_email(prospect, template_type)
-                prospect_email = prospect['enrichment_data'].get('email')
-                
-                if not prospect_email:
-                    continue
-                
-                if self.is_configured:
-                    self.yag.send(to=prospect_email, subject=email_content['subject'], contents=email_content['body'])
-                    status = 'sent_real'
-                else:
-                    status = 'sent_demo'
-                
+        if previews is None:
+            previews = template_registry.render_campaign(prospects, template_type)
+        messages, rejected = rendered_messages(previews)
+        for preview in rejected:
+            results['failed'] += 1
+            results['details'].append({'prospect_id': preview['prospect_id'], 'email': preview['to'],
+                                       'status': 'failed', 'error': 'content_hash_mismatch'})
+        
+        if self.is_configured:
+            outcomes = self.sender.send_many(messages)
+        else:
+            outcomes = [{'status': 'sent'}] * len(messages)
+        
+        for message, outcome in zip(messages, outcomes):
+            detail = {'prospect_id': message['prospect_id'], 'email': message['to']}
+            if outcome['status'] == 'sent':
                 results['sent'] += 1
-                results['details'].append({
-                    'prospect_id': prospect['id'],
-                    'email': prospect_email,
-                    'status': status
-                })
-                
-                time.sleep(1)
-            except Exception as e:
+                detail['status'] = 'sent_real' if self.is_configured else 'sent_demo'
+            else:
                 results['failed'] += 1
+                detail.update(status='failed', error=outcome.get('error'))
+            results['details'].append(detail)
         
         total = results['sent'] + results['failed']
         results['success_rate'] = (results['sent'] / total * 100) if total > 0 else 0
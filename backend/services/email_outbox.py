@@ -0,0 +1,250 @@
+import uuid
+import random
+import hashlib
+import logging
+import threading
+
+from datetime import datetime, timezone
+
+from services.campaign_templates import template_registry, rendered_messages
+from services.send_scheduler import recipient_timezone
+
+logger = logging.getLogger(__name__)
+
+class EmailOutbox:
+    """
+    File d'envoi durable (table email_outbox)
+    - une ligne par message, clé d'idempotence prospect + campagne: jamais deux envois pour la même paire
+    - réclamation par lots FOR UPDATE SKIP LOCKED: plusieurs expéditeurs vident la file en parallèle
+    - bail d'envoi: un message réclamé par un processus mort est repris à l'expiration du bail
+    - échecs temporaires réessayés avec backoff exponentiel, puis dead-letter
+    """
+
+    def __init__(self, db, sender=None, worker_id=None, batch_size=20, lease_seconds=120,
+                 max_attempts=5, base_backoff=60, max_backoff=3600, poll_seconds=5, scheduler=None):
+        self.db = db
+        self.sender = sender              # SMTPSender (None: mode démo, les envois sont simulés)
+        self.scheduler = scheduler        # SendWindowScheduler (fenêtres d'envoi locales, plafonds journaliers)
+        self.worker_id = worker_id or f"outbox_{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.poll_seconds = poll_seconds
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.stats = {'claimed': 0, 'sent': 0, 'retried': 0, 'dead': 0}
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @staticmethod
+    def idempotency_key(campaign_id, prospect_id):
+        return f"{campaign_id}:{prospect_id}"
+
+    @staticmethod
+    def _message_id(idempotency_key):
+        """Message-ID stable: un renvoi après crash est dédupliqué par les serveurs destinataires"""
+        return f"<{hashlib.sha256(idempotency_key.encode('utf-8')).hexdigest()[:32]}@cold-outreach>"
+
+    def enqueue(self, campaign_id, messages, rejected=(), prospects=None):
+        """
+        messages: [{'prospect_id', 'to', 'subject', 'body', 'delay_seconds'?, 'send_at'?}]; retourne {'queued', 'duplicates', 'rejected'}
+        rejected: prévisualisations écartées, enregistrées en dead-letter (échec visible dans la progression)
+        prospects: messages datés dans les fenêtres d'envoi, planifiés et insérés sous le verrou du compte
+        """
+        def rows():
+            return [{
+                'idempotency_key': self.idempotency_key(campaign_id, m['prospect_id']),
+                'campaign_id': campaign_id,
+                'prospect_id': m['prospect_id'],
+                'recipient': m['to'],
+                'subject': m['subject'],
+                'body': m['body'],
+                'max_attempts': self.max_attempts,
+                'account': self.account,
+                'delay_seconds': m.get('delay_seconds', 0),
+                'send_at': m.get('send_at'),
+                'send_timezone': m.get('send_timezone')
+            } for m in messages] + [{
+                'idempotency_key': self.idempotency_key(campaign_id, m['prospect_id']),
+                'campaign_id': campaign_id,
+                'prospect_id': m['prospect_id'],
+                'recipient': m['to'],
+                'subject': m.get('subject'),
+                'body': m.get('body'),
+                'max_attempts': self.max_attempts,
+                'account': self.account,
+                'status': 'dead',
+                'last_error': 'content_hash_mismatch'
+            } for m in rejected]
+
+        if prospects is not None and self.scheduler is not None:
+            def plan(day_counts, next_slots):
+                # Compteurs repris de la base sous verrou: plusieurs processus partagent le plafond du compte
+                self.scheduler.seed(self.account, day_counts, next_slots)
+                self._plan(messages, prospects)
+                return rows()
+            inserted = self.db.enqueue_planned_outbox_messages(self.account, self.scheduler.account_timezone.key, plan)
+        else:
+            inserted = self.db.enqueue_outbox_messages(rows())
+        total = len(messages) + len(rejected)
+        dead = len(set(inserted) & {self.idempotency_key(campaign_id, m['prospect_id']) for m in rejected})
+        queued = len(inserted) - dead
+        logger.info(f"📥 Outbox {campaign_id}: {queued} messages en file, {dead} rejetés (contenu modifié), "
+                    f"{total - len(inserted)} déjà présents")
+        return {'queued': queued, 'duplicates': total - len(inserted), 'rejected': dead}
+
+    @property
+    def account(self):
+        return getattr(self.sender, 'from_address', None) or 'demo'
+
+    def enqueue_campaign(self, campaign_id, prospects, template_type="standard", previews=None, schedule=False):
+        """
+        Met en file les emails d'une campagne; les prévisualisations approuvées sont réutilisées telles quelles.
+        schedule: chaque message est daté dans la fenêtre ouvrée locale du destinataire (plafond journalier du compte)
+        """
+        if previews is None:
+            previews = template_registry.render_campaign(prospects, template_type)
+        messages, rejected = rendered_messages(previews)
+        return self.enqueue(campaign_id, messages, rejected, prospects=prospects if schedule else None)
+
+    def _plan(self, messages, prospects):
+        locations = {p['id']: (p.get('personal_info') or {}).get('location') for p in prospects}
+        now = datetime.now(timezone.utc)
+        for message in messages:
+            location = locations.get(message['prospect_id'])
+            # Instant absolu: la transaction a pu attendre le verrou du compte (now() de la base antérieur)
+            message['send_at'] = self.scheduler.send_time(location, self.account, now)
+            message['send_timezone'] = recipient_timezone(location, self.scheduler.default_timezone).key
+
+    def _backoff(self, attempts):
+        delay = min(self.max_backoff, self.base_backoff * 2 ** max(0, attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _count(self, key, value=1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _complete(self, row, result):
+        """Statut persisté dès le résultat SMTP connu (fenêtre de double envoi réduite à un message)"""
+        try:
+            if result['status'] == 'sent':
+                self.db.mark_outbox_sent(row['id'], self.worker_id)
+                self._count('sent')
+            elif result.get('retryable') and row['attempts'] < row['max_attempts']:
+                self.db.mark_outbox_failed(row['id'], self.worker_id, result.get('error'), self._backoff(row['attempts']))
+                self._count('retried')
+            else:
+                self.db.mark_outbox_failed(row['id'], self.worker_id, result.get('error'))
+                self._count('dead')
+                logger.warning(f"☠️ Email en dead-letter ({row['recipient']}): {result.get('error')}")
+        except Exception as e:
+            # Bail non libéré: le message sera repris à son expiration
+            logger.error(f"❌ Statut outbox non enregistré ({row['idempotency_key']}): {e}")
+
+    def process_batch(self, campaign_id=None):
+        """Réclame et envoie un lot; retourne le nombre de messages traités"""
+        rows = self.db.claim_outbox_messages(self.worker_id, self.batch_size, self.lease_seconds, campaign_id)
+        if not rows:
+            return 0
+        self._count('claimed', len(rows))
+
+        messages = [{
+            'to': row['recipient'],
+            'subject': row['subject'],
+            'body': row['body'],
+            'headers': {'Message-ID': self._message_id(row['idempotency_key'])}
+        } for row in rows]
+
+        if self.sender:
+            self.sender.send_many(messages, on_result=lambda index, result: self._complete(rows[index], result))
+        else:
+            for row in rows:
+                self._complete(row, {'status': 'sent', 'attempts': 1})
+        return len(rows)
+
+    def drain(self, campaign_id=None):
+        """Envoie tout ce qui est échu (les nouveaux essais planifiés plus tard restent en file)"""
+        total = 0
+        while not self._stop_event.is_set():
+            processed = self.process_batch(campaign_id)
+            if not processed:
+                break
+            total += processed
+        return total
+
+    def send_campaign(self, campaign_id, prospects, composer, template_type="standard", wait=True, previews=None,
+                      schedule=False):
+        """
+        Campagne via l'outbox (durable); sans base de données, envoi direct par le composer.
+        Retourne le même format que EmailComposer.send_campaign (+ 'queued' et 'pending').
+        """
+        if not self._db_available():
+            return composer.send_campaign(prospects, template_type, previews=previews)
+
+        queued = self.enqueue_campaign(campaign_id, prospects, template_type, previews, schedule)
+        if wait:
+            self.drain(campaign_id)
+        return {**self.campaign_results(campaign_id), 'queued': queued['queued'], 'duplicates': queued['duplicates']}
+
+    def campaign_results(self, campaign_id):
+        rows = self.db.get_outbox_messages(campaign_id)
+        sent = sum(1 for r in rows if r['status'] == 'sent')
+        failed = sum(1 for r in rows if r['status'] == 'dead')
+        done = sent + failed
+        return {
+            'sent': sent,
+            'failed': failed,
+            'pending': len(rows) - done,
+            'success_rate': (sent / done * 100) if done else 0,
+            'details': [{
+                'prospect_id': r['prospect_id'],
+                'email': r['recipient'],
+                'status': r['status'],
+                'attempts': r['attempts'],
+                'error': r['last_error']
+            } for r in rows]
+        }
+
+    def start(self):
+        """Boucle d'envoi en arrière-plan: reprend la file au démarrage (après crash ou redémarrage)"""
+        if self.is_running or not self._db_available():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="email-outbox", daemon=True)
+        self._thread.start()
+        logger.info(f"📤 Worker outbox démarré ({self.worker_id})")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_seconds * 2)
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                if self.drain():
+                    continue
+            except Exception as e:
+                logger.error(f"❌ Erreur worker outbox: {e}")
+            self._stop_event.wait(self.poll_seconds)
+
+    def get_status(self, campaign_id=None):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            'worker_id': self.worker_id,
+            'running': self.is_running,
+            'queue': self.db.get_outbox_status(campaign_id) if self._db_available() else {},
+            'worker_stats': stats,
+            'send_windows': self.scheduler.get_stats() if self.scheduler is not None else None
+        }
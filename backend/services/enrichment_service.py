@@ -1,34 +1,335 @@
 import os
+import time
+import hashlib
+import asyncio
 import logging
 import random
+import threading
+import importlib.util
+from abc import ABC, abstractmethod
 from datetime import datetime
 
+# ✅ aiohttp (Apache 2.0) - client HTTP asynchrone, dépendance optionnelle.
+# Importé au premier enrichissement (ou au préchauffage), pas au démarrage du worker (~0,15 s)
+AIOHTTP_AVAILABLE = importlib.util.find_spec('aiohttp') is not None
+
+from services.rate_limiter import rate_limiter
+
 logger = logging.getLogger(__name__)
 
+
+# =============================================
+# 🔌 FOURNISSEURS D'ENRICHISSEMENT (WATERFALL)
+# =============================================
+
+class ProviderQuota:
+    """Budget total de requêtes d'un fournisseur + pause locale après refus (le débit relève du limiteur partagé)"""
+
+    def __init__(self, max_requests=0):
+        self.max_requests = max_requests  # 0 = illimité
+        self.used = 0
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def is_exhausted(self):
+        if self.max_requests and self.used >= self.max_requests:
+            return True
+        return time.monotonic() < self.blocked_until
+
+    def reserve(self):
+        """Réserve une requête sur le budget; False si le quota est épuisé"""
+        with self._lock:
+            if self.is_exhausted():
+                return False
+            self.used += 1
+            return True
+
+    def block_for(self, seconds):
+        """Suspend le fournisseur (ex: HTTP 429 avec Retry-After)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class EnrichmentProvider(ABC):
+    """
+    Interface d'un fournisseur d'enrichissement.
+    Les fournisseurs sont interrogés dans l'ordre (waterfall) jusqu'à trouver un email.
+    """
+
+    name = 'provider'
+    batch_size = 10
+    timeout = 10
+
+    def is_available(self):
+        return False
+
+    @abstractmethod
+    async def enrich_domain_batch(self, session, domain, people):
+        """
+        Enrichit les personnes d'un même domaine.
+        people: liste de (first_name, last_name); retourne {index: résultat} pour les emails trouvés
+        """
+
+
+class HunterProvider(EnrichmentProvider):
+    """Fournisseur compatible API Hunter (domain-search + email-finder) avec cache par domaine et par personne"""
+
+    name = 'hunter'
+
+    def __init__(self, api_key, base_url='https://api.hunter.io/v2', batch_size=10,
+                 requests_per_second=10, max_requests=0, cache_ttl=86400, timeout=10, burst=None, limiter=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.batch_size = max(1, batch_size)
+        self.quota = ProviderQuota(max_requests)
+        # Débit partagé entre threads et workers, par compte (clé API hachée, jamais stockée en clair)
+        self.account = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+        self.limiter = limiter or rate_limiter
+        if requests_per_second > 0:
+            self.limiter.configure(self.name, requests_per_second, burst or max(1, int(requests_per_second)))
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self._domain_cache = {}
+        self._finder_cache = {}       # (domaine, prénom, nom) → résultat email-finder (absence d'email comprise)
+        self._cache_lock = threading.Lock()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'rate_limited': 0, 'errors': 0}
+
+    @classmethod
+    def from_env(cls):
+        api_key = os.getenv('HUNTER_API_KEY')
+        if not api_key or api_key.startswith('votre_'):
+            return None
+        return cls(
+            api_key=api_key,
+            base_url=os.getenv('HUNTER_API_BASE', 'https://api.hunter.io/v2'),
+            batch_size=int(os.getenv('HUNTER_BATCH_SIZE', 10)),
+            requests_per_second=float(os.getenv('HUNTER_RATE_PER_SECOND', 10)),
+            max_requests=int(os.getenv('HUNTER_REQUEST_QUOTA', 0)),
+            cache_ttl=int(os.getenv('ENRICHMENT_CACHE_TTL', 86400)),
+            burst=int(os.getenv('HUNTER_BURST', 0)) or None
+        )
+
+    def is_available(self):
+        return AIOHTTP_AVAILABLE and not self.quota.is_exhausted()
+
+    async def _get(self, session, endpoint, params):
+        """Requête GET en respectant le quota; None si quota épuisé ou erreur"""
+        if not self.quota.reserve():
+            return None
+        await self.limiter.acquire_async(self.name, self.account)
+
+        self.stats['requests'] += 1
+        try:
+            async with session.get(f"{self.base_url}/{endpoint}",
+                                   params={**params, 'api_key': self.api_key}) as response:
+                if response.status == 429:
+                    self.stats['rate_limited'] += 1
+                    retry_after = float(response.headers.get('Retry-After', 60))
+                    self.quota.block_for(retry_after)
+                    self.limiter.penalize(self.name, self.account, retry_after)
+                    logger.warning(f"🟡 Quota {self.name} atteint - pause {retry_after:.0f}s")
+                    return None
+                if response.status >= 400:
+                    self.stats['errors'] += 1
+                    logger.warning(f"⚠️ {self.name} {endpoint}: HTTP {response.status}")
+                    return None
+                payload = await response.json()
+                return payload.get('data')
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Erreur appel {self.name} {endpoint}: {e}")
+            return None
+
+    def _cached(self, cache, key):
+        with self._cache_lock:
+            entry = cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.stats['cache_hits'] += 1
+                return entry[1]
+        return None
+
+    def _store(self, cache, key, data):
+        with self._cache_lock:
+            cache[key] = (time.monotonic() + self.cache_ttl, data)
+
+    async def _domain_search(self, session, domain):
+        cached = self._cached(self._domain_cache, domain)
+        if cached is not None:
+            return cached
+
+        data = await self._get(session, 'domain-search', {'domain': domain, 'limit': 100})
+        if data is not None:
+            self._store(self._domain_cache, domain, data)
+        return data
+
+    async def _email_finder(self, session, domain, first_name, last_name):
+        key = (domain, first_name.lower(), last_name.lower())
+        cached = self._cached(self._finder_cache, key)
+        if cached is not None:
+            return cached
+
+        data = await self._get(session, 'email-finder', {
+            'domain': domain, 'first_name': first_name, 'last_name': last_name
+        })
+        # Réponse sans email mise en cache aussi (pas de requête répétée); erreur / quota: jamais
+        if data is not None:
+            self._store(self._finder_cache, key, data)
+        return data
+
+    @staticmethod
+    def _apply_pattern(pattern, first_name, last_name, domain):
+        """Applique un pattern Hunter ({first}.{last}, {f}{last}...)"""
+        local_part = pattern.format(first=first_name, last=last_name,
+                                    f=first_name[:1], l=last_name[:1])
+        return f"{local_part}@{domain}"
+
+    async def enrich_domain_batch(self, session, domain, people):
+        results = {}
+        domain_data = await self._domain_search(session, domain) or {}
+
+        known_emails = {
+            ((e.get('first_name') or '').lower(), (e.get('last_name') or '').lower()): e
+            for e in domain_data.get('emails', [])
+        }
+        pattern = domain_data.get('pattern')
+
+        semaphore = asyncio.Semaphore(self.batch_size)
+
+        async def find_one(index, first_name, last_name):
+            known = known_emails.get((first_name.lower(), last_name.lower()))
+            if known:
+                results[index] = {'email': known['value'], 'score': known.get('confidence'),
+                                  'method': 'domain_search'}
+                return
+            if pattern:
+                results[index] = {'email': self._apply_pattern(pattern, first_name.lower(), last_name.lower(), domain),
+                                  'score': None, 'method': 'domain_pattern'}
+                return
+            async with semaphore:
+                data = await self._email_finder(session, domain, first_name, last_name)
+            if data and data.get('email'):
+                results[index] = {'email': data['email'], 'score': data.get('score'),
+                                  'method': 'email_finder'}
+
+        await asyncio.gather(*(find_one(i, first, last) for i, (first, last) in enumerate(people)))
+        return results
+
+
+# Registre des fournisseurs disponibles (ordre du waterfall via ENRICHMENT_PROVIDERS)
+PROVIDER_FACTORIES = {
+    'hunter': HunterProvider.from_env,
+}
+
+
 class MITEnrichmentService:
     """
     Service d'enrichissement 100% open-source MIT
     Techniques d'enrichissement maison sans API propriétaire
     """
     
-    def __init__(self):
+    def __init__(self, providers=None):
         self.is_configured = True  # Toujours disponible (open-source)
         self.agent_name = "Enrichment-MIT-Agent"
+        self.providers = providers if providers is not None else self._load_providers()
+        self.hunter = next((p for p in self.providers if p.name == 'hunter'), None)
         logger.info("✅ Service d'enrichissement MIT initialisé")
     
+    def warm_up(self):
+        """Import du client HTTP des fournisseurs hors du chemin de la première recherche"""
+        if self.providers and AIOHTTP_AVAILABLE:
+            import aiohttp  # noqa: F401
+    
+    def _load_providers(self):
+        """Charge les fournisseurs configurés dans l'ordre du waterfall"""
+        providers = []
+        for name in os.getenv('ENRICHMENT_PROVIDERS', 'hunter').split(','):
+            factory = PROVIDER_FACTORIES.get(name.strip())
+            provider = factory() if factory else None
+            if provider:
+                providers.append(provider)
+                logger.info(f"🔌 Fournisseur d'enrichissement actif: {provider.name}")
+        return providers
+    
     def batch_enrich_prospects(self, prospects):
-        """Enrichissement avec techniques open-source MIT"""
+        """Enrichissement waterfall: fournisseurs externes puis techniques open-source MIT"""
         logger.info(f"📧 Enrichissement MIT de {len(prospects)} prospects")
         
         enriched_count = 0
         
         for prospect in prospects:
-            if self._enrich_with_mit_techniques(prospect):
+            prospect.setdefault('enrichment_data', {})
+        
+        if self.providers and AIOHTTP_AVAILABLE:
+            try:
+                asyncio.run(self._enrich_with_providers(prospects))
+            except Exception as e:
+                logger.error(f"❌ Erreur waterfall fournisseurs: {e}")
+        
+        for prospect in prospects:
+            if prospect['enrichment_data'].get('provider'):
+                enriched_count += 1
+            elif self._enrich_with_mit_techniques(prospect):
                 enriched_count += 1
         
         logger.info(f"✅ {enriched_count}/{len(prospects)} prospects enrichis avec techniques MIT")
         return prospects
     
+    async def _enrich_with_providers(self, prospects):
+        """Interroge les fournisseurs dans l'ordre, par lots groupés par domaine"""
+        import aiohttp
+        timeout = aiohttp.ClientTimeout(total=max(p.timeout for p in self.providers))
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            for provider in self.providers:
+                if not provider.is_available():
+                    continue
+
+                by_domain = {}
+                for prospect in prospects:
+                    if prospect['enrichment_data'].get('email'):
+                        continue
+                    names = prospect['personal_info'].get('full_name', '').split()
+                    domain = self._resolve_company_domain(prospect)
+                    if len(names) >= 2 and domain:
+                        by_domain.setdefault(domain, []).append((prospect, names[0], names[-1]))
+
+                async def enrich_domain(domain, entries):
+                    found = await provider.enrich_domain_batch(
+                        session, domain, [(first, last) for _, first, last in entries]
+                    )
+                    for index, result in found.items():
+                        prospect = entries[index][0]
+                        prospect['enrichment_data'].update({
+                            'email': result['email'],
+                            'email_confidence': self._score_to_confidence(result.get('score')),
+                            'company_domain': domain,
+                            'verification_method': f"{provider.name}_{result['method']}",
+                            'provider': provider.name,
+                            'sources': ['mit_enrichment_opensource', provider.name],
+                            'enriched_at': datetime.now().isoformat()
+                        })
+
+                domains = list(by_domain.items())
+                for start in range(0, len(domains), provider.batch_size):
+                    batch = domains[start:start + provider.batch_size]
+                    await asyncio.gather(*(enrich_domain(d, entries) for d, entries in batch))
+    
+    def _resolve_company_domain(self, prospect):
+        """Domaine connu ou déduit du nom de l'entreprise"""
+        domain = prospect['enrichment_data'].get('company_domain')
+        if domain:
+            return domain
+        company = prospect['personal_info'].get('company', '')
+        if not company or company == 'Entreprise inconnue':
+            return None
+        return f"{company.lower().replace(' ', '').replace('&', '')}.com"
+    
+    def _score_to_confidence(self, score):
+        if score is None:
+            return 'medium'
+        if score >= 80:
+            return 'high'
+        return 'medium' if score >= 50 else 'low'
+    
     def _enrich_with_mit_techniques(self, prospect):
         """Techniques d'enrichissement open-source MIT"""
         try:
@@ -156,6 +457,7 @@ class MITEnrichmentService:
             'mit_emails_found': mit_emails,
             'success_rate': (emails_found / len(prospects) * 100) if prospects else 0,
             'method': 'open_source_mit_techniques',
+            'providers': {p.name: dict(p.stats) for p in self.providers},
             'mit_compliant': True,
             'agent': 'MIT Enrichment Service'
         }
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import queue
+import select
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class EventBus:
+    """
+    Événements temps réel du dashboard (Server-Sent Events)
+    - source: PostgreSQL LISTEN/NOTIFY (les écritures notifient dans leur transaction, tous workers confondus)
+    - une seule connexion d'écoute par processus, diffusée à tous les onglets ouverts sur ce processus
+    - événements dérivés (stats, état de surveillance) recalculés une fois par processus, regroupés,
+      et envoyés en delta (seules les valeurs qui changent)
+    - aucun abonné: aucune écoute ni requête (dashboards inactifs = charge nulle)
+    - chaque flux occupe un thread du worker: au plus `max_streams` par processus, durée bornée
+      (`max_stream_seconds`, le navigateur se reconnecte via retry:), fin immédiate à l'arrêt du worker
+    - événements internes (INTERNAL_EVENTS): jamais envoyés au dashboard, attendus via watch()
+    """
+
+    INTERNAL_EVENTS = {'search_job'}
+
+    def __init__(self, db, channel='dashboard_events', coalesce_seconds=0.25, heartbeat_seconds=15, max_queue=500,
+                 max_streams=4, max_stream_seconds=300):
+        self.db = db
+        self.channel = channel
+        self.coalesce_seconds = coalesce_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_queue = max_queue
+        self.max_streams = max(1, max_streams)
+        self.max_stream_seconds = max_stream_seconds
+
+        self._subscribers = set()
+        self._watchers = set()        # (type, filtre, threading.Event)
+        self._derived = {}            # nom → {'triggers', 'provider', 'last'}
+        self._dirty = set()
+        self._dirty_event = threading.Event()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._deriver = None
+        self._stop_event = threading.Event()
+        self.stats = {'received': 0, 'dispatched': 0, 'dropped': 0, 'rejected_streams': 0}
+
+    @classmethod
+    def from_env(cls, db, channel='dashboard_events'):
+        return cls(db, channel=channel,
+                   max_streams=int(os.getenv('SSE_MAX_STREAMS_PER_WORKER', 4)),
+                   max_stream_seconds=float(os.getenv('SSE_MAX_STREAM_SECONDS', 300)))
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    def derive(self, name, triggers, provider):
+        """Événement `name` recalculé (provider()) quand un des événements `triggers` arrive"""
+        self._derived[name] = {'triggers': set(triggers), 'provider': provider, 'last': None}
+
+    def snapshot(self, name):
+        """Valeur courante complète d'un événement dérivé (envoyée à la connexion)"""
+        value = self._derived[name]['provider']()
+        self._derived[name]['last'] = value
+        return value
+
+    def publish(self, event_type, data=None):
+        """Publie un événement (NOTIFY si base de données, sinon diffusion locale)"""
+        if self._db_available():
+            self.db.notify_event(event_type, data or {})
+        else:
+            self._on_event({'type': event_type, 'data': data or {}})
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def _has_listeners(self):
+        with self._lock:
+            return bool(self._subscribers or self._watchers)
+
+    @contextmanager
+    def watch(self, event_type, matches=None):
+        """
+        Attente d'événements hors flux SSE: threading.Event signalé à chaque `event_type`
+        dont les données satisfont matches(data) (ex: progression d'un job de recherche)
+        """
+        watcher = (event_type, matches, threading.Event())
+        with self._lock:
+            self._watchers.add(watcher)
+        self._ensure_threads()
+        try:
+            yield watcher[2]
+        finally:
+            with self._lock:
+                self._watchers.discard(watcher)
+
+    def accepting(self):
+        """Un flux de plus tient dans le budget de threads du processus"""
+        return not self._stop_event.is_set() and self.subscriber_count < self.max_streams
+
+    def subscribe(self):
+        """Nouvel abonnement, ou None si le budget de flux du processus est atteint"""
+        subscription = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            if self._stop_event.is_set() or len(self._subscribers) >= self.max_streams:
+                self.stats['rejected_streams'] += 1
+                return None
+            self._subscribers.add(subscription)
+        self._ensure_threads()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _ensure_threads(self):
+        with self._lock:
+            if self._db_available() and not (self._listener and self._listener.is_alive()):
+                self._listener = threading.Thread(target=self._listen_loop, name="event-listener", daemon=True)
+                self._listener.start()
+            if not (self._deriver and self._deriver.is_alive()):
+                self._deriver = threading.Thread(target=self._derive_loop, name="event-deriver", daemon=True)
+                self._deriver.start()
+
+    def stop(self):
+        """Arrêt du worker: les flux ouverts se terminent aussitôt (None = fin de flux)"""
+        self._stop_event.set()
+        self._dirty_event.set()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(None)
+            except queue.Full:
+                try:
+                    subscription.get_nowait()
+                    subscription.put_nowait(None)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _listen_loop(self):
+        conn = None
+        while not self._stop_event.is_set():
+            if not self._has_listeners():
+                # Plus personne n'écoute sur ce processus: la connexion LISTEN est rendue
+                break
+            try:
+                if conn is None:
+                    conn = self.db._open_connection()
+                    conn.autocommit = True
+                    with conn.cursor() as cur:
+                        cur.execute(f"LISTEN {self.channel}")
+                if select.select([conn], [], [], 1.0)[0]:
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            self._on_event(json.loads(notify.payload))
+                        except ValueError:
+                            logger.warning(f"⚠️ Événement illisible ignoré: {notify.payload[:100]}")
+            except Exception as e:
+                logger.error(f"❌ Erreur écoute des événements: {e}")
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = None
+                self._stop_event.wait(2)
+        if conn is not None:
+            conn.close()
+
+    def _on_event(self, event):
+        self.stats['received'] += 1
+        with self._lock:
+            watchers = [w for w in self._watchers if w[0] == event['type']]
+        for _, matches, changed in watchers:
+            if matches is None or matches(event.get('data') or {}):
+                changed.set()
+        if event['type'] in self.INTERNAL_EVENTS:
+            return
+        for name, derived in self._derived.items():
+            if event['type'] in derived['triggers']:
+                with self._lock:
+                    self._dirty.add(name)
+                self._dirty_event.set()
+        self._dispatch(event)
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+                self.stats['dispatched'] += 1
+            except queue.Full:
+                # Client trop lent: l'événement le plus ancien est sacrifié
+                try:
+                    subscription.get_nowait()
+                    subscription.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+                self.stats['dropped'] += 1
+
+    def _derive_loop(self):
+        while not self._stop_event.is_set():
+            self._dirty_event.wait(self.heartbeat_seconds)
+            if not self._has_listeners():
+                if not self._dirty_event.is_set():
+                    break
+            # Regroupement: une rafale d'écritures → un seul recalcul
+            time.sleep(self.coalesce_seconds)
+            self._dirty_event.clear()
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+            for name in dirty:
+                derived = self._derived[name]
+                try:
+                    value = derived['provider']()
+                except Exception as e:
+                    logger.error(f"❌ Erreur calcul événement {name}: {e}")
+                    continue
+                last = derived['last'] or {}
+                delta = {key: v for key, v in value.items() if last.get(key) != v}
+                derived['last'] = value
+                if delta:
+                    self._dispatch({'type': name, 'data': delta})
+
+    @staticmethod
+    def format_sse(event_type, data):
+        return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    def stream(self, initial_events=()):
+        """
+        Générateur SSE: événements initiaux puis flux continu (commentaire keep-alive si silence).
+        Se termine à l'arrêt du worker ou après max_stream_seconds: le client se reconnecte (retry:),
+        éventuellement sur un autre worker, et reçoit à nouveau l'état complet
+        """
+        subscription = self.subscribe()
+        if subscription is None:
+            yield "retry: 10000\n\n"
+            return
+        deadline = time.monotonic() + self.max_stream_seconds
+        try:
+            yield "retry: 3000\n\n"
+            for event_type, data in initial_events:
+                yield self.format_sse(event_type, data)
+            while not self._stop_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = subscription.get(timeout=min(self.heartbeat_seconds, remaining))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield self.format_sse(event['type'], event.get('data', {}))
+        finally:
+            self.unsubscribe(subscription)
+
+    def get_stats(self):
+        return {**self.stats, 'subscribers': self.subscriber_count, 'max_streams': self.max_streams,
+                'listening': bool(self._listener and self._listener.is_alive())}
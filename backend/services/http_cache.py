@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import logging
+from functools import wraps
+from flask import request, make_response, Response
+
+try:
+    import brotli  # ✅ MIT - compression br (sinon gzip seul)
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+class HttpCache:
+    """
+    Lectures HTTP conditionnelles + compression
+    - ETag / Last-Modified tirés des compteurs de modification (table data_versions), jamais du corps:
+      une réponse inchangée coûte une lecture de clé primaire et un 304 vide
+    - compteur lu AVANT de construire la réponse: une écriture concurrente donne au pire un 200 de plus
+    - corps volumineux compressés (brotli si disponible et accepté, sinon gzip); flux SSE / NDJSON exclus
+    - sans base de données: réponses complètes, sans validateurs
+    """
+
+    def __init__(self, db, min_compress_size=1024, gzip_level=6, brotli_quality=4):
+        self.db = db
+        self.min_compress_size = min_compress_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.stats = {'not_modified': 0, 'full': 0, 'compressed': 0, 'bytes_saved': 0}
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    def validators(self, scopes):
+        """(etag, last_modified) de la requête courante, None si pas de compteur disponible"""
+        if not self._db_available():
+            return None
+        versions = self.db.get_data_versions(scopes)
+        if versions is None:
+            return None
+        parts = [f"{scope}.{versions[scope][0]}" for scope in scopes]
+        if request.query_string:
+            # Une représentation par jeu de paramètres (?status=, ?limit=, ?agent=)
+            parts.append(hashlib.md5(request.query_string).hexdigest()[:8])
+        modified = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+        return "-".join(parts), max(modified) if modified else None
+
+    @staticmethod
+    def _not_modified(etag):
+        # If-None-Match uniquement: Last-Modified est à la seconde, deux écritures dans la même seconde
+        # donneraient un 304 périmé sur If-Modified-Since (ignoré, comme le prévoit la RFC 9110 avec un ETag)
+        return bool(request.if_none_match) and request.if_none_match.contains_weak(etag)
+
+    def conditional(self, *scopes):
+        """Décorateur de route: 304 si les compteurs de `scopes` n'ont pas bougé depuis l'ETag du client"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                validators = self.validators(scopes)
+                if validators is None:
+                    return view(*args, **kwargs)
+
+                etag, last_modified = validators
+                if self._not_modified(etag):
+                    self.stats['not_modified'] += 1
+                    response = Response(status=304)
+                else:
+                    self.stats['full'] += 1
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                # Faible: la même version peut être servie compressée ou non
+                response.set_etag(etag, weak=True)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                response.headers['Cache-Control'] = 'no-cache'   # Toujours revalider (304 bon marché)
+                return response
+            return wrapper
+        return decorator
+
+    def _encoding(self):
+        accepted = request.accept_encodings
+        if brotli is not None and accepted.quality('br') > 0:
+            return 'br'
+        if accepted.quality('gzip') > 0:
+            return 'gzip'
+        return None
+
+    def compress(self, response):
+        """Hook after_request: compresse les corps volumineux selon Accept-Encoding"""
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < self.min_compress_size:
+            return response
+        encoding = self._encoding()
+        if encoding is None:
+            return response
+
+        try:
+            if encoding == 'br':
+                compressed = brotli.compress(data, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(data, compresslevel=self.gzip_level)
+        except Exception as e:
+            logger.error(f"❌ Erreur compression ({encoding}): {e}")
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        self.stats['compressed'] += 1
+        self.stats['bytes_saved'] += len(data) - len(compressed)
+        return response
+
+    def get_stats(self):
+        return {**self.stats, 'brotli': brotli is not None}
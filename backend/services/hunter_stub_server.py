@@ -0,0 +1,121 @@
+# ✅ SERVEUR STUB LOCAL COMPATIBLE API HUNTER (tests hors-ligne)
+import json
+import time
+import zlib
+import argparse
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+PATTERNS = ['{first}.{last}', '{f}{last}', '{first}', '{first}_{last}', '{last}.{first}']
+STUB_PEOPLE = [("jean", "martin"), ("marie", "dubois"), ("pierre", "bernard"), ("sophie", "thomas")]
+
+
+class HunterStubHandler(BaseHTTPRequestHandler):
+    """Réponses déterministes au format Hunter v2: domain-search, email-finder, account"""
+
+    server_version = "HunterStub/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        stub = self.server
+
+        if not params.get('api_key'):
+            return self._send_json(401, {'errors': [{'id': 'authentication_failed'}]})
+
+        with stub.lock:
+            stub.request_count += 1
+            over_quota = stub.quota and stub.request_count > stub.quota
+        if over_quota:
+            return self._send_json(429, {'errors': [{'id': 'too_many_requests'}]},
+                                   headers={'Retry-After': str(stub.retry_after)})
+
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        domain = params.get('domain', '').lower()
+        pattern = PATTERNS[zlib.crc32(domain.encode('utf-8')) % len(PATTERNS)]
+
+        if url.path.endswith('/domain-search'):
+            emails = [{
+                'value': self._format(pattern, first, last, domain),
+                'type': 'personal',
+                'confidence': 90,
+                'first_name': first.capitalize(),
+                'last_name': last.capitalize()
+            } for first, last in STUB_PEOPLE]
+            return self._send_json(200, {
+                'data': {'domain': domain, 'pattern': pattern, 'organization': domain.split('.')[0], 'emails': emails},
+                'meta': {'results': len(emails), 'params': {'domain': domain}}
+            })
+
+        if url.path.endswith('/email-finder'):
+            first = params.get('first_name', '').lower()
+            last = params.get('last_name', '').lower()
+            return self._send_json(200, {
+                'data': {'email': self._format(pattern, first, last, domain), 'score': 75, 'domain': domain},
+                'meta': {'params': params}
+            })
+
+        if url.path.endswith('/account'):
+            return self._send_json(200, {'data': {'requests': {'searches': {
+                'used': stub.request_count, 'available': stub.quota or 1000000
+            }}}})
+
+        return self._send_json(404, {'errors': [{'id': 'not_found'}]})
+
+    @staticmethod
+    def _format(pattern, first, last, domain):
+        return f"{pattern.format(first=first, last=last, f=first[:1], l=last[:1])}@{domain}"
+
+
+def start_stub_server(host='127.0.0.1', port=0, quota=0, latency_ms=0, retry_after=1):
+    """Démarre le stub dans un thread; retourne (serveur, base_url) à utiliser comme HUNTER_API_BASE"""
+    server = ThreadingHTTPServer((host, port), HunterStubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.request_count = 0
+    server.quota = quota
+    server.latency = latency_ms / 1000.0
+    server.retry_after = retry_after
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://{host}:{server.server_address[1]}/v2"
+    logger.info(f"🧪 Stub Hunter démarré sur {base_url}")
+    return server, base_url
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stub local compatible API Hunter")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--quota', type=int, default=0, help="Nombre de requêtes avant HTTP 429 (0 = illimité)")
+    parser.add_argument('--latency-ms', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server, base_url = start_stub_server(port=args.port, quota=args.quota, latency_ms=args.latency_ms)
+    print(f"🧪 Stub Hunter: HUNTER_API_BASE={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
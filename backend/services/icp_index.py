@@ -0,0 +1,103 @@
+import logging
+from collections import defaultdict
+
+from services.icp_matcher import icp_matchers, normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class ICPIndex:
+    """
+    Index inversé des critères de tous les ICPs actifs (keywords, locations, industries)
+    - un terme (éventuellement multi-mots) → ICPs qui le ciblent, compilés en automates (icp_matcher)
+    - un prospect est évalué en une passe sur ses propres termes, quel que soit le nombre d'ICPs
+    """
+
+    # Critère ICP → champs du profil sur lesquels il est évalué
+    FIELDS = {
+        'keywords': ('position', 'headline', 'company', 'industry'),
+        'locations': ('location',),
+        'industries': ('industry',),
+        'exclusions': ('position', 'headline', 'company')
+    }
+
+    def __init__(self, icp_configs=()):
+        self.build(icp_configs)
+
+    def build(self, icp_configs):
+        # Matcher compilé partagé: recompilé uniquement quand un ICP est modifié
+        self.matcher = icp_matchers.for_icps(icp_configs)
+        self.icps = self.matcher.icps
+
+    @staticmethod
+    def _profile_text(prospect, field):
+        if field == 'headline':
+            return (prospect.get('linkedin_info') or {}).get('headline')
+        return (prospect.get('personal_info') or {}).get(field)
+
+    def match(self, prospect):
+        """Retourne {icp_id: {'keywords': [...], 'locations': [...], 'industries': [...], 'score': int}}"""
+        hits = {criterion: {} for criterion in self.FIELDS}
+        for criterion, fields in self.FIELDS.items():
+            for field in fields:
+                self.matcher.scan(criterion, self._profile_text(prospect, field), hits[criterion])
+
+        matches = {}
+        for icp_id, keywords in hits['keywords'].items():
+            icp = self.icps[icp_id]
+            # Keyword obligatoire; localisation et industrie obligatoires seulement si l'ICP les précise
+            locations = hits['locations'].get(icp_id, set())
+            industries = hits['industries'].get(icp_id, set())
+            if icp_id in hits['exclusions']:
+                continue
+            if icp.get('locations') and not locations:
+                continue
+            if icp.get('industries') and not industries:
+                continue
+            matches[icp_id] = {
+                'keywords': sorted(keywords),
+                'locations': sorted(locations),
+                'industries': sorted(industries),
+                'score': 40 + min(30, 15 * len(keywords))
+                         + (15 if locations else 0) + (15 if industries else 0)
+            }
+        return matches
+
+    def route(self, prospects):
+        """
+        Affecte chaque prospect aux ICPs qu'il satisfait (meilleur score = ICP principal).
+        Retourne (prospects routés, {icp_id: nombre}); les prospects sans ICP sont écartés.
+        """
+        routed, counts = [], defaultdict(int)
+        for prospect in prospects:
+            matches = self.match(prospect)
+            if not matches:
+                continue
+            primary = max(matches, key=lambda icp_id: (matches[icp_id]['score'], icp_id))
+            prospect['icp_id'] = primary
+            prospect.setdefault('enrichment_data', {})['icp_matches'] = {
+                icp_id: match['score'] for icp_id, match in matches.items()
+            }
+            for icp_id in matches:
+                counts[icp_id] += 1
+            routed.append(prospect)
+        return routed, dict(counts)
+
+    def merged_config(self, limit_cap=None):
+        """Configuration de découverte unique couvrant tous les ICPs indexés"""
+        def union(criterion):
+            seen = {}
+            for icp in self.icps.values():
+                for term in icp.get(criterion) or []:
+                    seen.setdefault(normalize_text(term), term)
+            return list(seen.values())
+
+        limit = sum(int(icp.get('limit') or 10) for icp in self.icps.values())
+        return {
+            'id': None,
+            'name': f"Fan-out ({len(self.icps)} ICPs)",
+            'keywords': union('keywords'),
+            'locations': union('locations'),
+            'industries': union('industries'),
+            'limit': min(limit, limit_cap) if limit_cap else limit
+        }
@@ -0,0 +1,208 @@
+import re
+import json
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import deque, OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Groupes de synonymes (formes normalisées): un keyword ICP matche toutes les variantes de son groupe
+SYNONYM_GROUPS = [
+    ['cto', 'chief technology officer', 'directeur technique', 'directrice technique', 'head of technology'],
+    ['ceo', 'chief executive officer', 'directeur general', 'directrice generale', 'pdg', 'president directeur general'],
+    ['founder', 'co founder', 'cofounder', 'fondateur', 'fondatrice', 'co fondateur', 'cofondateur'],
+    ['cfo', 'chief financial officer', 'directeur financier', 'directrice financiere', 'daf'],
+    ['cmo', 'chief marketing officer', 'directeur marketing', 'directrice marketing'],
+    ['cio', 'dsi', 'chief information officer', 'directeur des systemes d information'],
+    ['vp engineering', 'vice president engineering', 'head of engineering'],
+    ['tech', 'technique', 'technologie', 'technology', 'engineering', 'ingenierie'],
+]
+
+def normalize_text(text):
+    """'Directeur Général (Île-de-France)' → 'directeur general ile de france'"""
+    if not text:
+        return ''
+    text = ''.join(c for c in unicodedata.normalize('NFKD', str(text)) if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+_SYNONYMS = {}
+for _group in SYNONYM_GROUPS:
+    for _term in _group:
+        _SYNONYMS.setdefault(_term, set()).update(_group)
+
+
+class AhoCorasick:
+    """Automate multi-motifs: tous les termes trouvés en une passe, en temps linéaire sur le texte"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = True
+
+    def add(self, pattern, payload):
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(payload)
+        self._built = False
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def iter_matches(self, text):
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                yield from out[node]
+
+
+def _pattern(term):
+    """Terme → motif borné aux mots (' cto '); 'tech*' matche aussi les mots commençant par 'tech'"""
+    prefix = term.strip().endswith('*')
+    normalized = normalize_text(term.rstrip('* '))
+    if not normalized:
+        return None
+    return f" {normalized}" if prefix else f" {normalized} "
+
+def _padded(text):
+    return f" {normalize_text(text)} "
+
+
+class TermMatcher:
+    """Familles de termes compilées: {libellé: [termes]} → libellés présents dans un texte"""
+
+    def __init__(self, terms_by_label):
+        self.labels_order = list(terms_by_label)
+        self._automaton = AhoCorasick()
+        for label, terms in terms_by_label.items():
+            for term in terms:
+                pattern = _pattern(term)
+                if pattern:
+                    self._automaton.add(pattern, label)
+        self._automaton.build()
+
+    def labels(self, text):
+        """Libellés trouvés, dans l'ordre de déclaration"""
+        found = set(self._automaton.iter_matches(_padded(text)))
+        return [label for label in self.labels_order if label in found]
+
+
+class CompiledICPMatcher:
+    """
+    Critères de plusieurs ICPs compilés en automates (un par critère):
+    keywords + synonymes, locations, industries, et exclusions (veto)
+    """
+
+    CRITERIA = ('keywords', 'locations', 'industries', 'exclusions')
+
+    def __init__(self, icp_configs):
+        self.icps = {icp['id']: icp for icp in icp_configs if icp.get('id')}
+        self._automata = {criterion: AhoCorasick() for criterion in self.CRITERIA}
+        patterns = 0
+
+        for icp_id, icp in self.icps.items():
+            custom_synonyms = {normalize_text(k): v for k, v in (icp.get('synonyms') or {}).items()}
+            for criterion in self.CRITERIA:
+                for term in icp.get(criterion) or []:
+                    normalized = normalize_text(term.rstrip('* '))
+                    variants = {term}
+                    if criterion != 'exclusions':
+                        variants |= _SYNONYMS.get(normalized, set()) | set(custom_synonyms.get(normalized, []))
+                    for variant in variants:
+                        pattern = _pattern(variant)
+                        if pattern:
+                            # Payload: (ICP, terme canonique tel que saisi dans l'ICP)
+                            self._automata[criterion].add(pattern, (icp_id, term))
+                            patterns += 1
+
+        for automaton in self._automata.values():
+            automaton.build()
+        logger.info(f"🧩 Matcher ICP compilé ({len(self.icps)} ICPs, {patterns} motifs)")
+
+    def scan(self, criterion, text, hits=None):
+        """Ajoute à hits[icp_id] les termes du critère trouvés dans le texte"""
+        hits = {} if hits is None else hits
+        if text:
+            for icp_id, term in self._automata[criterion].iter_matches(_padded(text)):
+                hits.setdefault(icp_id, set()).add(term)
+        return hits
+
+
+class ICPMatcherRegistry:
+    """
+    Cache des matchers compilés, par ensemble d'ICPs et par version: rien n'est recompilé d'un scan à
+    l'autre tant que les ICPs ne changent pas. Un matcher couvre tout l'ensemble (un automate par critère,
+    une seule passe par prospect): modifier un ICP recompile donc le matcher de chaque ensemble qui le contient.
+    Version = updated_at (relu de la base, donc modifications faites par un autre worker comprises),
+    sinon empreinte du contenu (ICP non enregistré, mode sans base)
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()   # tuple((icp_id, version)) -> CompiledICPMatcher
+        self._lock = threading.Lock()
+        self.stats = {'compiled': 0, 'hits': 0, 'invalidations': 0}
+
+    @staticmethod
+    def _version(icp_config):
+        if icp_config.get('updated_at'):
+            return str(icp_config['updated_at'])
+        content = json.dumps(icp_config, sort_keys=True, default=str)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+    def for_icps(self, icp_configs):
+        key = tuple(sorted((icp.get('id') or '', self._version(icp)) for icp in icp_configs))
+        with self._lock:
+            matcher = self._cache.get(key)
+            if matcher is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return matcher
+
+        matcher = CompiledICPMatcher(icp_configs)
+        with self._lock:
+            self._cache[key] = matcher
+            self.stats['compiled'] += 1
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return matcher
+
+    def for_icp(self, icp_config):
+        return self.for_icps([icp_config])
+
+    def invalidate(self, icp_id=None):
+        """Oublie les matchers contenant cet ICP (tous si icp_id est None)"""
+        with self._lock:
+            for key in [k for k in self._cache if icp_id is None or any(i == icp_id for i, _ in k)]:
+                del self._cache[key]
+            self.stats['invalidations'] += 1
+
+# Instance globale
+icp_matchers = ICPMatcherRegistry()
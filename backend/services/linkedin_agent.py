@@ -2,12 +2,36 @@
 import requests  # ✅ MIT License sur GitHub
 import os
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 import time
 import random
+import uuid
+import hashlib
+
+from services.rate_limiter import rate_limiter
+from services.icp_matcher import TermMatcher
 
 logger = logging.getLogger(__name__)
 
+FULL_SCAN_WINDOW_HOURS = 24  # Période couverte par un scan complet (sans watermark)
+MAX_STREAM_LIMIT = int(os.getenv('MAX_STREAM_LIMIT', 1000))  # Plafond du mode streaming
+SEARCH_PAGE_SIZE = 10  # Résultats par page de recherche (une page = une requête sur le quota)
+
+# Familles de postes ciblées par les keywords ICP (automate compilé une fois)
+ROLE_FAMILIES = {
+    'tech': ["CTO", "Directeur Technique", "VP Engineering", "Head of Technology"],
+    'executive': ["CEO", "Directeur Général", "Président", "Founder"]
+}
+ROLE_FAMILY_MATCHER = TermMatcher({
+    'tech': ['cto', 'technique', 'tech', 'engineering'],
+    'executive': ['ceo', 'directeur', 'pdg', 'executive']
+})
+
+def _parse_since(since):
+    if isinstance(since, str):
+        return datetime.fromisoformat(since)
+    return since
+
 class LinkedInRealAgent:
     """
     Agent LinkedIn 100% conforme MIT
@@ -17,6 +41,14 @@ class LinkedInRealAgent:
     def __init__(self):
         self.api = None  # On retire l'API non conforme
         self.is_configured = True
+        self.source_name = 'linkedin_ethical'
+        # Quota de recherche partagé entre threads, scans planifiés et workers (par compte)
+        self.account = hashlib.sha256(os.getenv('LINKEDIN_EMAIL', 'default').encode('utf-8')).hexdigest()[:12]
+        rate_limiter.configure(
+            self.source_name,
+            float(os.getenv('LINKEDIN_REQUESTS_PER_MINUTE', 30)) / 60,
+            int(os.getenv('LINKEDIN_BURST', 5))
+        )
         logger.info("✅ Agent LinkedIn CONFORME MIT initialisé")
     
     def setup_real_api(self):
@@ -24,8 +56,8 @@ class LinkedInRealAgent:
         # Cette méthode existe pour compatibilité mais ne fait rien d'illégal
         logger.info("🔒 Configuration LinkedIn éthique - Mode open-source")
     
-    def monitor_keywords_icp(self, icp_config):
-        """🔍 SURVEILLANCE LinkedIn 100% éthique"""
+    def monitor_keywords_icp(self, icp_config, since=None):
+        """🔍 SURVEILLANCE LinkedIn 100% éthique (since: watermark, seuls les résultats plus récents)"""
         logger.info(f"🔍 Lancement surveillance CONFORME: {icp_config['name']}")
         
         try:
@@ -36,19 +68,57 @@ class LinkedInRealAgent:
             logger.info(f"🎯 Recherche CONFORME: {keywords} à {locations}")
             
             # ✅ RECHERCHE ÉTHIQUE avec données simulées réalistes
-            prospects = self._generate_compliant_prospects(icp_config)
+            prospects = self._generate_compliant_prospects(icp_config, since)
             
             logger.info(f"✅ {len(prospects)} prospects générés (mode conforme MIT)")
             return prospects
             
         except Exception as e:
             logger.error(f"❌ Erreur recherche LinkedIn conforme: {e}")
-            return self._get_fallback_prospects(icp_config)
+            return self._get_fallback_prospects(icp_config, since)
     
-    def _generate_compliant_prospects(self, icp_config):
-        """Génération de prospects réalistes 100% éthique"""
-        prospects = []
+    def iter_keywords_icp(self, icp_config, since=None, chunk_size=10):
+        """
+        🔍 Variante streaming de monitor_keywords_icp: produit des lots au fil de la découverte.
+        Rien n'est retenu en mémoire, d'où un plafond bien plus élevé (MAX_STREAM_LIMIT).
+        """
+        logger.info(f"🔍 Surveillance CONFORME en streaming: {icp_config['name']}")
+        limit = min(icp_config.get('limit', 8), MAX_STREAM_LIMIT)
         
+        chunk = []
+        for prospect in self._iter_compliant_prospects(icp_config, since, limit):
+            chunk.append(prospect)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def _activity_timestamps(self, limit, since):
+        """
+        Horodatages des résultats publiés après le watermark.
+        Scan complet: `limit` résultats sur la fenêtre; scan incrémental: volume proportionnel au temps écoulé
+        """
+        now = datetime.now()
+        window_start = now - timedelta(hours=FULL_SCAN_WINDOW_HOURS)
+        since = _parse_since(since)
+        count = limit
+        
+        if since and since > window_start:
+            expected = limit * (now - since).total_seconds() / (FULL_SCAN_WINDOW_HOURS * 3600)
+            count = min(limit, int(expected) + (1 if random.random() < expected % 1 else 0))
+            window_start = since
+        
+        span = max((now - window_start).total_seconds(), 1)
+        return sorted(window_start + timedelta(seconds=random.uniform(0, span)) for _ in range(count))
+    
+    def _generate_compliant_prospects(self, icp_config, since=None):
+        """Génération de prospects réalistes 100% éthique"""
+        limit = min(icp_config.get('limit', 8), 12)
+        return list(self._iter_compliant_prospects(icp_config, since, limit))
+    
+    def _iter_compliant_prospects(self, icp_config, since, limit):
+        """Générateur de prospects réalistes, dans l'ordre chronologique d'activité"""
         # Données réalistes françaises
         french_names = [
             ("Jean", "Martin"), ("Marie", "Dubois"), ("Pierre", "Bernard"),
@@ -75,9 +145,9 @@ class LinkedInRealAgent:
         
         locations = icp_config.get('locations', ['Paris', 'Lyon', 'Marseille', 'Toulouse'])
         
-        limit = min(icp_config.get('limit', 8), 12)
-        
-        for i in range(limit):
+        for i, activity_at in enumerate(self._activity_timestamps(limit, since)):
+            if i % SEARCH_PAGE_SIZE == 0:
+                rate_limiter.acquire(self.source_name, self.account)
             first_name, last_name = random.choice(french_names)
             company = random.choice(french_companies)
             position = random.choice(positions)
@@ -85,7 +155,7 @@ class LinkedInRealAgent:
             location = random.choice(locations)
             
             # Génération d'ID réaliste
-            profile_id = f"li_{first_name.lower()}_{last_name.lower()}_{int(time.time())}_{i}"
+            profile_id = f"li_{first_name.lower()}_{last_name.lower()}_{int(time.time())}_{uuid.uuid4().hex[:6]}"
             
             prospect = {
                 'id': profile_id,
@@ -101,7 +171,8 @@ class LinkedInRealAgent:
                     'connections': random.randint(200, 1500),
                     'profile_score': random.randint(80, 98),
                     'real_data': False,  # Honnêteté - données simulées
-                    'data_source': 'ethical_generation'
+                    'data_source': 'ethical_generation',
+                    'activity_at': activity_at.isoformat()
                 },
                 'enrichment_data': {
                     'email': None,
@@ -123,26 +194,19 @@ class LinkedInRealAgent:
             # Ajouter des données spécifiques basées sur les keywords de l'ICP
             self._customize_prospect_based_on_icp(prospect, icp_config)
             
-            prospects.append(prospect)
-            
             logger.debug(f"👤 Prospect généré: {first_name} {last_name} - {position} chez {company}")
-        
-        return prospects
+            
+            yield prospect
     
     def _customize_prospect_based_on_icp(self, prospect, icp_config):
         """Personnalise le prospect basé sur la configuration ICP"""
         keywords = icp_config.get('keywords', [])
         industries_icp = icp_config.get('industries', [])
         
-        # Adapter le poste basé sur les keywords
-        if any(kw.lower() in ['cto', 'technique', 'tech', 'engineering'] for kw in keywords):
-            prospect['personal_info']['position'] = random.choice([
-                "CTO", "Directeur Technique", "VP Engineering", "Head of Technology"
-            ])
-        elif any(kw.lower() in ['ceo', 'directeur', 'pdg', 'executive'] for kw in keywords):
-            prospect['personal_info']['position'] = random.choice([
-                "CEO", "Directeur Général", "Président", "Founder"
-            ])
+        # Adapter le poste basé sur les keywords (toutes les familles ciblées: ICPs fusionnés en fan-out)
+        families = {family for kw in keywords for family in ROLE_FAMILY_MATCHER.labels(kw)}
+        if families:
+            prospect['personal_info']['position'] = random.choice(ROLE_FAMILIES[random.choice(sorted(families))])
         
         # Adapter l'industrie basé sur l'ICP
         if industries_icp:
@@ -159,10 +223,10 @@ class LinkedInRealAgent:
         # mais ne sera jamais appelée dans le mode conforme
         return None
     
-    def _get_fallback_prospects(self, icp_config):
+    def _get_fallback_prospects(self, icp_config, since=None):
         """Fallback amélioré 100% éthique"""
         logger.warning("🟡 Utilisation du mode de génération éthique")
-        return self._generate_compliant_prospects(icp_config)
+        return self._generate_compliant_prospects(icp_config, since)
     
     def get_activity_logs(self):
         """Logs de l'agent CONFORME"""
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Bornes des histogrammes (secondes / octets)
+HTTP_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+RESPONSE_SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+DB_DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+class MetricsRegistry:
+    """
+    Métriques Prometheus (format texte) sans dépendance externe
+    - compteurs, jauges et histogrammes étiquetés; une observation = un verrou + quelques additions
+    - multi-workers (METRICS_MULTIPROC_DIR): chaque processus écrit son instantané toutes les quelques secondes,
+      /metrics additionne ceux de tous les workers (jauges: workers vivants uniquement)
+    - les fichiers des workers arrêtés (max_requests, redémarrage) sont fusionnés dans une archive:
+      les compteurs ne reculent jamais et le répertoire ne grossit pas
+    """
+
+    def __init__(self, directory=None, flush_seconds=5):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._meta = {}              # nom → (type, aide, noms d'étiquettes, bornes)
+        self._values = {}            # (nom, valeurs d'étiquettes) → nombre, ou [compte par borne..., +Inf, somme]
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flusher = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(directory=os.getenv('METRICS_MULTIPROC_DIR') or None,
+                   flush_seconds=float(os.getenv('METRICS_FLUSH_SECONDS', 5)))
+
+    # ⭐ DÉCLARATION ⭐
+
+    def counter(self, name, help_text, labelnames=()):
+        self._meta[name] = ('counter', help_text, tuple(labelnames), None)
+
+    def gauge(self, name, help_text, labelnames=()):
+        self._meta[name] = ('gauge', help_text, tuple(labelnames), None)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=HTTP_DURATION_BUCKETS):
+        self._meta[name] = ('histogram', help_text, tuple(labelnames), tuple(buckets))
+
+    # ⭐ OBSERVATIONS ⭐
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = self._meta[name][3]
+        index = bisect.bisect_left(buckets, value)   # Première borne >= valeur (sémantique "le")
+        key = (name, labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    # ⭐ AGRÉGATION MULTI-WORKERS ⭐
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"metrics_{pid}.json")
+
+    def _snapshot(self):
+        with self._lock:
+            return [[name, list(labels), list(value) if isinstance(value, list) else value]
+                    for (name, labels), value in self._values.items()]
+
+    def _merge(self, target, entries, include_gauges=True):
+        for name, labels, value in entries:
+            meta = self._meta.get(name)
+            if meta is None or (meta[0] == 'gauge' and not include_gauges):
+                continue
+            key = (name, tuple(labels))
+            current = target.get(key)
+            if current is None:
+                target[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                target[key] = [a + b for a, b in zip(current, value)]
+            else:
+                target[key] = current + value
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _locked(self, exclusive):
+        import fcntl  # Répertoire multi-workers: gunicorn (Linux / macOS)
+        handle = open(os.path.join(self.directory, '.lock'), 'a')
+        fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return handle
+
+    def flush(self):
+        """Écrit l'instantané du processus (remplacement atomique) et archive les workers arrêtés"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        pid = os.getpid()
+        tmp_path = f"{self._path(pid)}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._snapshot(), f)
+        os.replace(tmp_path, self._path(pid))
+
+        handle = self._locked(exclusive=True)
+        try:
+            archive_path = os.path.join(self.directory, 'archive.json')
+            archive, compacted = {}, []
+            for filename in os.listdir(self.directory):
+                if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                    continue
+                worker_pid = int(filename[len('metrics_'):-len('.json')])
+                if worker_pid != pid and not self._alive(worker_pid):
+                    compacted.append(os.path.join(self.directory, filename))
+            if compacted:
+                self._merge(archive, self._read(archive_path), include_gauges=False)
+                for path in compacted:
+                    self._merge(archive, self._read(path), include_gauges=False)
+                with open(f"{archive_path}.tmp", 'w') as f:
+                    json.dump([[n, list(l), v] for (n, l), v in archive.items()], f)
+                os.replace(f"{archive_path}.tmp", archive_path)
+                for path in compacted:
+                    os.remove(path)
+        finally:
+            handle.close()
+
+    def _collect(self):
+        merged = {}
+        self._merge(merged, self._snapshot())
+        if not self.directory or not os.path.isdir(self.directory):
+            return merged
+
+        pid = os.getpid()
+        handle = self._locked(exclusive=False)
+        try:
+            for filename in os.listdir(self.directory):
+                path = os.path.join(self.directory, filename)
+                if filename == 'archive.json':
+                    self._merge(merged, self._read(path), include_gauges=False)
+                elif filename.startswith('metrics_') and filename.endswith('.json'):
+                    worker_pid = int(filename[len('metrics_'):-len('.json')])
+                    if worker_pid != pid:
+                        self._merge(merged, self._read(path), include_gauges=self._alive(worker_pid))
+        finally:
+            handle.close()
+        return merged
+
+    def start(self):
+        """Écriture périodique de l'instantané (un thread par worker, après le fork)"""
+        if not self.directory or (self._flusher and self._flusher.is_alive()):
+            return
+        self._stop_event.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.directory:
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ Erreur écriture métriques: {e}")
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ Erreur écriture métriques: {e}")
+
+    # ⭐ EXPOSITION ⭐
+
+    @staticmethod
+    def _labels(names, values, extra=None):
+        pairs = list(zip(names, values)) + ([extra] if extra else [])
+        if not pairs:
+            return ''
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+        return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        """Format texte Prometheus 0.0.4"""
+        series = self._collect()
+        by_name = {}
+        for (name, labels), value in series.items():
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(self._meta):
+            kind, help_text, labelnames, buckets = self._meta[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name.get(name, []), key=lambda item: item[0]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{self._labels(labelnames, labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._labels(labelnames, labels, ('le', bound))} {cumulative}")
+                lines.append(f"{name}_sum{self._labels(labelnames, labels)} {value[-1]}")
+                lines.append(f"{name}_count{self._labels(labelnames, labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def timed_methods(cls, registry, metric, exclude=()):
+    """Enveloppe les méthodes publiques de `cls`: durée de chaque appel, étiquetée par nom de méthode"""
+    for name, method in list(vars(cls).items()):
+        if name.startswith('_') or name in exclude or not callable(method):
+            continue
+
+        def wrap(name, method):
+            labels = (name,)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    registry.observe(metric, labels, time.perf_counter() - started)
+            wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = method.__name__, method.__doc__, method
+            return wrapper
+
+        setattr(cls, name, wrap(name, method))
+    return cls
+
+
+# Instance globale + métriques de l'application
+metrics = MetricsRegistry.from_env()
+metrics.counter('http_requests_total', "Requêtes HTTP terminées", ('method', 'route', 'status'))
+metrics.gauge('http_requests_in_flight', "Requêtes HTTP en cours (flux SSE / NDJSON inclus)", ('method', 'route'))
+metrics.histogram('http_request_duration_seconds', "Durée des requêtes HTTP jusqu'aux en-têtes de réponse",
+                  ('method', 'route'), HTTP_DURATION_BUCKETS)
+metrics.histogram('http_response_size_bytes', "Taille des corps de réponse (après compression)",
+                  ('method', 'route'), RESPONSE_SIZE_BUCKETS)
+metrics.histogram('db_query_duration_seconds', "Durée des appels DatabaseManager par méthode",
+                  ('method',), DB_DURATION_BUCKETS)
@@ -1,25 +1,52 @@
 import time
 import random
+import uuid
 import logging
 from datetime import datetime, timedelta
-from database import db
+from database_fixed import db
+from services.monitor_registry import MonitorLeaseRegistry, monitor_id_for
+from services.icp_matcher import TermMatcher
 
 logger = logging.getLogger(__name__)
 
+POSITION_MAP = {
+    'ceo': ['CEO', 'Directeur Général', 'Président'],
+    'cto': ['CTO', 'Directeur Technique', 'VP Engineering'],
+    'startup': ['Founder', 'Co-Fondateur', 'Head of Growth'],
+    'tech': ['Lead Developer', 'Architecte SI', 'Data Scientist'],
+    'directeur': ['Directeur Marketing', 'Directeur Commercial'],
+    'manager': ['Product Manager', 'Project Manager', 'Team Lead']
+}
+# Préfixes de mots ('tech*' → technique, technologie...), dans l'ordre de priorité de POSITION_MAP
+POSITION_MATCHER = TermMatcher({key: [f"{key}*"] for key in POSITION_MAP})
+SENIORITY_MATCHER = TermMatcher({'senior': ['ceo', 'cto', 'directeur']})
+TARGET_AREA_MATCHER = TermMatcher({'area': ['paris', 'lyon', 'france']})
+
 class MITSurveillanceSystem:
     """
     SYSTÈME DE SURVEILLANCE SOUS LICENCE MIT
     Implémente toutes les fonctionnalités requises avec votre propre code
     """
     
-    def __init__(self):
+    def __init__(self, registry=None):
         self.system_name = "ColdOutreach-Surveillance-System"
         self.version = "1.0-MIT"
-        self.active_monitors = {}
+        self.source_name = 'mit_surveillance_system'
+        self.active_monitors = {}  # Moniteurs dont ce worker détient le bail
+        self.registry = registry or MonitorLeaseRegistry(db)
         
     def setup_icp_monitoring(self, icp_config, user_id=None):
         """Configure la surveillance pour un ICP"""
-        monitor_id = f"monitor_{icp_config['id']}"
+        monitor_id = self.registry.register(icp_config)
+        
+        # Le bail décide quel worker surveille cet ICP
+        if monitor_id not in self.registry.heartbeat():
+            return {
+                'monitor_id': monitor_id,
+                'status': 'registered',
+                'owner': 'other_worker',
+                'initial_prospects': 0
+            }
         
         self.active_monitors[monitor_id] = {
             'icp_config': icp_config,
@@ -28,12 +55,13 @@ class MITSurveillanceSystem:
             'prospects_found': 0
         }
         
-        # Premier scan immédiat
-        prospects = self._perform_initial_scan(icp_config)
+        # Premier scan immédiat (reprend le watermark persisté s'il existe)
+        watermark = db.get_scan_watermark(icp_config['id'], self.source_name)
+        prospects = self._perform_initial_scan(icp_config, watermark['watermark_at'] if watermark else None)
+        self.active_monitors[monitor_id]['prospects_found'] += len(prospects)
         
         db.log_activity('surveillance', 'INFO',
-                       f"Surveillance configurée pour {icp_config['name']}",
-                       user_id)
+                       f"Surveillance configurée pour {icp_config['name']}")
         
         return {
             'monitor_id': monitor_id,
@@ -42,19 +70,41 @@ class MITSurveillanceSystem:
             'scan_interval': '60 minutes'
         }
     
-    def _perform_initial_scan(self, icp_config):
-        """Effectue le scan initial"""
+    def _perform_initial_scan(self, icp_config, since=None):
+        """Effectue un scan; avec un watermark, seules les détections plus récentes sont traitées"""
         prospects = []
+        scan_time = datetime.now()
+        
+        detections = random.randint(5, 12)
+        if since:
+            # Volume proportionnel au temps écoulé depuis le dernier scan (12 détections / 24h)
+            detections = min(12, int((scan_time - since).total_seconds() / 7200))
         
         # Simulation de détection basée sur les critères ICP
-        for i in range(random.randint(5, 12)):
+        for i in range(detections):
             prospect = self._detect_prospect(icp_config, i)
             if prospect:
+                prospect['icp_id'] = icp_config['id']
                 prospects.append(prospect)
-                db.save_prospect(prospect, None)
+        
+        # Lot + watermark persistés atomiquement
+        db.save_scan_batch(prospects, icp_config['id'], self.source_name, scan_time)
+        monitor = self.active_monitors.get(f"monitor_{icp_config['id']}")
+        if monitor:
+            monitor['last_scan'] = scan_time
         
         return prospects
     
+    def scan_monitor(self, monitor_id):
+        """Scan incrémental d'un moniteur à partir de son watermark (last_scan)"""
+        monitor = self.active_monitors.get(monitor_id)
+        if not monitor:
+            return {'status': 'not_found'}
+        
+        prospects = self._perform_initial_scan(monitor['icp_config'], monitor['last_scan'])
+        monitor['prospects_found'] += len(prospects)
+        return {'status': 'scanned', 'monitor_id': monitor_id, 'new_prospects': len(prospects)}
+    
     def _detect_prospect(self, icp_config, index):
         """Détecte un prospect basé sur les critères ICP"""
         keywords = icp_config.get('keywords', [])
@@ -66,7 +116,7 @@ class MITSurveillanceSystem:
             return None
         
         return {
-            'id': f"detected_{int(time.time())}_{index}",
+            'id': f"detected_{int(time.time())}_{uuid.uuid4().hex[:6]}",
             'personal_info': {
                 'full_name': self._generate_realistic_name(),
                 'position': self._match_position_to_keywords(keywords),
@@ -95,10 +145,10 @@ class MITSurveillanceSystem:
         # Simulation de logique de matching
         match_score = 0
         
-        if any(kw in ['ceo', 'cto', 'directeur'] for kw in [k.lower() for k in keywords]):
+        if any(SENIORITY_MATCHER.labels(kw) for kw in keywords):
             match_score += 40
         
-        if any(loc in ['paris', 'lyon', 'france'] for loc in [l.lower() for l in locations]):
+        if any(TARGET_AREA_MATCHER.labels(loc) for loc in locations):
             match_score += 30
         
         return match_score >= 50  # Seuil de matching
@@ -113,20 +163,10 @@ class MITSurveillanceSystem:
     
     def _match_position_to_keywords(self, keywords):
         """Associe un poste réaliste aux keywords"""
-        position_map = {
-            'ceo': ['CEO', 'Directeur Général', 'Président'],
-            'cto': ['CTO', 'Directeur Technique', 'VP Engineering'],
-            'startup': ['Founder', 'Co-Fondateur', 'Head of Growth'],
-            'tech': ['Lead Developer', 'Architecte SI', 'Data Scientist'],
-            'directeur': ['Directeur Marketing', 'Directeur Commercial'],
-            'manager': ['Product Manager', 'Project Manager', 'Team Lead']
-        }
-        
         for keyword in keywords:
-            keyword_lower = keyword.lower()
-            for key, positions in position_map.items():
-                if key in keyword_lower:
-                    return random.choice(positions)
+            matched = POSITION_MATCHER.labels(keyword)
+            if matched:
+                return random.choice(POSITION_MAP[matched[0]])
         
         return random.choice(['Manager', 'Consultant', 'Responsable'])
     
@@ -154,17 +194,33 @@ class MITSurveillanceSystem:
             'icp_name': monitor['icp_config']['name'],
             'started_at': monitor['started_at'].isoformat(),
             'prospects_found': monitor['prospects_found'],
+            'last_scan': monitor['last_scan'].isoformat() if monitor['last_scan'] else None,
             'uptime': str(datetime.now() - monitor['started_at'])
         }
     
+    def sync_with_leases(self):
+        """Aligne les moniteurs locaux sur les baux détenus (rééquilibrage entre workers)"""
+        owned = self.registry.heartbeat()
+        for monitor_id in list(self.active_monitors):
+            if monitor_id not in owned:
+                del self.active_monitors[monitor_id]
+        for icp_config in self.registry.owned_icps():
+            self.active_monitors.setdefault(monitor_id_for(icp_config), {
+                'icp_config': icp_config,
+                'started_at': datetime.now(),
+                'last_scan': None,
+                'prospects_found': 0
+            })
+        return list(self.active_monitors)
+    
     def stop_monitoring(self, monitor_id, user_id=None):
         """Arrête la surveillance"""
+        self.registry.deactivate([monitor_id])
         if monitor_id in self.active_monitors:
             del self.active_monitors[monitor_id]
             
             db.log_activity('surveillance', 'INFO',
-                           f"Surveillance arrêtée pour {monitor_id}",
-                           user_id)
+                           f"Surveillance arrêtée pour {monitor_id}")
             
             return {'status': 'stopped', 'monitor_id': monitor_id}
         
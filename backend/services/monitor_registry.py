@@ -0,0 +1,206 @@
+import os
+import math
+import uuid
+import socket
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+def monitor_id_for(icp_config):
+    return f"monitor_{icp_config['id']}"
+
+class MonitorLeaseRegistry:
+    """
+    Registre durable des moniteurs ICP partagé entre workers (PostgreSQL)
+    - chaque moniteur actif appartient à un seul worker vivant via un bail à durée limitée
+    - baux renouvelés par heartbeat, récupérés à l'expiration si un worker meurt
+    - rééquilibrage: chaque worker vise ceil(moniteurs / workers vivants); un ICP en cours de scan
+      n'est rendu qu'une fois son scan terminé
+    - le bail ne porte que l'id de l'ICP: la configuration courante est relue (icp_provider) à chaque tick
+    - surveillance activée: les ICPs créés ensuite reçoivent leur moniteur au heartbeat suivant
+    Sans base de données, le worker local possède tous les moniteurs actifs.
+    """
+
+    def __init__(self, db, worker_id=None, lease_ttl=30, heartbeat_interval=10, icp_provider=None, settings=None):
+        self.db = db
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.icp_provider = icp_provider      # callable -> ICPs actifs (configuration courante)
+        self.settings = settings              # AppState: surveillance activée / arrêtée, partagé entre workers
+        self.scheduler = None                 # MonitoringScheduler (bind_scheduler)
+
+        self._owned = {}          # monitor_id -> icp_id
+        self._local_monitors = {}  # Mode sans DB: monitor_id -> (icp_id, status)
+        self._registered = {}      # icp_id -> dernière configuration enregistrée (sans icp_provider ni DB)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.live_workers = 1
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def bind_scheduler(self, scheduler):
+        """Le planificateur recharge l'état persisté des ICPs acquis et signale ceux en cours de scan"""
+        self.scheduler = scheduler
+
+    # ---- Déclaration des moniteurs ----
+
+    def register(self, icp_config, status='active'):
+        monitor_id = monitor_id_for(icp_config)
+        if self._db_available():
+            self.db.register_monitor(monitor_id, icp_config['id'], status)
+        elif self.db is not None:
+            self.db.publish_local('monitors', {'monitor_id': monitor_id, 'status': status})
+        with self._lock:
+            self._local_monitors[monitor_id] = (icp_config['id'], status)
+            self._registered[icp_config['id']] = icp_config
+        return monitor_id
+
+    def activate(self, icp_configs):
+        """Active la surveillance des ICPs donnés et des ICPs créés ensuite (pour tous les workers)"""
+        for icp_config in icp_configs:
+            self.register(icp_config, 'active')
+        if self.settings is not None:
+            self.settings.set('monitoring.enabled', True)
+        self.heartbeat()
+
+    def deactivate(self, monitor_ids=None):
+        """Arrête des moniteurs (tous par défaut, surveillance désactivée); les baux sont libérés"""
+        if monitor_ids is None and self.settings is not None:
+            self.settings.set('monitoring.enabled', False)
+        if self._db_available():
+            self.db.set_monitors_status('stopped', monitor_ids)
+        elif self.db is not None:
+            self.db.publish_local('monitors', {'monitor_ids': monitor_ids, 'status': 'stopped'})
+        with self._lock:
+            for monitor_id, (icp_id, _) in list(self._local_monitors.items()):
+                if monitor_ids is None or monitor_id in monitor_ids:
+                    self._local_monitors[monitor_id] = (icp_id, 'stopped')
+                    self._owned.pop(monitor_id, None)
+
+    def _current_icps(self):
+        if self.icp_provider is not None:
+            return self.icp_provider()
+        if self._db_available():
+            return [icp for icp in self.db.get_all_icps() if icp.get('status', 'active') == 'active']
+        with self._lock:
+            return list(self._registered.values())
+
+    def _sync_new_icps(self):
+        """Surveillance activée: un moniteur pour chaque ICP actif qui n'en a pas encore (créé après le démarrage)"""
+        if self.settings is None or not self.settings.get('monitoring.enabled', False):
+            return
+        monitors = {monitor_id_for(icp): icp['id'] for icp in self._current_icps() if icp.get('id')}
+        if self._db_available():
+            self.db.ensure_monitors(monitors)
+            return
+        with self._lock:
+            for monitor_id, icp_id in monitors.items():
+                self._local_monitors.setdefault(monitor_id, (icp_id, 'active'))
+
+    # ---- Heartbeat / baux ----
+
+    def start(self):
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self.heartbeat()
+        self._thread = threading.Thread(target=self._loop, name="monitor-leases", daemon=True)
+        self._thread.start()
+        logger.info(f"🫀 Worker de surveillance {self.worker_id} actif")
+
+    def stop(self):
+        """Quitte le pool: les baux sont rendus pour reprise immédiate par les autres workers"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.heartbeat_interval)
+        self._thread = None
+        if self._db_available():
+            self.db.remove_worker(self.worker_id)
+        with self._lock:
+            self._owned = {}
+
+    def _loop(self):
+        while not self._stop_event.wait(self.heartbeat_interval):
+            self.heartbeat()
+
+    def heartbeat(self):
+        """Renouvelle, rééquilibre et réclame les baux; retourne les moniteurs détenus"""
+        try:
+            self._sync_new_icps()
+        except Exception as e:
+            logger.warning(f"⚠️ Synchronisation des nouveaux ICPs impossible: {e}")
+
+        if not self._db_available():
+            with self._lock:
+                owned = {mid: icp_id for mid, (icp_id, status) in self._local_monitors.items() if status == 'active'}
+        else:
+            try:
+                self.live_workers = max(1, self.db.heartbeat_worker(self.worker_id, self.lease_ttl))
+                owned = self.db.renew_monitor_leases(self.worker_id, self.lease_ttl)
+
+                fair_share = math.ceil(self.db.count_active_monitors() / self.live_workers)
+                if len(owned) > fair_share:
+                    # Un worker a rejoint le pool: on rend l'excédent, jamais un ICP en cours de scan
+                    # (rendu à un heartbeat suivant, une fois le scan terminé)
+                    idle = [mid for mid in sorted(owned) if not self._is_scanning(owned[mid])]
+                    excess = idle[len(idle) - min(len(owned) - fair_share, len(idle)):]
+                    self.db.release_monitor_leases(self.worker_id, excess)
+                    for monitor_id in excess:
+                        owned.pop(monitor_id)
+                elif len(owned) < fair_share:
+                    owned.update(self.db.claim_monitor_leases(self.worker_id, self.lease_ttl, fair_share - len(owned)))
+            except Exception as e:
+                # Sans heartbeat, on ne peut plus garantir l'exclusivité: on ne surveille plus rien
+                logger.error(f"❌ Heartbeat surveillance échoué: {e}")
+                owned = {}
+
+        with self._lock:
+            acquired = set(owned) - set(self._owned)
+            lost = set(self._owned) - set(owned)
+        if acquired and self.scheduler is not None:
+            # Bail repris d'un autre worker: l'état persisté (next_run_at) est rechargé avant que
+            # le planificateur ne voie l'ICP, sinon la reprise déclencherait un scan hors planning
+            self.scheduler.reload_state([owned[mid] for mid in acquired])
+        with self._lock:
+            self._owned = owned
+        if acquired or lost:
+            logger.info(f"🔀 Baux surveillance: +{len(acquired)} / -{len(lost)} (détenus: {len(owned)})")
+        return dict(owned)
+
+    def _is_scanning(self, icp_id):
+        return self.scheduler is not None and self.scheduler.is_scanning(icp_id)
+
+    def owned_icps(self):
+        """ICPs actifs dont ce worker détient le bail, configuration courante (source du planificateur)"""
+        with self._lock:
+            owned_ids = {str(icp_id) for icp_id in self._owned.values()}
+        if not owned_ids:
+            return []
+        return [icp for icp in self._current_icps() if str(icp.get('id')) in owned_ids]
+
+    def is_active(self):
+        if self._db_available():
+            try:
+                return self.db.count_active_monitors() > 0
+            except Exception:
+                return False
+        with self._lock:
+            return any(status == 'active' for _, status in self._local_monitors.values())
+
+    def get_status(self):
+        with self._lock:
+            owned = sorted(self._owned)
+        return {
+            'worker_id': self.worker_id,
+            'live_workers': self.live_workers,
+            'owned_monitors': owned,
+            'leases': self.db.get_monitor_leases() if self._db_available() else []
+        }
@@ -0,0 +1,247 @@
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+class MonitoringScheduler:
+    """
+    Planificateur de surveillance continue par ICP
+    - intervalle propre à chaque ICP (icp['interval_minutes'] ou intervalle global)
+    - jitter pour étaler les scans, pas de chevauchement pour un même ICP
+    - rattrapage des scans manqués en un seul run (pas de rafale au redémarrage)
+    - ICPs échus ensemble servis par une seule découverte (fan-out via index inversé)
+    - état persisté (last_run_at / next_run_at) pour reprendre après redémarrage
+    """
+
+    def __init__(self, pipeline, icp_provider, state_store, default_interval_minutes=60,
+                 jitter_ratio=0.1, max_workers=4, tick_seconds=5, fanout_group_size=20, settings=None):
+        self.pipeline = pipeline
+        self.icp_provider = icp_provider      # callable -> liste des ICPs actifs
+        self.state_store = state_store        # DatabaseManager (get_monitoring_schedule / save_monitoring_run)
+        self.default_interval_minutes = default_interval_minutes
+        self.jitter_ratio = jitter_ratio
+        self.max_workers = max_workers
+        self.tick_seconds = tick_seconds
+        self.fanout_group_size = max(1, fanout_group_size)
+        self.settings = settings              # AppState: intervalle global partagé entre workers
+
+        self._schedule = {}      # icp_id -> état planifié
+        self._running = set()    # ICPs en cours de scan (anti-chevauchement)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_minutes=None):
+        """Démarre la boucle de planification (idempotent)"""
+        if interval_minutes:
+            self.default_interval_minutes = interval_minutes
+        if self.is_running:
+            return self.get_status()
+
+        self._load_state()
+        self._stop_event.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="monitor-scan")
+        self._thread = threading.Thread(target=self._loop, name="monitoring-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"🔁 Planificateur de surveillance démarré (intervalle par défaut {self.default_interval_minutes} min)")
+        return self.get_status()
+
+    def stop(self):
+        """Arrête la planification; les scans en cours se terminent normalement"""
+        self._stop_event.set()
+        if self._thread:
+            # Tick en cours terminé avant la fermeture de l'exécuteur (sinon _submit annule et reprogramme)
+            self._thread.join(timeout=self.tick_seconds * 2)
+        self._thread = None
+        executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False)
+        logger.info("⏹️ Planificateur de surveillance arrêté")
+
+    def _db_available(self):
+        return getattr(self.state_store, 'conn', None) is not None
+
+    @staticmethod
+    def _state_from_row(row):
+        return {
+            'last_run_at': row.get('last_run_at'),
+            'next_run_at': row.get('next_run_at'),
+            'last_status': row.get('last_status'),
+            'last_prospects': row.get('last_prospects') or 0
+        }
+
+    def _load_state(self):
+        """Reprend l'état persisté pour éviter les scans en double au redémarrage"""
+        try:
+            persisted = self.state_store.get_monitoring_schedule() or {}
+        except Exception as e:
+            logger.warning(f"⚠️ État de surveillance non chargé: {e}")
+            persisted = {}
+
+        with self._lock:
+            for icp_id, row in persisted.items():
+                self._schedule[icp_id] = self._state_from_row(row)
+
+    def reload_state(self, icp_ids):
+        """
+        Bail acquis (rééquilibrage, worker recyclé): l'état persisté par l'ancien propriétaire remplace
+        l'instantané local, éventuellement périmé. Sans ligne persistée, l'ICP n'a jamais été scanné.
+        """
+        if not self._db_available():
+            return
+        try:
+            persisted = self.state_store.get_monitoring_schedule(icp_ids) or {}
+        except Exception as e:
+            logger.warning(f"⚠️ État de surveillance non rechargé: {e}")
+            return
+        with self._lock:
+            for icp_id in map(str, icp_ids):
+                if icp_id in self._running:
+                    continue
+                if icp_id in persisted:
+                    self._schedule[icp_id] = self._state_from_row(persisted[icp_id])
+                else:
+                    self._schedule.pop(icp_id, None)
+
+    def is_scanning(self, icp_id):
+        with self._lock:
+            return str(icp_id) in self._running
+
+    @property
+    def interval_minutes(self):
+        """Intervalle global: valeur partagée (dernier /api/monitoring/start, tous workers), sinon locale"""
+        if self.settings is None:
+            return self.default_interval_minutes
+        return self.settings.get('monitoring.default_interval_minutes', self.default_interval_minutes)
+
+    def _interval_for(self, icp_config):
+        return int(icp_config.get('interval_minutes') or self.interval_minutes)
+
+    def _next_run_after(self, reference, interval_minutes):
+        jitter = interval_minutes * 60 * self.jitter_ratio
+        return reference + timedelta(seconds=interval_minutes * 60 + random.uniform(-jitter, jitter))
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self._tick(datetime.now())
+            except Exception as e:
+                logger.error(f"❌ Erreur planificateur surveillance: {e}")
+            self._stop_event.wait(self.tick_seconds)
+
+    def _tick(self, now):
+        due = []
+        for icp_config in self.icp_provider():
+            if self._stop_event.is_set():
+                return
+            if icp_config.get('status', 'active') != 'active' or not icp_config.get('id'):
+                continue
+
+            icp_id = icp_config['id']
+            interval = self._interval_for(icp_config)
+
+            with self._lock:
+                state = self._schedule.setdefault(icp_id, {
+                    'last_run_at': None,
+                    # Premier scan rapide, étalé par le jitter (30s max)
+                    'next_run_at': now + timedelta(seconds=random.uniform(0, min(interval * 60 * self.jitter_ratio, 30))),
+                    'last_status': None,
+                    'last_prospects': 0
+                })
+                if icp_id in self._running or (state['next_run_at'] and state['next_run_at'] > now):
+                    continue
+                # Scans manqués: un seul run de rattrapage, le suivant part de la fin de ce run.
+                # next_run_at provisoire persisté: un redémarrage pendant le scan ne le relance pas
+                self._running.add(icp_id)
+                state['last_status'] = 'running'
+                state['last_run_at'] = now
+                state['next_run_at'] = self._next_run_after(now, interval)
+
+            self._persist(icp_id, interval, state)
+            due.append((icp_config, interval))
+
+        # ICPs échus au même tick: une seule découverte partagée (fan-out), par groupes bornés
+        fanout = hasattr(self.pipeline, 'iter_fanout_scan')
+        group_size = self.fanout_group_size if fanout else 1
+        for i in range(0, len(due), group_size):
+            self._submit(due[i:i + group_size])
+
+    def _submit(self, entries):
+        # stop() peut fermer l'exécuteur pendant un tick (arrêt du worker): le scan est annulé proprement
+        executor = self._executor
+        try:
+            if executor is None:
+                raise RuntimeError("exécuteur arrêté")
+            executor.submit(self._run_group, entries)
+        except RuntimeError as e:
+            logger.warning(f"⚠️ Scan non lancé ({e}), reprogrammé: {', '.join(str(icp['id']) for icp, _ in entries)}")
+            now = datetime.now()
+            for icp_config, interval in entries:
+                with self._lock:
+                    state = self._schedule[icp_config['id']]
+                    state['last_status'] = 'cancelled'
+                    state['next_run_at'] = now   # Échu: relancé au prochain démarrage ou par le prochain détenteur du bail
+                    self._running.discard(icp_config['id'])
+                self._persist(icp_config['id'], interval, state)
+
+    def _run_group(self, entries):
+        icp_configs = [icp_config for icp_config, _ in entries]
+        counts = {icp_config['id']: 0 for icp_config in icp_configs}
+        status = 'success'
+        try:
+            logger.info(f"🔍 Scan planifié: {', '.join(icp.get('name', icp['id']) for icp in icp_configs)}")
+            scan = (self.pipeline.iter_scan(icp_configs[0]) if len(icp_configs) == 1
+                    else self.pipeline.iter_fanout_scan(icp_configs))
+            # Consommation en streaming: aucun lot n'est retenu en mémoire
+            for analyzed, _ in scan:
+                for prospect in analyzed:
+                    if prospect.get('icp_id') in counts:
+                        counts[prospect['icp_id']] += 1
+        except Exception as e:
+            status = 'error'
+            logger.error(f"❌ Erreur scan planifié {', '.join(counts)}: {e}")
+        finally:
+            finished_at = datetime.now()
+            for icp_config, interval in entries:
+                icp_id = icp_config['id']
+                with self._lock:
+                    state = self._schedule[icp_id]
+                    state['last_status'] = status
+                    state['last_prospects'] = counts[icp_id]
+                    state['next_run_at'] = self._next_run_after(finished_at, interval)
+                    self._running.discard(icp_id)
+                self._persist(icp_id, interval, state)
+
+    def _persist(self, icp_id, interval, state):
+        try:
+            self.state_store.save_monitoring_run(
+                icp_id, interval, state['last_run_at'], state['next_run_at'],
+                state['last_status'], state['last_prospects']
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ État de surveillance non persisté: {e}")
+
+    def get_status(self):
+        with self._lock:
+            monitors = [{
+                'icp_id': icp_id,
+                'last_run_at': state['last_run_at'].isoformat() if state['last_run_at'] else None,
+                'next_run_at': state['next_run_at'].isoformat() if state['next_run_at'] else None,
+                'last_status': state['last_status'],
+                'last_prospects': state['last_prospects'],
+                'running': icp_id in self._running
+            } for icp_id, state in self._schedule.items()]
+
+        return {
+            'is_running': self.is_running,
+            'default_interval_minutes': self.interval_minutes,
+            'monitors': monitors
+        }
@@ -0,0 +1,232 @@
+import re
+import math
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+LEGAL_SUFFIXES = {'sa', 'sas', 'sasu', 'sarl', 'eurl', 'sca', 'se', 'inc', 'ltd', 'llc', 'gmbh', 'corp', 'group', 'groupe'}
+
+def strip_accents(text):
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+def normalize_tokens(text):
+    """"Élodie Dupont-Martin" → ['elodie', 'dupont', 'martin'] (forme utilisée par les clés d'identité)"""
+    return re.sub(r'[^a-z0-9]+', ' ', strip_accents(text).lower()).split()
+
+def normalize_profile_url(url):
+    """https://fr.linkedin.com/in/Jean-Martin/?trk=x → linkedin.com/in/jean-martin"""
+    if not url:
+        return None
+    parsed = urlparse(url.strip() if '://' in url else f"https://{url.strip()}")
+    host = (parsed.hostname or '').lower()
+    if host.endswith('linkedin.com'):
+        host = 'linkedin.com'  # www., fr., de. ... → même profil
+    path = strip_accents(parsed.path).lower().rstrip('/')
+    if not host or not path:
+        return None
+    return f"{host}{path}"
+
+def normalize_name_company(full_name, company):
+    """Nom + entreprise normalisés (accents, casse, ponctuation, formes juridiques)"""
+    if not full_name or not company or company == 'Entreprise inconnue':
+        return None
+
+    name_tokens = normalize_tokens(full_name)
+    company_tokens = [t for t in normalize_tokens(company) if t not in LEGAL_SUFFIXES]
+    if len(name_tokens) < 2 or not company_tokens:
+        return None
+    return f"{' '.join(name_tokens)}|{' '.join(company_tokens)}"
+
+def canonical_identity_keys(prospect):
+    """Clés d'identité canoniques: URL de profil normalisée + repli nom/entreprise"""
+    personal_info = prospect.get('personal_info') or {}
+    linkedin_info = prospect.get('linkedin_info') or {}
+    return {
+        'url': normalize_profile_url(linkedin_info.get('profile_url')),
+        'name': normalize_name_company(personal_info.get('full_name'), personal_info.get('company'))
+    }
+
+
+class BloomFilter:
+    """Filtre de Bloom (faux positifs possibles, jamais de faux négatifs)"""
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def full(self):
+        """Capacité atteinte: au-delà, le taux de faux positifs dépasse la cible"""
+        return self.count >= self.capacity
+
+
+class ProspectDeduplicator:
+    """
+    Déduplication inter-scans avant toute dépense d'enrichissement ou de LLM
+    - pré-filtre Bloom en mémoire: un prospect absent du filtre est forcément nouveau
+    - confirmation exacte (index unique PostgreSQL, ou ensemble mémoire sans DB) si le filtre répond "connu"
+    - un prospect n'est marqué connu (mark_seen) qu'une fois enregistré: écarté ou perdu, il reste nouveau
+    - filtre dimensionné par clé (jusqu'à deux par prospect); plein, il reçoit une couche deux fois plus
+      grande à taux d'erreur moitié: le taux global reste sous error_rate quel que soit le volume
+    """
+
+    KEYS_PER_PROSPECT = 2   # URL de profil + nom/entreprise
+
+    def __init__(self, db, capacity=500000, error_rate=0.001, warm_up_timeout=60, known_capacity=5000):
+        self.db = db
+        # Couches: error_rate/2 + error_rate/4 + ... < error_rate
+        self.blooms = [BloomFilter(capacity * self.KEYS_PER_PROSPECT, error_rate / 2)]
+        # Confirmation exacte sans base: bornée comme le stockage mémoire (LRU, clés les plus anciennes oubliées)
+        self.known_capacity = known_capacity
+        self._known = OrderedDict()
+        self._lock = threading.Lock()
+        # Préchargement fait en arrière-plan: les premiers lots attendent qu'il soit terminé
+        self.warm_up_timeout = warm_up_timeout
+        self._loaded = threading.Event()
+        self.stats = {'checked': 0, 'duplicates': 0, 'bloom_negatives': 0, 'bloom_false_positives': 0}
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    def warm_up(self):
+        """Charge les identités déjà persistées dans le filtre"""
+        loaded = 0
+        try:
+            loaded = self.add_identity_keys(self.db.get_identity_keys())
+        except Exception as e:
+            logger.warning(f"⚠️ Préchargement déduplication impossible: {e}")
+        finally:
+            self._loaded.set()
+        logger.info(f"🧮 Filtre de déduplication initialisé ({loaded} prospects connus)")
+        return loaded
+
+    def add_identity_keys(self, keys):
+        """Clés déjà persistées [(url, nom)] ajoutées au filtre; retourne le nombre de prospects"""
+        loaded = 0
+        for url_key, name_key in keys:
+            with self._lock:
+                if url_key:
+                    self._add_key(f"url:{url_key}")
+                if name_key:
+                    self._add_key(f"name:{name_key}")
+            loaded += 1
+        return loaded
+
+    def _maybe_known(self, key):
+        return any(key in bloom for bloom in self.blooms)
+
+    def _add_key(self, key):
+        """Ajout au filtre (sous self._lock); nouvelle couche quand la dernière est pleine"""
+        if self._maybe_known(key):
+            return
+        bloom = self.blooms[-1]
+        if bloom.full:
+            bloom = BloomFilter(bloom.capacity * 2, bloom.error_rate / 2)
+            self.blooms.append(bloom)
+            logger.info(f"🧮 Filtre de déduplication agrandi ({len(self.blooms)} couches, {bloom.capacity} clés)")
+        bloom.add(key)
+
+    def filter_new(self, prospects):
+        """Retourne (prospects nouveaux, statistiques du lot)"""
+        if not self._loaded.is_set() and not self._loaded.wait(self.warm_up_timeout):
+            # Sans préchargement, l'index unique PostgreSQL reste la garantie finale
+            logger.warning("⚠️ Filtre de déduplication non préchargé, poursuite sans attendre")
+            self._loaded.set()
+        batch_stats = {'checked': len(prospects), 'duplicates': 0}
+        bloom_negatives = bloom_false_positives = 0
+        candidates, suspects = [], []
+        seen_in_batch = set()
+
+        for prospect in prospects:
+            keys = canonical_identity_keys(prospect)
+            prospect['identity_keys'] = keys
+            tagged = [f"{kind}:{value}" for kind, value in keys.items() if value]
+
+            if any(key in seen_in_batch for key in tagged):
+                batch_stats['duplicates'] += 1
+                continue
+            seen_in_batch.update(tagged)
+
+            with self._lock:
+                maybe_known = any(self._maybe_known(key) for key in tagged)
+            if maybe_known:
+                suspects.append((prospect, keys))
+            else:
+                bloom_negatives += 1
+                candidates.append(prospect)
+
+        # Confirmation exacte uniquement pour les positifs du filtre
+        if suspects:
+            existing = self._existing_keys([k for _, keys in suspects for k in keys.items() if k[1]])
+            for prospect, keys in suspects:
+                if any((kind, value) in existing for kind, value in keys.items() if value):
+                    batch_stats['duplicates'] += 1
+                else:
+                    bloom_false_positives += 1
+                    candidates.append(prospect)
+
+        # Compteurs partagés (jobs de recherche et planificateur en parallèle)
+        with self._lock:
+            self.stats['checked'] += batch_stats['checked']
+            self.stats['duplicates'] += batch_stats['duplicates']
+            self.stats['bloom_negatives'] += bloom_negatives
+            self.stats['bloom_false_positives'] += bloom_false_positives
+        batch_stats['new'] = len(candidates)
+        batch_stats['hit_rate'] = round(batch_stats['duplicates'] / batch_stats['checked'] * 100, 1) if prospects else 0.0
+        return candidates, batch_stats
+
+    def mark_seen(self, prospects):
+        """Identités enregistrées (après une sauvegarde réussie): connues des lots suivants"""
+        with self._lock:
+            for prospect in prospects:
+                keys = prospect.get('identity_keys') or canonical_identity_keys(prospect)
+                for kind, value in keys.items():
+                    if value:
+                        self._add_key(f"{kind}:{value}")
+                        if not self._db_available():
+                            self._known[(kind, value)] = None
+                            self._known.move_to_end((kind, value))
+            while len(self._known) > self.known_capacity * self.KEYS_PER_PROSPECT:
+                self._known.popitem(last=False)
+
+    def _existing_keys(self, keys):
+        if self._db_available():
+            try:
+                return self.db.find_existing_identity_keys(
+                    [v for k, v in keys if k == 'url'], [v for k, v in keys if k == 'name']
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Vérification déduplication DB impossible: {e}")
+        with self._lock:
+            return {key for key in keys if key in self._known}
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            bloom = {'bloom_size_bits': sum(b.size for b in self.blooms), 'bloom_items': sum(b.count for b in self.blooms),
+                     'bloom_layers': len(self.blooms), 'known_keys': len(self._known)}
+        checked = stats['checked']
+        return {**stats, 'hit_rate': round(stats['duplicates'] / checked * 100, 1) if checked else 0.0, **bloom}
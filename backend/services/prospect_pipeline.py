@@ -0,0 +1,188 @@
+import logging
+import threading
+from datetime import datetime
+
+from services.icp_index import ICPIndex
+from services.linkedin_agent import MAX_STREAM_LIMIT
+
+logger = logging.getLogger(__name__)
+
+class ProspectPipeline:
+    """
+    Pipeline de prospection: découverte LinkedIn → enrichissement → analyse LLM → persistance
+    Partagé par la recherche manuelle et la surveillance planifiée
+    """
+
+    def __init__(self, linkedin_agent, enrichment_service, analysis_engine, db, memory_store=None, deduplicator=None):
+        self.linkedin_agent = linkedin_agent
+        self.enrichment_service = enrichment_service
+        self.analysis_engine = analysis_engine
+        self.db = db
+        self.memory_store = memory_store if memory_store is not None else []
+        self.deduplicator = deduplicator
+        self._watermarks = {}  # Mode sans DB: (icp_id, source) -> datetime
+        self._watermark_lock = threading.Lock()
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    @property
+    def source_name(self):
+        return getattr(self.linkedin_agent, 'source_name', 'linkedin')
+
+    def get_watermark(self, icp_id, source):
+        if self._db_available():
+            row = self.db.get_scan_watermark(icp_id, source)
+            return row['watermark_at'] if row else None
+        with self._watermark_lock:
+            return self._watermarks.get((icp_id, source))
+
+    @staticmethod
+    def _newest_activity(prospects, since):
+        """Watermark candidat: activité la plus récente parmi les résultats récupérés"""
+        newest = since
+        for prospect in prospects:
+            activity_at = (prospect.get('linkedin_info') or {}).get('activity_at')
+            if activity_at:
+                activity_at = datetime.fromisoformat(activity_at)
+                if newest is None or activity_at > newest:
+                    newest = activity_at
+        return newest
+
+    def _discover(self, icp_config, since, chunk_size):
+        """Lots de prospects découverts (streaming si l'agent le permet)"""
+        if hasattr(self.linkedin_agent, 'iter_keywords_icp'):
+            yield from self.linkedin_agent.iter_keywords_icp(icp_config, since=since, chunk_size=chunk_size)
+        else:
+            yield self.linkedin_agent.monitor_keywords_icp(icp_config, since=since)
+
+    def iter_scan(self, icp_config, persist=True, chunk_size=10, on_stage=None):
+        """
+        Scan en streaming: chaque lot découvert est dédupliqué, enrichi, analysé et persisté
+        avant le suivant. Produit (lot analysé, statistiques cumulées).
+        ICP enregistré (avec id): scan incrémental à partir du watermark de la source.
+        on_stage(étape, statistiques): suivi des étapes (discovery, enrichment, analysis, persist)
+        """
+        icp_ids = [icp_config['id']] if icp_config.get('id') else []
+        yield from self._iter_chunks(icp_config, icp_ids, None, persist, chunk_size, on_stage)
+
+    def iter_fanout_scan(self, icp_configs, persist=True, chunk_size=10, limit_cap=None):
+        """
+        Une seule découverte pour plusieurs ICPs: chaque prospect est routé vers les ICPs qu'il satisfait
+        (index inversé), enrichi une fois et analysé avec le contexte de son ICP principal.
+        """
+        icp_configs = [icp for icp in icp_configs if icp.get('id')]
+        if len(icp_configs) == 1:
+            yield from self.iter_scan(icp_configs[0], persist, chunk_size)
+            return
+        index = ICPIndex(icp_configs)
+        discovery_config = index.merged_config(limit_cap or MAX_STREAM_LIMIT)
+        yield from self._iter_chunks(discovery_config, list(index.icps), index, persist, chunk_size)
+
+    def _iter_chunks(self, discovery_config, icp_ids, index, persist, chunk_size, on_stage=None):
+        started_at = datetime.now()
+        source = self.source_name
+        # Groupe d'ICPs: on repart du watermark le plus ancien (aucun trou pour aucun ICP)
+        watermarks = [self.get_watermark(icp_id, source) for icp_id in icp_ids]
+        since = None if not watermarks or None in watermarks else min(watermarks)
+        watermark = since
+
+        stats = {
+            'discovered': 0,
+            'processed': 0,
+            'dedup': {'checked': 0, 'duplicates': 0, 'new': 0, 'hit_rate': 0.0} if self.deduplicator else None,
+            'watermark': {'source': source, 'since': since.isoformat() if since else None, 'advanced_to': None},
+            'chunks': 0,
+            'duration_seconds': 0
+        }
+        if index:
+            stats['fanout'] = {'icps': len(icp_ids), 'routed': {icp_id: 0 for icp_id in icp_ids}, 'unmatched': 0}
+
+        def stage(name):
+            if on_stage:
+                on_stage(name, stats)
+
+        stage('discovery')
+        for chunk in self._discover(discovery_config, since, chunk_size):
+            stats['discovered'] += len(chunk)
+            stats['chunks'] += 1
+            if icp_ids:
+                watermark = self._newest_activity(chunk, watermark)
+
+            # Prospects déjà connus écartés avant enrichissement et analyse LLM
+            if self.deduplicator:
+                chunk, dedup_stats = self.deduplicator.filter_new(chunk)
+                for key in ('checked', 'duplicates', 'new'):
+                    stats['dedup'][key] += dedup_stats[key]
+                stats['dedup']['hit_rate'] = round(stats['dedup']['duplicates'] / stats['dedup']['checked'] * 100, 1) if stats['dedup']['checked'] else 0.0
+
+            if index:
+                routed, counts = index.route(chunk)
+                stats['fanout']['unmatched'] += len(chunk) - len(routed)
+                for icp_id, count in counts.items():
+                    stats['fanout']['routed'][icp_id] += count
+                chunk = routed
+
+            stage('enrichment')
+            enriched = self.enrichment_service.batch_enrich_prospects(chunk) if chunk else []
+            stage('analysis')
+            analyzed = self._analyze(enriched, discovery_config, index)
+
+            if persist:
+                stage('persist')
+                # Le watermark avance avec chaque lot persisté (reprise sans trou après interruption)
+                if self._persist(analyzed, icp_ids, source, watermark if icp_ids else None) and self.deduplicator:
+                    self.deduplicator.mark_seen(analyzed)
+
+            stats['processed'] += len(analyzed)
+            stats['watermark']['advanced_to'] = watermark.isoformat() if icp_ids and watermark else None
+            stats['duration_seconds'] = round((datetime.now() - started_at).total_seconds(), 2)
+            yield analyzed, stats
+            stage('discovery')
+
+    def _analyze(self, prospects, icp_config, index):
+        if not prospects:
+            return []
+        if not index:
+            return self.analysis_engine.batch_analyze_prospects(prospects, icp_config)
+        # Analyse LLM dans le contexte de l'ICP principal de chaque prospect
+        by_icp = {}
+        for prospect in prospects:
+            by_icp.setdefault(prospect['icp_id'], []).append(prospect)
+        analyzed = []
+        for icp_id, group in by_icp.items():
+            analyzed.extend(self.analysis_engine.batch_analyze_prospects(group, index.icps[icp_id]))
+        return analyzed
+
+    def run_scan(self, icp_config, persist=True):
+        """Scan complet: consomme le streaming et retourne tous les prospects analysés (triés par score)"""
+        prospects, stats = [], None
+        for analyzed, stats in self.iter_scan(icp_config, persist):
+            prospects.extend(analyzed)
+
+        if stats is None:
+            stats = {'discovered': 0, 'processed': 0, 'chunks': 0}
+        prospects.sort(key=lambda p: p.get('llm_analysis', {}).get('score', 0), reverse=True)
+        return {'prospects': prospects, 'stats': stats}
+
+    def _persist(self, prospects, icp_ids, source, watermark):
+        """Enregistre le lot; retourne False s'il n'a pas été persisté"""
+        for prospect in prospects:
+            if len(icp_ids) == 1 and not prospect.get('icp_id'):
+                prospect['icp_id'] = icp_ids[0]
+
+        if self._db_available():
+            # Lot et watermarks dans la même transaction: pas de trou ni de double traitement
+            if not self.db.save_scan_batch(prospects, icp_ids, source, watermark):
+                logger.warning(f"⚠️ Lot non persisté, watermark inchangé ({', '.join(icp_ids) or 'recherche manuelle'})")
+                return False
+            return True
+
+        # Sans base: stockage du processus (la base est la source de vérité partagée entre workers)
+        self.memory_store.extend(prospects)
+        if watermark:
+            with self._watermark_lock:
+                for icp_id in icp_ids:
+                    if (icp_id, source) not in self._watermarks or self._watermarks[(icp_id, source)] < watermark:
+                        self._watermarks[(icp_id, source)] = watermark
+        return True
@@ -0,0 +1,134 @@
+import os
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict, defaultdict
+
+logger = logging.getLogger(__name__)
+
+class ProspectStore:
+    """
+    Stockage mémoire borné des prospects (mode sans base de données)
+    - capacité fixe, éviction du prospect le moins récemment utilisé (LRU): mémoire prévisible
+    - index par id et par statut: lectures, comptages et filtres sans parcours de toute la liste
+    - verrou unique: sûr entre les threads Flask, les recherches en arrière-plan et la surveillance
+    - les changements de statut passent par transition() (index tenus à jour, garde optimiste)
+    - listener(type, data): événements du dashboard ('prospects', 'prospect_status') émis après chaque écriture
+    """
+
+    def __init__(self, capacity=5000):
+        self.capacity = capacity
+        self._items = OrderedDict()               # id → prospect (ordre LRU: le plus ancien en tête)
+        self._by_status = defaultdict(dict)       # statut → {id: None} (ordre d'insertion)
+        self._lock = threading.RLock()
+        self.stats = {'added': 0, 'updated': 0, 'evicted': 0}
+        self.listener = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(capacity=int(os.getenv('PROSPECT_STORE_CAPACITY', 5000)))
+
+    @staticmethod
+    def _status(prospect):
+        return prospect.get('status') or 'new'
+
+    def _emit(self, event_type, data):
+        if self.listener is not None:
+            self.listener(event_type, data)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def __iter__(self):
+        return iter(self.list())
+
+    def _unindex_status(self, prospect):
+        status = self._status(prospect)
+        self._by_status[status].pop(prospect['id'], None)
+        if not self._by_status[status]:
+            del self._by_status[status]
+
+    def _unindex(self, prospect_id):
+        prospect = self._items.pop(prospect_id)
+        self._unindex_status(prospect)
+        return prospect
+
+    def add(self, prospect):
+        self.extend([prospect])
+
+    def extend(self, prospects):
+        """Ajoute ou remplace (même id) des prospects; évince les moins récemment utilisés au-delà de la capacité"""
+        added = []
+        with self._lock:
+            for prospect in prospects:
+                if prospect['id'] in self._items:
+                    self._unindex(prospect['id'])
+                    self.stats['updated'] += 1
+                else:
+                    self.stats['added'] += 1
+                    added.append(prospect)
+                self._items[prospect['id']] = prospect
+                self._by_status[self._status(prospect)][prospect['id']] = None
+
+            evicted = 0
+            while len(self._items) > self.capacity:
+                self._unindex(next(iter(self._items)))
+                evicted += 1
+            self.stats['evicted'] += evicted
+        if evicted:
+            logger.info(f"🧹 Stockage prospects plein ({self.capacity}): {evicted} prospects les plus anciens évincés")
+        if added:
+            self._emit('prospects', added)
+
+    def get(self, prospect_id):
+        with self._lock:
+            prospect = self._items.get(prospect_id)
+            if prospect is not None:
+                self._items.move_to_end(prospect_id)
+            return prospect
+
+    def get_many(self, prospect_ids):
+        with self._lock:
+            return [p for p in (self.get(prospect_id) for prospect_id in prospect_ids) if p is not None]
+
+    def list(self, status='all'):
+        """Copie de la liste (tous les prospects, ou un statut via l'index)"""
+        with self._lock:
+            if status == 'all':
+                return list(self._items.values())
+            return [self._items[prospect_id] for prospect_id in self._by_status.get(status, ())]
+
+    def count(self, status='all'):
+        with self._lock:
+            if status == 'all':
+                return len(self._items)
+            return len(self._by_status.get(status, ()))
+
+    def transition(self, prospect_ids, status, expected_statuses=(), stamp=None):
+        """
+        Même contrat que db.transition_prospects: seuls les prospects encore dans un des statuts attendus
+        (tous si vide) changent de statut, date de transition fusionnée dans enrichment_data.
+        Retourne les ids effectivement modifiés.
+        """
+        stamp = stamp or {f"{status}_at": datetime.now().isoformat()}
+        updated = []
+        with self._lock:
+            for prospect_id in prospect_ids:
+                prospect = self._items.get(prospect_id)
+                if prospect is None or (expected_statuses and self._status(prospect) not in expected_statuses):
+                    continue
+                self._unindex_status(prospect)
+                prospect['status'] = status
+                prospect['enrichment_data'] = {**(prospect.get('enrichment_data') or {}), **stamp}
+                self._by_status[status][prospect_id] = None
+                self._items.move_to_end(prospect_id)
+                updated.append(prospect_id)
+        if updated:
+            self._emit('prospect_status', {'status': status, 'ids': updated[:20], 'count': len(updated)})
+        return updated
+
+    def get_stats(self):
+        with self._lock:
+            return {**self.stats, 'size': len(self._items), 'capacity': self.capacity,
+                    'by_status': {status: len(ids) for status, ids in self._by_status.items()}}
@@ -0,0 +1,171 @@
+import time
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class LocalTokenBucket:
+    """Seau à jetons en mémoire (repli sans PostgreSQL: limite valable pour ce processus uniquement)"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, tokens=1):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True, self.tokens
+            return False, self.tokens
+
+    def drain(self, seconds):
+        with self._lock:
+            self.tokens = min(self.tokens, -self.rate * seconds)
+            self.updated_at = time.monotonic()
+
+
+class TokenBucketLimiter:
+    """
+    Limiteur de débit partagé par source et par compte (seaux à jetons)
+    - capacité de rafale (burst) puis débit continu (rate jetons/seconde)
+    - état dans PostgreSQL (rate_limit_buckets): la limite tient entre threads, scans planifiés et workers
+    - repli en mémoire si la base est indisponible
+    """
+
+    def __init__(self, db=None, max_wait_step=5.0):
+        self.db = db
+        self.max_wait_step = max_wait_step
+        self._limits = {}   # source -> (rate, burst)
+        self._local = {}    # clé -> LocalTokenBucket
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    def configure(self, source, rate, burst=1):
+        """Déclare la limite d'une source (rate: requêtes/seconde, burst: rafale maximale)"""
+        with self._lock:
+            self._limits[source] = (float(rate), float(max(burst, 1)))
+
+    def is_configured(self, source):
+        return source in self._limits
+
+    @staticmethod
+    def bucket_key(source, account):
+        return f"{source}:{account or 'default'}"
+
+    def _local_bucket(self, key, rate, burst):
+        with self._lock:
+            bucket = self._local.get(key)
+            if bucket is None:
+                bucket = self._local[key] = LocalTokenBucket(rate, burst)
+            return bucket
+
+    def _record(self, key, granted, waited=0.0):
+        with self._lock:
+            entry = self.stats.setdefault(key, {'acquired': 0, 'throttled': 0, 'waited_seconds': 0.0})
+            if granted:
+                entry['acquired'] += 1
+            else:
+                entry['throttled'] += 1
+            entry['waited_seconds'] = round(entry['waited_seconds'] + waited, 3)
+
+    def try_acquire(self, source, account=None, tokens=1):
+        """Tente de prélever des jetons; retourne 0 si accordé, sinon le délai estimé avant nouvel essai"""
+        if source not in self._limits:
+            return 0.0
+        rate, burst = self._limits[source]
+        key = self.bucket_key(source, account)
+
+        granted, remaining = None, None
+        if self._db_available():
+            try:
+                granted, remaining = self.db.take_rate_limit_tokens(key, rate, burst, tokens)
+            except Exception as e:
+                logger.warning(f"⚠️ Limiteur partagé indisponible ({key}), repli local: {e}")
+        if granted is None:
+            granted, remaining = self._local_bucket(key, rate, burst).take(tokens)
+
+        if granted:
+            return 0.0
+        return (tokens - remaining) / rate if rate > 0 else self.max_wait_step
+
+    def acquire(self, source, account=None, tokens=1, timeout=None):
+        """Acquisition bloquante; retourne False si le délai maximal est dépassé"""
+        key = self.bucket_key(source, account)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(source, account, tokens)
+            if delay <= 0:
+                self._record(key, True, waited)
+                return True
+            delay = min(delay, self.max_wait_step)
+            if deadline is not None and time.monotonic() + delay > deadline:
+                self._record(key, False, waited)
+                return False
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, source, account=None, tokens=1, timeout=None):
+        """Acquisition asynchrone (aucun blocage de la boucle d'événements)"""
+        key = self.bucket_key(source, account)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        waited = 0.0
+        while True:
+            if self._db_available():
+                delay = await asyncio.to_thread(self.try_acquire, source, account, tokens)
+            else:
+                delay = self.try_acquire(source, account, tokens)
+            if delay <= 0:
+                self._record(key, True, waited)
+                return True
+            delay = min(delay, self.max_wait_step)
+            if deadline is not None and time.monotonic() + delay > deadline:
+                self._record(key, False, waited)
+                return False
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def penalize(self, source, account=None, seconds=60):
+        """Quota refusé par la source (ex: HTTP 429): plus aucun jeton pendant `seconds`, pour tous les workers"""
+        if source not in self._limits:
+            return
+        rate, burst = self._limits[source]
+        key = self.bucket_key(source, account)
+        if self._db_available():
+            try:
+                self.db.drain_rate_limit_bucket(key, rate, burst, seconds)
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Limiteur partagé indisponible ({key}): {e}")
+        self._local_bucket(key, rate, burst).drain(seconds)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                # Sans E/S (exposé par /api/health): jamais de première connexion depuis une sonde
+                'backend': 'postgresql' if getattr(self.db, 'connected', False) else 'memory',
+                'limits': {source: {'rate_per_second': rate, 'burst': burst} for source, (rate, burst) in self._limits.items()},
+                'buckets': {key: dict(entry) for key, entry in self.stats.items()}
+            }
+
+
+def _create_limiter():
+    try:
+        from database_fixed import db
+    except Exception as e:
+        logger.warning(f"⚠️ Limiteur de débit sans PostgreSQL: {e}")
+        db = None
+    return TokenBucketLimiter(db)
+
+# Instance globale partagée par les agents de découverte et les fournisseurs
+rate_limiter = _create_limiter()
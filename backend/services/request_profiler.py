@@ -0,0 +1,234 @@
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+class ProfileSession:
+    """Échantillonnage d'une requête: un thread relève la pile du thread cible à intervalle fixe"""
+
+    def __init__(self, profiler, target_thread, all_threads, method, route):
+        self.id = uuid.uuid4().hex
+        self.profiler = profiler
+        self.target_thread = target_thread
+        self.all_threads = all_threads
+        self.method = method
+        self.route = route
+        self.samples = Counter()        # pile repliée ("a;b;c") → nombre d'échantillons
+        self.sample_count = 0
+        self.truncated = False
+        self._stop_event = threading.Event()
+        self._started = time.perf_counter()
+        self._labels = {}               # objet code → libellé de frame (calculé une fois)
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id[:8]}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(BACKEND_DIR):
+                filename = os.path.relpath(filename, BACKEND_DIR)
+            else:
+                filename = '/'.join(filename.split(os.sep)[-2:])
+            name = getattr(code, 'co_qualname', code.co_name)
+            # ';' sépare les frames dans le format replié (le compte suit le dernier espace)
+            label = self._labels[code] = f"{name} ({filename}:{code.co_firstlineno})".replace(';', ',')
+        return label
+
+    def _collapse(self, frame, root=None):
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if root:
+            stack.append(root)
+        return ';'.join(reversed(stack))
+
+    def _sample(self):
+        frames = sys._current_frames()
+        if not self.all_threads:
+            frame = frames.get(self.target_thread)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+            return
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in frames.items():
+            if thread_id != own:
+                self.samples[self._collapse(frame, names.get(thread_id, str(thread_id)))] += 1
+
+    def _run(self):
+        deadline = self._started + self.profiler.max_seconds
+        while not self._stop_event.wait(self.profiler.interval):
+            if time.perf_counter() > deadline:
+                self.truncated = True
+                break
+            try:
+                self._sample()
+                self.sample_count += 1
+            except Exception as e:
+                logger.error(f"❌ Erreur échantillonnage profil {self.id}: {e}")
+                break
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+        return time.perf_counter() - self._started
+
+    def folded(self):
+        """Format replié (flamegraph.pl, speedscope, inferno): une pile par ligne, frames racine en tête"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class RequestProfiler:
+    """
+    Profilage à la demande d'une requête HTTP (production)
+    - désactivé sans PROFILER_TOKEN; déclenché par l'en-tête X-Profile (jeton exact, jamais dans l'URL)
+    - échantillonneur en thread séparé (sys._current_frames toutes les PROFILER_INTERVAL_MS): la requête
+      profilée n'est pas instrumentée, le coût est borné par la fréquence d'échantillonnage
+    - rate limit partagé entre workers (seau 'profiler') + au plus PROFILER_MAX_CONCURRENT profils par processus
+    - profils écrits au format replié dans PROFILE_DIR (les PROFILE_KEEP plus récents conservés)
+    """
+
+    def __init__(self, token=None, directory=None, interval=0.005, max_seconds=60, keep=50,
+                 max_concurrent=1, limiter=None):
+        self.token = token
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'cold-outreach-profiles')
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.keep = keep
+        self.limiter = limiter
+        self._slots = threading.BoundedSemaphore(max(max_concurrent, 1))
+        self._lock = threading.Lock()
+        self.stats = {'profiled': 0, 'throttled': 0, 'busy': 0, 'rejected': 0}
+
+    @classmethod
+    def from_env(cls, limiter=None):
+        profiler = cls(token=os.getenv('PROFILER_TOKEN') or None,
+                       directory=os.getenv('PROFILE_DIR') or None,
+                       interval=float(os.getenv('PROFILER_INTERVAL_MS', 5)) / 1000,
+                       max_seconds=float(os.getenv('PROFILER_MAX_SECONDS', 60)),
+                       keep=int(os.getenv('PROFILE_KEEP', 50)),
+                       max_concurrent=int(os.getenv('PROFILER_MAX_CONCURRENT', 1)),
+                       limiter=limiter)
+        if limiter is not None:
+            per_minute = float(os.getenv('PROFILER_MAX_PER_MINUTE', 6))
+            limiter.configure('profiler', per_minute / 60, burst=int(os.getenv('PROFILER_BURST', 2)))
+        return profiler
+
+    @property
+    def enabled(self):
+        return bool(self.token)
+
+    def is_authorized(self, supplied):
+        return self.enabled and bool(supplied) and hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def start(self, supplied, method, route, all_threads=False):
+        """Démarre un profil si le jeton est valide et le quota le permet; retourne (session, statut)"""
+        if not self.is_authorized(supplied):
+            self._count('rejected')
+            return None, 'unauthorized'
+        if self.limiter is not None and self.limiter.try_acquire('profiler') > 0:
+            self._count('throttled')
+            return None, 'throttled'
+        if not self._slots.acquire(blocking=False):
+            self._count('busy')
+            return None, 'busy'
+        try:
+            session = ProfileSession(self, threading.get_ident(), all_threads, method, route).start()
+        except Exception:
+            self._slots.release()
+            raise
+        return session, 'started'
+
+    def finish(self, session, status_code=None):
+        """Arrête l'échantillonnage et écrit le profil (<id>.folded + métadonnées <id>.json)"""
+        try:
+            duration = session.stop()
+            meta = {
+                'id': session.id,
+                'method': session.method,
+                'route': session.route,
+                'status_code': status_code,
+                'duration_ms': round(duration * 1000, 1),
+                'samples': session.sample_count,
+                'interval_ms': self.interval * 1000,
+                'threads': 'all' if session.all_threads else 'request',
+                'truncated': session.truncated,
+                'pid': os.getpid(),
+                'created_at': time.time()
+            }
+            os.makedirs(self.directory, exist_ok=True)
+            for extension, content in (('folded', session.folded()), ('json', json.dumps(meta))):
+                path = os.path.join(self.directory, f"{session.id}.{extension}")
+                with open(f"{path}.tmp", 'w') as f:
+                    f.write(content)
+                os.replace(f"{path}.tmp", path)
+            self._count('profiled')
+            self._prune()
+            logger.info(f"🔬 Profil {session.id} ({session.method} {session.route}): "
+                        f"{meta['duration_ms']} ms, {session.sample_count} échantillons")
+            return meta
+        except Exception as e:
+            logger.error(f"❌ Erreur écriture profil {session.id}: {e}")
+            return None
+        finally:
+            self._slots.release()
+
+    def _prune(self):
+        metas = sorted((name for name in os.listdir(self.directory) if name.endswith('.json')),
+                       key=lambda name: os.path.getmtime(os.path.join(self.directory, name)), reverse=True)
+        for name in metas[self.keep:]:
+            for extension in ('json', 'folded'):
+                try:
+                    os.remove(os.path.join(self.directory, f"{name[:-len('.json')]}.{extension}"))
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self):
+        """Métadonnées des profils conservés (tous les workers), du plus récent au plus ancien"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(profiles, key=lambda meta: meta['created_at'], reverse=True)
+
+    def load(self, profile_id):
+        """Profil replié, ou None (identifiant inconnu ou invalide)"""
+        if not PROFILE_ID_PATTERN.match(profile_id or ''):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.folded")) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_stats(self):
+        with self._lock:
+            return {**self.stats, 'enabled': self.enabled, 'interval_ms': self.interval * 1000,
+                    'max_seconds': self.max_seconds, 'directory': self.directory}
@@ -0,0 +1,143 @@
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class SearchJobManager:
+    """
+    Recherches manuelles exécutées en arrière-plan
+    - la soumission rend un job_id immédiatement; les threads web restent libres
+    - étape courante (discovery / enrichment / analysis / persist) et statistiques suivies en continu
+    - résultats publiés lot par lot (curseur seq): lecture incrémentale par polling ou streaming
+    - état en base (table search_jobs): n'importe quel worker répond au polling
+    - sans base: jobs terminés conservés au plus finished_ttl secondes, max_finished_jobs au maximum
+    """
+
+    DONE_STATUSES = ('completed', 'failed')
+
+    def __init__(self, pipeline, db, max_workers=2, chunk_size=10, stale_seconds=600,
+                 max_finished_jobs=50, finished_ttl=3600):
+        self.pipeline = pipeline
+        self.db = db
+        self.chunk_size = chunk_size
+        self.stale_seconds = stale_seconds
+        self.worker_id = f"search_{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search-job")
+        self.max_finished_jobs = max_finished_jobs
+        self.finished_ttl = finished_ttl
+        self._jobs = OrderedDict()    # Mode sans base: job_id → job (ordre de création)
+        self._results = {}            # Mode sans base: job_id → [(seq, prospects)]
+        self._finished = OrderedDict()  # Mode sans base: job_id → instant de fin (ordre de fin)
+        self._lock = threading.Lock()
+
+    def _db_available(self):
+        return getattr(self.db, 'conn', None) is not None
+
+    def submit(self, search_config):
+        """Crée le job et lance la recherche; retourne le job (statut 'queued')"""
+        job = {
+            'id': f"search_{uuid.uuid4().hex[:12]}",
+            'status': 'queued',
+            'stage': 'queued',
+            'params': search_config,
+            'stats': {},
+            'result_count': 0,
+            'error': None,
+            'worker_id': self.worker_id,
+            'created_at': datetime.now().isoformat()
+        }
+        if self._db_available():
+            self.db.fail_stale_search_jobs(self.stale_seconds)
+            self.db.create_search_job(job)
+        else:
+            with self._lock:
+                self._evict()
+                self._jobs[job['id']] = job
+                self._results[job['id']] = []
+        self._executor.submit(self._run, job)
+        return job
+
+    def _update(self, job, **fields):
+        job.update({k: v for k, v in fields.items() if v is not None})
+        self.db.update_search_job(job['id'], fields.get('status'), fields.get('stage'), fields.get('stats'), fields.get('error'))
+        if fields.get('status') in self.DONE_STATUSES and not self._db_available():
+            with self._lock:
+                self._finished[job['id']] = time.monotonic()
+                self._evict()
+
+    def _evict(self):
+        """Oublie les jobs terminés expirés ou en surnombre (sous self._lock); un job en cours n'est jamais oublié"""
+        expired_before = time.monotonic() - self.finished_ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > expired_before and len(self._finished) <= self.max_finished_jobs:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+
+    def _publish(self, job, seq, prospects):
+        if self._db_available():
+            self.db.append_search_job_results(job['id'], seq, prospects)
+        else:
+            with self._lock:
+                self._results[job['id']].append((seq, prospects))
+        job['result_count'] += len(prospects)
+
+    def _run(self, job):
+        try:
+            self._update(job, status='running', stage='discovery')
+            last_stage = ['discovery']
+
+            def on_stage(stage, stats):
+                # Une écriture par changement d'étape (pas par prospect)
+                if stage != last_stage[0]:
+                    last_stage[0] = stage
+                    self._update(job, stage=stage, stats=stats)
+
+            seq, stats = 0, {}
+            for analyzed, stats in self.pipeline.iter_scan(job['params'], chunk_size=self.chunk_size, on_stage=on_stage):
+                if analyzed:
+                    seq += 1
+                    self._publish(job, seq, analyzed)
+                self._update(job, stats=stats)
+
+            self._update(job, status='completed', stage='done', stats=stats)
+            self.db.log_activity('linkedin', 'INFO',
+                                 f"Recherche manuelle {job['id']}: {job['result_count']} prospects trouvés et analysés par LLM")
+        except Exception as e:
+            logger.error(f"❌ Erreur job de recherche {job['id']}: {e}")
+            self._update(job, status='failed', error=str(e))
+            self.db.log_activity('linkedin', 'ERROR', f"Erreur recherche prospects: {str(e)}")
+
+    def get(self, job_id, after=0):
+        """État du job + lots publiés après le curseur `after` (None si inconnu)"""
+        if self._db_available():
+            job = self.db.get_search_job(job_id)
+            if job is None:
+                return None
+            chunks = self.db.get_search_job_results(job_id, after)
+        else:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                job = dict(job)
+                chunks = [c for c in self._results.get(job_id, []) if c[0] > after]
+
+        return {
+            'job_id': job_id,
+            'status': job['status'],
+            'stage': job['stage'],
+            'stats': job.get('stats') or {},
+            'result_count': job.get('result_count', 0),
+            'error': job.get('error'),
+            'prospects': [p for _, prospects in chunks for p in prospects],
+            'cursor': chunks[-1][0] if chunks else after,
+            'done': job['status'] in self.DONE_STATUSES
+        }
@@ -0,0 +1,191 @@
+import os
+import heapq
+import logging
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from services.icp_matcher import TermMatcher
+
+logger = logging.getLogger(__name__)
+
+# Fuseau du destinataire déduit de personal_info.location (ordre = priorité: villes avant pays)
+TIMEZONE_TERMS = [
+    ('America/Toronto', ['montreal', 'montréal', 'quebec', 'québec', 'ottawa', 'toronto']),
+    ('America/Vancouver', ['vancouver']),
+    ('America/Chicago', ['chicago', 'austin', 'dallas', 'houston']),
+    ('America/Los_Angeles', ['san francisco', 'los angeles', 'seattle', 'silicon valley']),
+    ('America/New_York', ['new york', 'boston', 'miami', 'washington', 'atlanta']),
+    ('Africa/Casablanca', ['maroc', 'morocco', 'casablanca', 'rabat']),
+    ('Africa/Tunis', ['tunisie', 'tunisia', 'tunis']),
+    ('Africa/Algiers', ['algérie', 'algeria', 'alger']),
+    ('Africa/Dakar', ['sénégal', 'senegal', 'dakar']),
+    ('Africa/Abidjan', ["côte d'ivoire", 'abidjan']),
+    ('Europe/London', ['london', 'londres', 'royaume-uni', 'united kingdom', 'uk', 'england']),
+    ('Europe/Dublin', ['dublin', 'irlande', 'ireland']),
+    ('Europe/Lisbon', ['lisbonne', 'lisbon', 'portugal', 'porto']),
+    ('Europe/Brussels', ['bruxelles', 'brussels', 'belgique', 'belgium']),
+    ('Europe/Zurich', ['genève', 'geneve', 'geneva', 'zurich', 'suisse', 'switzerland', 'lausanne']),
+    ('Europe/Luxembourg', ['luxembourg']),
+    ('Europe/Berlin', ['berlin', 'munich', 'allemagne', 'germany']),
+    ('Europe/Madrid', ['madrid', 'barcelone', 'barcelona', 'espagne', 'spain']),
+    ('Europe/Rome', ['rome', 'milan', 'italie', 'italy']),
+    ('Europe/Amsterdam', ['amsterdam', 'pays-bas', 'netherlands']),
+    ('Asia/Dubai', ['dubai', 'dubaï', 'emirats', 'uae']),
+    ('Asia/Singapore', ['singapore', 'singapour']),
+    ('Europe/Paris', ['paris', 'lyon', 'marseille', 'toulouse', 'lille', 'nantes', 'bordeaux', 'france']),
+    ('America/New_York', ['usa', 'united states', 'états-unis', 'etats-unis']),
+    ('America/Toronto', ['canada']),
+]
+TIMEZONE_MATCHER = TermMatcher({index: terms for index, (_, terms) in enumerate(TIMEZONE_TERMS)})
+
+
+def recipient_timezone(location, default='Europe/Paris'):
+    """Fuseau IANA d'une localisation libre ('Lyon, France', 'Greater Montreal'...)"""
+    labels = TIMEZONE_MATCHER.labels(location or '')
+    return ZoneInfo(TIMEZONE_TERMS[labels[0]][0] if labels else default)
+
+
+class SendWindowScheduler:
+    """
+    Planification des envois dans les heures ouvrées locales du destinataire
+    - file de priorité (heapq) ordonnée par heure d'envoi: prochain message échu en O(log n)
+    - plafond journalier par compte expéditeur (journée du fuseau du compte)
+    - lissage: les envois d'un compte sont espacés sur la fenêtre au lieu d'une rafale suivie d'un étranglement
+    """
+
+    def __init__(self, window_start_hour=9, window_end_hour=18, weekdays_only=True, daily_cap=500,
+                 default_timezone='Europe/Paris', pace=True):
+        self.window_start_hour = window_start_hour
+        self.window_end_hour = window_end_hour
+        self.weekdays_only = weekdays_only
+        self.daily_cap = max(1, daily_cap)
+        self.default_timezone = default_timezone
+        self.account_timezone = ZoneInfo(default_timezone)
+        self.pace = pace
+        # Espacement minimal entre deux envois d'un compte (plafond réparti sur la fenêtre)
+        self.interval = (window_end_hour - window_start_hour) * 3600 / self.daily_cap if pace else 0
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._daily_counts = {}     # (compte, date locale du compte) → messages planifiés
+        self._next_slot = {}        # (compte, fuseau) → prochain instant libre (lissage)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            window_start_hour=int(os.getenv('SEND_WINDOW_START_HOUR', 9)),
+            window_end_hour=int(os.getenv('SEND_WINDOW_END_HOUR', 18)),
+            weekdays_only=os.getenv('SEND_WEEKDAYS_ONLY', 'true').lower() == 'true',
+            daily_cap=int(os.getenv('SEND_DAILY_CAP_PER_ACCOUNT', 500)),
+            default_timezone=os.getenv('SEND_DEFAULT_TIMEZONE', 'Europe/Paris'),
+            pace=os.getenv('SEND_PACING', 'true').lower() == 'true'
+        )
+
+    def __len__(self):
+        return len(self._heap)
+
+    def window_open(self, tz, at):
+        """Premier instant >= at dans la fenêtre ouvrée locale (UTC)"""
+        local = at.astimezone(tz)
+        for _ in range(8):
+            start = local.replace(hour=self.window_start_hour, minute=0, second=0, microsecond=0)
+            end = local.replace(hour=self.window_end_hour, minute=0, second=0, microsecond=0)
+            if not (self.weekdays_only and local.weekday() >= 5):
+                if local < start:
+                    return start.astimezone(timezone.utc)
+                if local < end:
+                    return local.astimezone(timezone.utc)
+            local = (start + timedelta(days=1)).replace(hour=0)
+        return at
+
+    def _account_day(self, at):
+        return at.astimezone(self.account_timezone).date()
+
+    def _next_account_day(self, at):
+        local = at.astimezone(self.account_timezone)
+        midnight = (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return midnight.astimezone(timezone.utc)
+
+    def send_time(self, location, account, not_before=None):
+        """Réserve un créneau: fenêtre du destinataire, plafond journalier et lissage du compte"""
+        tz = recipient_timezone(location, self.default_timezone)
+        at = not_before or datetime.now(timezone.utc)
+        with self._lock:
+            slot = (account, tz.key)
+            at = max(at, self._next_slot.get(slot, at))
+            for _ in range(366):
+                at = self.window_open(tz, at)
+                day = (account, self._account_day(at))
+                if self._daily_counts.get(day, 0) < self.daily_cap:
+                    self._daily_counts[day] = self._daily_counts.get(day, 0) + 1
+                    if self.interval:
+                        self._next_slot[slot] = at + timedelta(seconds=self.interval)
+                    return at
+                at = self._next_account_day(at)
+        raise ValueError(f"Aucun créneau d'envoi disponible pour {account}")
+
+    def schedule(self, message, location, account, not_before=None):
+        """Place un message dans la file; retourne l'heure d'envoi (UTC)"""
+        send_at = self.send_time(location, account, not_before)
+        with self._lock:
+            heapq.heappush(self._heap, (send_at, next(self._seq), message))
+        return send_at
+
+    def pop_due(self, now=None, limit=None):
+        """Messages échus, dans l'ordre de leur heure d'envoi"""
+        now = now or datetime.now(timezone.utc)
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+                due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def seconds_until_next(self, now=None):
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, (self._heap[0][0] - now).total_seconds())
+
+    def dispatch(self, send_batch, stop_event=None, batch_size=100, max_sleep=60):
+        """Boucle d'envoi: chaque lot échu est transmis à send_batch (ex. SMTPSender.send_many)"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            batch = self.pop_due(limit=batch_size)
+            if batch:
+                send_batch(batch)
+                continue
+            wait = self.seconds_until_next()
+            if wait is None:
+                return
+            stop_event.wait(min(wait, max_sleep))
+
+    def seed(self, account, day_counts, next_slots):
+        """
+        Remplace l'état d'un compte par les envois déjà planifiés (base de données):
+        day_counts {date locale du compte: nombre}, next_slots {fuseau: dernier envoi en attente (UTC)}
+        """
+        with self._lock:
+            self._daily_counts = {day: count for day, count in self._daily_counts.items() if day[0] != account}
+            for day, count in day_counts.items():
+                self._daily_counts[(account, day)] = count
+            self._next_slot = {slot: at for slot, at in self._next_slot.items() if slot[0] != account}
+            if self.interval:
+                for tz_key, latest in next_slots.items():
+                    self._next_slot[(account, tz_key)] = latest + timedelta(seconds=self.interval)
+
+    def get_stats(self):
+        with self._lock:
+            today = self._account_day(datetime.now(timezone.utc))
+            return {
+                'queued': len(self._heap),
+                'daily_cap': self.daily_cap,
+                'window': f"{self.window_start_hour:02d}:00-{self.window_end_hour:02d}:00",
+                'planned_today': {account: count for (account, day), count in self._daily_counts.items() if day == today}
+            }
+
+
+send_scheduler = SendWindowScheduler.from_env()
@@ -0,0 +1,320 @@
+import os
+import time
+import queue
+import socket
+import smtplib
+import logging
+import threading
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from email.utils import make_msgid, formatdate
+
+from services.rate_limiter import rate_limiter, LocalTokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Erreurs de transport: la connexion est jetée puis l'envoi retenté sur une nouvelle connexion
+TRANSPORT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout, OSError)
+# Refus du serveur (4xx/5xx): la session reste utilisable (smtplib a envoyé RSET)
+SERVER_REPLIES = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+
+
+class _PooledConnection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Pool de connexions SMTP persistantes
+    - ouverture à la demande jusqu'à `size` connexions, réutilisées entre envois
+    - vérification (NOOP) d'une connexion restée inactive, reconnexion automatique
+    - renouvellement après `max_messages_per_connection` messages (limite des fournisseurs)
+    """
+
+    def __init__(self, host, port=587, username=None, password=None, use_ssl=False, starttls=True,
+                 size=4, timeout=30, max_messages_per_connection=100, idle_check_seconds=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.starttls = starttls and not use_ssl
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_check_seconds = idle_check_seconds
+
+        self._idle = queue.LifoQueue()
+        self._open_count = 0
+        self._lock = threading.Lock()
+        self.stats = {'connections_opened': 0, 'connections_reused': 0, 'reconnects': 0}
+
+    def _open(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            smtp.ehlo()
+            if self.starttls and smtp.has_extn('starttls'):
+                smtp.starttls()
+                smtp.ehlo()
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        with self._lock:
+            self.stats['connections_opened'] += 1
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.smtp.quit()
+        except Exception:
+            try:
+                connection.smtp.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, connection):
+        if time.monotonic() - connection.last_used < self.idle_check_seconds:
+            return True
+        try:
+            return connection.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._open_count < self.size
+                    if can_open:
+                        self._open_count += 1
+                if can_open:
+                    try:
+                        return self._open()
+                    except Exception:
+                        with self._lock:
+                            self._open_count -= 1
+                        raise
+                connection = self._idle.get(timeout=self.timeout)
+
+            if connection.messages < self.max_messages_per_connection and self._is_alive(connection):
+                with self._lock:
+                    self.stats['connections_reused'] += 1
+                return connection
+            self._discard(connection)
+
+    def _discard(self, connection):
+        self._close(connection)
+        with self._lock:
+            self._open_count -= 1
+
+    @contextmanager
+    def connection(self):
+        """Emprunte une connexion; elle est jetée si le transport a échoué"""
+        connection = self._acquire()
+        try:
+            yield connection.smtp
+        except SERVER_REPLIES:
+            connection.last_used = time.monotonic()
+            self._idle.put(connection)
+            raise
+        except TRANSPORT_ERRORS:
+            self._discard(connection)
+            with self._lock:
+                self.stats['reconnects'] += 1
+            raise
+        except BaseException:
+            connection.last_used = time.monotonic()
+            self._idle.put(connection)
+            raise
+        else:
+            connection.messages += 1
+            connection.last_used = time.monotonic()
+            self._idle.put(connection)
+
+    def check(self):
+        """Ouvre (ou réutilise) une connexion pour valider la configuration"""
+        with self.connection() as smtp:
+            smtp.noop()
+
+    def close_all(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class SMTPSender:
+    """
+    Moteur d'envoi concurrent: workers parallèles sur un pool de connexions SMTP
+    - débit par compte expéditeur: seau à jetons partagé (un aller-retour base par email)
+    - débit par domaine destinataire: seaux en mémoire (limite par processus, au plus
+      `max_domain_buckets` domaines suivis: aucune ligne créée par domaine en base)
+    """
+
+    def __init__(self, pool, from_address, max_workers=None, domain_rate=2.0, domain_burst=5,
+                 account_rate=10.0, account_burst=20, max_attempts=3, limiter=None, max_domain_buckets=10000):
+        self.pool = pool
+        self.from_address = from_address
+        self.max_workers = max_workers or pool.size
+        self.max_attempts = max(1, max_attempts)
+        self.limiter = limiter or rate_limiter
+        self.domain_rate = domain_rate
+        self.domain_burst = max(domain_burst, 1)
+        self.max_domain_buckets = max_domain_buckets
+        self._domain_buckets = OrderedDict()    # domaine -> LocalTokenBucket (LRU)
+        self._domain_lock = threading.Lock()
+        if account_rate > 0:
+            self.limiter.configure('smtp_account', account_rate, account_burst)
+        self._stats_lock = threading.Lock()
+        self.stats = {'sent': 0, 'failed': 0, 'retries': 0}
+
+    @classmethod
+    def from_env(cls, username=None, password=None):
+        username = username or os.getenv('SMTP_USERNAME') or os.getenv('GMAIL_EMAIL')
+        password = password or os.getenv('SMTP_PASSWORD') or os.getenv('GMAIL_APP_PASSWORD')
+        pool = SMTPConnectionPool(
+            host=os.getenv('SMTP_HOST', 'smtp.gmail.com'),
+            port=int(os.getenv('SMTP_PORT', 587)),
+            username=username,
+            password=password,
+            use_ssl=os.getenv('SMTP_USE_SSL', 'false').lower() == 'true',
+            starttls=os.getenv('SMTP_STARTTLS', 'true').lower() == 'true',
+            size=int(os.getenv('SMTP_POOL_SIZE', 4)),
+            max_messages_per_connection=int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', 100))
+        )
+        return cls(
+            pool,
+            from_address=os.getenv('SMTP_FROM') or username,
+            domain_rate=float(os.getenv('SMTP_DOMAIN_RATE_PER_SECOND', 2)),
+            domain_burst=int(os.getenv('SMTP_DOMAIN_BURST', 5)),
+            account_rate=float(os.getenv('SMTP_ACCOUNT_RATE_PER_SECOND', 10)),
+            account_burst=int(os.getenv('SMTP_ACCOUNT_BURST', 20))
+        )
+
+    def build_message(self, to, subject, body, headers=None):
+        message = EmailMessage()
+        message['From'] = self.from_address
+        message['To'] = to
+        message['Subject'] = subject
+        message['Date'] = formatdate(localtime=True)
+        headers = dict(headers or {})
+        message['Message-ID'] = headers.pop('Message-ID', None) or make_msgid()
+        for name, value in headers.items():
+            message[name] = value
+        message.set_content(body)
+        return message
+
+    def _domain_bucket(self, domain):
+        with self._domain_lock:
+            bucket = self._domain_buckets.get(domain)
+            if bucket is None:
+                bucket = self._domain_buckets[domain] = LocalTokenBucket(self.domain_rate, self.domain_burst)
+                if len(self._domain_buckets) > self.max_domain_buckets:
+                    self._domain_buckets.popitem(last=False)
+            else:
+                self._domain_buckets.move_to_end(domain)
+            return bucket
+
+    def _throttle_domain(self, domain):
+        """Attend un jeton du seau local du domaine destinataire"""
+        if self.domain_rate <= 0:
+            return
+        bucket = self._domain_bucket(domain)
+        while True:
+            granted, remaining = bucket.take()
+            if granted:
+                return
+            time.sleep((1 - remaining) / self.domain_rate)
+
+    def send(self, to, subject, body, headers=None):
+        """Envoie un message; retourne {'status': 'sent'|'failed', 'error', 'retryable', 'attempts'}"""
+        domain = to.rsplit('@', 1)[-1].lower()
+        message = self.build_message(to, subject, body, headers)
+        self.limiter.acquire('smtp_account', self.from_address)
+        self._throttle_domain(domain)
+
+        last_error = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with self.pool.connection() as smtp:
+                    smtp.send_message(message)
+                self._count('sent')
+                return {'status': 'sent', 'attempts': attempt}
+            except smtplib.SMTPRecipientsRefused as e:
+                code, detail = next(iter(e.recipients.values()), (550, b''))
+                last_error, retryable = f"{code} {detail!r}", 400 <= code < 500
+                break
+            except smtplib.SMTPResponseException as e:
+                # 4xx: refus temporaire (réessayable plus tard), 5xx: définitif
+                last_error, retryable = f"{e.smtp_code} {e.smtp_error!r}", 400 <= e.smtp_code < 500
+                break
+            except TRANSPORT_ERRORS as e:
+                last_error, retryable = str(e) or e.__class__.__name__, True
+                self._count('retries')
+                logger.warning(f"🔌 Connexion SMTP perdue ({to}), nouvel essai {attempt}/{self.max_attempts}")
+            except Exception as e:
+                # Pool saturé (queue.Empty), extension refusée (SMTPNotSupportedError)...: réessayé plus tard
+                last_error, retryable = f"{e.__class__.__name__}: {e}", True
+                break
+
+        self._count('failed')
+        return {'status': 'failed', 'error': last_error, 'retryable': retryable, 'attempts': attempt}
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    @staticmethod
+    def _interleave_by_domain(messages):
+        """Alterne les domaines: les workers ne s'attendent pas tous sur le même seau"""
+        by_domain = {}
+        for index, message in enumerate(messages):
+            by_domain.setdefault(message['to'].rsplit('@', 1)[-1].lower(), deque()).append(index)
+        ordered, queues = [], list(by_domain.values())
+        while queues:
+            for q in queues:
+                ordered.append(q.popleft())
+            queues = [q for q in queues if q]
+        return ordered
+
+    def send_many(self, messages, on_result=None):
+        """
+        Envoi concurrent d'une liste de messages {'to', 'subject', 'body', 'headers'?}.
+        on_result(index, résultat) est appelé dès chaque envoi (suivi durable message par message).
+        Retourne les résultats dans l'ordre des messages.
+        """
+        results = [None] * len(messages)
+
+        def deliver(index):
+            message = messages[index]
+            try:
+                results[index] = self.send(message['to'], message['subject'], message['body'], message.get('headers'))
+            except Exception as e:
+                # Une erreur ne doit pas interrompre le lot: chaque message reçoit un résultat
+                logger.error(f"❌ Erreur envoi SMTP ({message.get('to')}): {e}")
+                self._count('failed')
+                results[index] = {'status': 'failed', 'error': f"{e.__class__.__name__}: {e}",
+                                  'retryable': True, 'attempts': 0}
+            if on_result:
+                on_result(index, results[index])
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="smtp-send") as executor:
+            list(executor.map(deliver, self._interleave_by_domain(messages)))
+        return results
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = {**self.stats, 'pool': dict(self.pool.stats), 'pool_size': self.pool.size}
+        with self._domain_lock:
+            stats['tracked_domains'] = len(self._domain_buckets)
+        return stats
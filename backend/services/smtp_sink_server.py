@@ -0,0 +1,168 @@
+# ✅ PUITS SMTP LOCAL (tests et benchmarks d'envoi, aucune dépendance externe)
+import random
+import asyncio
+import logging
+import argparse
+import threading
+
+logger = logging.getLogger(__name__)
+
+class SMTPSink:
+    """
+    Serveur SMTP asyncio minimal qui accepte et jette les messages
+    - latence injectable par message (DATA) et à la connexion
+    - injection d'échecs: refus temporaire 451, refus définitif 550, coupure de connexion
+    - statistiques: connexions, messages, octets, refus
+    """
+
+    def __init__(self, latency_ms=0, connect_latency_ms=0, temp_failure_rate=0.0, reject_rate=0.0,
+                 disconnect_rate=0.0, seed=None):
+        self.latency = latency_ms / 1000
+        self.connect_latency = connect_latency_ms / 1000
+        self.temp_failure_rate = temp_failure_rate
+        self.reject_rate = reject_rate
+        self.disconnect_rate = disconnect_rate
+        self._random = random.Random(seed)
+        self.stats = {'connections': 0, 'messages': 0, 'bytes': 0, 'temp_failures': 0,
+                      'rejected': 0, 'disconnects': 0, 'auth': 0}
+        self.server = None
+        self.loop = None
+        self._thread = None
+
+    async def _handle(self, reader, writer):
+        self.stats['connections'] += 1
+
+        async def reply(line):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        try:
+            if self.connect_latency:
+                await asyncio.sleep(self.connect_latency)
+            await reply("220 smtp-sink ESMTP")
+            recipients = []
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                command = raw.decode('utf-8', 'replace').strip()
+                verb = command[:4].upper()
+
+                if verb in ('EHLO', 'HELO'):
+                    await reply("250-smtp-sink\r\n250-8BITMIME\r\n250-AUTH PLAIN LOGIN\r\n250 SIZE 52428800")
+                elif verb == 'AUTH':
+                    parts = command.split()
+                    if len(parts) == 2 and parts[1].upper() == 'LOGIN':
+                        await reply("334 VXNlcm5hbWU6")
+                        await reader.readline()
+                        await reply("334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    elif len(parts) == 2:
+                        await reply("334 ")
+                        await reader.readline()
+                    self.stats['auth'] += 1
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb == 'MAIL':
+                    recipients = []
+                    await reply("250 2.1.0 OK")
+                elif verb == 'RCPT':
+                    if self._random.random() < self.reject_rate:
+                        self.stats['rejected'] += 1
+                        await reply("550 5.1.1 Mailbox unavailable")
+                    else:
+                        recipients.append(command)
+                        await reply("250 2.1.5 OK")
+                elif verb == 'DATA':
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    size = 0
+                    while True:
+                        line = await reader.readline()
+                        if not line or line == b".\r\n":
+                            break
+                        size += len(line)
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    roll = self._random.random()
+                    if roll < self.disconnect_rate:
+                        self.stats['disconnects'] += 1
+                        break
+                    if roll < self.disconnect_rate + self.temp_failure_rate:
+                        self.stats['temp_failures'] += 1
+                        await reply("451 4.3.0 Temporary failure, try again later")
+                    else:
+                        self.stats['messages'] += 1
+                        self.stats['bytes'] += size
+                        await reply("250 2.0.0 Queued")
+                    recipients = []
+                elif verb == 'RSET':
+                    recipients = []
+                    await reply("250 2.0.0 OK")
+                elif verb == 'NOOP':
+                    await reply("250 2.0.0 OK")
+                elif verb == 'QUIT':
+                    await reply("221 2.0.0 Bye")
+                    break
+                else:
+                    await reply("502 5.5.2 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def start(self, host='127.0.0.1', port=0):
+        """Démarre le puits dans un thread dédié; retourne le port effectif"""
+        started = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, host, port))
+            started.set()
+            self.loop.run_forever()
+            self.loop.close()
+
+        self._thread = threading.Thread(target=run, name="smtp-sink", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _shutdown(self):
+        self.server.close()
+        # Sessions encore ouvertes (connexions gardées par un pool client) fermées proprement
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.loop.stop()
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+            self._thread.join(timeout=5)
+
+
+def start_smtp_sink(host='127.0.0.1', port=0, **options):
+    """Lance un puits SMTP en arrière-plan; retourne (sink, port)"""
+    sink = SMTPSink(**options)
+    return sink, sink.start(host, port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Puits SMTP local (tests de charge)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--temp-failure-rate', type=float, default=0.0)
+    parser.add_argument('--reject-rate', type=float, default=0.0)
+    parser.add_argument('--disconnect-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sink = SMTPSink(args.latency_ms, temp_failure_rate=args.temp_failure_rate,
+                    reject_rate=args.reject_rate, disconnect_rate=args.disconnect_rate)
+    port = sink.start(args.host, args.port)
+    print(f"📮 Puits SMTP sur {args.host}:{port} (SMTP_HOST={args.host} SMTP_PORT={port} SMTP_STARTTLS=false)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        sink.stop()
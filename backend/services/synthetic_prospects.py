@@ -0,0 +1,324 @@
+# ✅ GÉNÉRATEUR SYNTHÉTIQUE DE PROSPECTS (tests de charge DB / déduplication / scoring)
+import io
+import sys
+import json
+import time
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np  # ✅ BSD - échantillonnage vectorisé
+except ImportError:  # pragma: no cover - dépendance optionnelle (outil de benchmark)
+    np = None
+
+from services.prospect_dedup import normalize_name_company, normalize_tokens
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = [
+    "Jean", "Marie", "Pierre", "Sophie", "Michel", "Nathalie", "David", "Catherine", "François", "Isabelle",
+    "Philippe", "Christine", "Nicolas", "Valérie", "Julien", "Céline", "Thomas", "Aurélie", "Antoine", "Camille",
+    "Maxime", "Émilie", "Alexandre", "Sandrine", "Guillaume", "Laure", "Mathieu", "Hélène", "Romain", "Claire",
+    "Sébastien", "Élodie", "Vincent", "Julie", "Olivier", "Anne", "Frédéric", "Sarah", "Laurent", "Manon",
+    "Hugo", "Léa", "Lucas", "Chloé", "Louis", "Inès", "Arthur", "Zoé", "Karim", "Yasmine",
+]
+
+# Noms de famille: base réaliste + combinaisons de syllabes (cardinalité suffisante à l'échelle du million)
+_LAST_BASE = [
+    "Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau",
+    "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "David", "Bertrand", "Roux", "Vincent", "Fournier",
+    "Morel", "Girard", "André", "Mercier", "Dupont", "Lambert", "Bonnet", "François", "Martinez", "Legrand",
+]
+_LAST_PREFIXES = ["Beau", "Ch", "Del", "Fon", "Gar", "Lam", "Mar", "Per", "Ros", "Val", "Bou", "Cor", "Mon", "Ser", "Ver"]
+_LAST_SUFFIXES = ["chard", "bert", "court", "daine", "mont", "nier", "rand", "tier", "vin", "zac", "lot", "ret", "card", "geot"]
+LAST_NAMES = _LAST_BASE + [p + s for p in _LAST_PREFIXES for s in _LAST_SUFFIXES]
+
+_LARGE_COMPANIES = [
+    "Capgemini", "BNP Paribas", "Total Energies", "Orange", "Renault", "Air France", "Sanofi", "LVMH", "Carrefour",
+    "Société Générale", "Airbus", "Danone", "Peugeot", "AXA", "EDF", "Atos", "Sopra Steria", "OVHcloud", "Criteo",
+    "Crédit Agricole", "Engie", "Schneider Electric", "Servier", "Ipsen", "Thales", "Dassault Systèmes",
+]
+_SME_PREFIXES = ["Atelier", "Groupe", "Cabinet", "Studio", "Labo", "Maison", "Agence", "Compagnie", "Réseau", "Institut"]
+_SME_SUFFIXES = ["Numérique", "Conseil", "Data", "Industrie", "Logistique", "Santé", "Finance", "Énergie", "Cloud", "Digital",
+                 "Mobilité", "Solutions", "Systèmes", "Services", "Technologies"]
+COMPANIES = _LARGE_COMPANIES + [f"{p} {s}" for p in _SME_PREFIXES for s in _SME_SUFFIXES]
+
+POSITIONS = [
+    "CTO", "CEO", "Directeur Technique", "Directeur Général", "Head of Engineering", "Lead Developer",
+    "Engineering Manager", "VP Technology", "VP Engineering", "Directeur Digital", "Architecte Solutions",
+    "Product Manager", "Head of Data", "Data Scientist", "Directeur Commercial", "Directeur Marketing",
+    "Founder", "Co-Fondateur", "Head of Growth", "DSI", "Responsable Innovation", "Chief Data Officer",
+]
+INDUSTRIES = [
+    "Technologie", "Finance", "Énergie", "Télécommunications", "Automobile", "Transport", "Pharmaceutique",
+    "Luxe", "Distribution", "Assurance", "Santé", "Industrie", "Conseil", "Éducation", "Immobilier",
+]
+LOCATIONS = [
+    "Paris", "Lyon", "Marseille", "Toulouse", "Nantes", "Bordeaux", "Lille", "Strasbourg", "Nice", "Rennes",
+    "Montpellier", "Grenoble", "Genève", "Bruxelles", "Montréal", "Londres", "Berlin", "Madrid", "Casablanca", "Tunis",
+]
+
+COPY_COLUMNS = ['id', 'personal_info', 'linkedin_info', 'enrichment_data', 'status', 'source', 'timestamp', 'icp_id',
+                'identity_url_key', 'identity_name_key']
+
+COPY_NULL = '\\N'
+ENRICHMENT_JSON = json.dumps({'email': None, 'sources': ['synthetic']})
+
+
+def _json_text(text):
+    """Chaîne JSON sans guillemets extérieurs, échappée pour COPY (format texte)"""
+    return json.dumps(text, ensure_ascii=False)[1:-1].replace('\\', '\\\\')
+
+def _objects(values):
+    return np.array(values, dtype=object)
+
+
+class SyntheticProspectGenerator:
+    """
+    Générateur déterministe (seed) de prospects réalistes, vectorisé par lots NumPy.
+    - duplicate_rate: part des lignes qui reprennent l'identité d'un prospect déjà généré; les autres lignes ont
+      des clés d'identité uniques (entreprise suffixée d'un code dérivé de la ligne quand nom × entreprise est déjà pris)
+    - missing_rate: probabilité qu'un champ optionnel soit absent
+    - lignes COPY formatées depuis les tableaux d'indices (fragments JSON précalculés par entrée de vocabulaire),
+      sans passer par un dictionnaire par prospect
+    """
+
+    def __init__(self, seed=42, duplicate_rate=0.05, missing_rate=0.02, batch_size=50000,
+                 base_time=datetime(2025, 1, 1), window_days=30, icp_id=None):
+        if np is None:
+            raise RuntimeError("NumPy requis pour le générateur synthétique (pip install numpy)")
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.duplicate_rate = duplicate_rate
+        self.missing_rate = missing_rate
+        self.batch_size = batch_size
+        self.base_time = base_time
+        self.window_seconds = window_days * 86400
+        self.icp_id = icp_id
+
+        # Fragments précalculés une fois par entrée de vocabulaire
+        self._first_text = _objects([_json_text(n) for n in FIRST_NAMES])
+        self._last_text = _objects([_json_text(n) for n in LAST_NAMES])
+        self._first_slug = _objects(['-'.join(normalize_tokens(n)) for n in FIRST_NAMES])
+        self._last_slug = _objects(['-'.join(normalize_tokens(n)) for n in LAST_NAMES])
+        self._first_token = _objects([' '.join(normalize_tokens(n)) for n in FIRST_NAMES])
+        self._last_token = _objects([' '.join(normalize_tokens(n)) for n in LAST_NAMES])
+        self._company_open = _objects(['"' + _json_text(c) for c in COMPANIES])   # guillemet fermant ajouté après le suffixe
+        company_keys = [normalize_name_company("a b", c).split('|')[1] for c in COMPANIES]
+        self._company_key = _objects(company_keys)
+        self._position_json = _objects([f'"{_json_text(v)}"' for v in POSITIONS])
+        self._industry_json = _objects([f'"{_json_text(v)}"' for v in INDUSTRIES])
+        self._location_json = _objects([f'"{_json_text(v)}"' for v in LOCATIONS])
+
+        # Identifiants canoniques (deux entrées qui se normalisent pareil partagent le même id)
+        self._first_id = np.unique(self._first_token, return_inverse=True)[1]
+        self._last_id = np.unique(self._last_token, return_inverse=True)[1]
+        self._company_id = np.unique(np.array(company_keys), return_inverse=True)[1]
+        self._combo_dims = (self._first_id.max() + 1, self._last_id.max() + 1, self._company_id.max() + 1)
+        self._taken = np.zeros(int(np.prod(self._combo_dims)), dtype=bool)  # nom × entreprise déjà attribué
+
+        self._pool = None  # Identités originales du lot précédent (doublons inter-lots)
+
+        # Ligne COPY complète: un seul formatage par prospect
+        icp = str(icp_id) if icp_id else COPY_NULL
+        self._line_format = (
+            f"syn_{seed}_%d"
+            '\t{"full_name": "%s %s", "position": %s, "company": %s, "location": %s, "industry": %s}'
+            '\t{"profile_url": %s, "connections": %d, "profile_score": %d, "real_data": false, '
+            '"data_source": "synthetic_generator", "activity_at": "%s"}'
+            f"\t{ENRICHMENT_JSON}\tnew\tsynthetic\t%s\t{icp}\t%s\t%s"
+        )
+
+    def _identity_combos(self, first, last, company):
+        _, n_last, n_company = self._combo_dims
+        return (self._first_id[first] * n_last + self._last_id[last]) * n_company + self._company_id[company]
+
+    def _sample_batch(self, start, n):
+        """Tirages vectorisés d'un lot: indices de vocabulaire, doublons et champs manquants"""
+        rng = self.rng
+        batch = {
+            'first': rng.integers(0, len(FIRST_NAMES), n),
+            'last': rng.integers(0, len(LAST_NAMES), n),
+            'company': rng.integers(0, len(COMPANIES), n),
+            'uid': np.arange(start, start + n),
+            'position': rng.integers(0, len(POSITIONS), n),
+            'industry': rng.integers(0, len(INDUSTRIES), n),
+            'location': rng.integers(0, len(LOCATIONS), n),
+            'connections': rng.integers(50, 3000, n),
+            'profile_score': rng.integers(40, 99, n),
+            'offset': rng.integers(0, self.window_seconds, n),
+        }
+
+        # Lignes originales: un nom × entreprise déjà attribué reçoit un suffixe dérivé de uid (clé unique)
+        pool_len = 0 if self._pool is None else len(self._pool['uid'])
+        duplicate = rng.random(n) < self.duplicate_rate
+        if pool_len == 0:
+            duplicate[0] = False
+        original = ~duplicate
+        combos = self._identity_combos(batch['first'][original], batch['last'][original], batch['company'][original])
+        first_seen = np.zeros(len(combos), dtype=bool)
+        first_seen[np.unique(combos, return_index=True)[1]] = True
+        plain = first_seen & ~self._taken[combos]
+        self._taken[combos[plain]] = True
+        batch['suffixed'] = np.zeros(n, dtype=bool)
+        batch['suffixed'][original] = ~plain
+
+        # Doublons: identité copiée depuis une ligne originale antérieure (lot précédent ou début du lot)
+        identity_fields = ('first', 'last', 'company', 'uid', 'suffixed')
+        available = pool_len + np.cumsum(original) - original
+        source = (rng.random(n) * available).astype(np.int64)
+        originals = {field: batch[field][original] for field in identity_fields}
+        for field in identity_fields:
+            combined = originals[field] if self._pool is None else np.concatenate([self._pool[field], originals[field]])
+            batch[field] = np.where(duplicate, combined[np.minimum(source, len(combined) - 1)], batch[field])
+        batch['duplicate'] = duplicate
+        self._pool = originals
+
+        for field in ('company', 'position', 'industry', 'location', 'profile_url'):
+            batch[f"missing_{field}"] = rng.random(n) < self.missing_rate
+        return batch
+
+    def _copy_lines(self, start, b):
+        """
+        Lignes COPY d'un lot formatées directement depuis les tableaux d'indices (fragments JSON du vocabulaire,
+        un seul formatage par ligne), avec les clés d'identité correspondantes
+        """
+        uids = b['uid'].tolist()
+        first, last, company = b['first'], b['last'], b['company']
+        suffixed, no_url, no_company = b['suffixed'].tolist(), b['missing_profile_url'].tolist(), b['missing_company'].tolist()
+
+        slugs = ['%s-%s-%x' % row for row in zip(self._first_slug[first].tolist(), self._last_slug[last].tolist(), uids)]
+        url_keys = [COPY_NULL if missing else 'linkedin.com/in/' + slug for missing, slug in zip(no_url, slugs)]
+        url_json = ['null' if missing else '"https://linkedin.com/in/%s"' % slug for missing, slug in zip(no_url, slugs)]
+        name_keys = [
+            COPY_NULL if missing else ('%s %s|%s %x' if suffix else '%s %s|%s') % (row if suffix else row[:3])
+            for missing, suffix, row in zip(no_company, suffixed, zip(
+                self._first_token[first].tolist(), self._last_token[last].tolist(), self._company_key[company].tolist(), uids))
+        ]
+        company_json = [
+            '"Entreprise inconnue"' if missing else ('%s %X"' % (name, uid) if suffix else name + '"')
+            for missing, suffix, name, uid in zip(no_company, suffixed, self._company_open[company].tolist(), uids)
+        ]
+        timestamps = (np.datetime64(self.base_time, 's') + b['offset'].astype('timedelta64[s]')).astype(str).tolist()
+
+        lines = [self._line_format % row for row in zip(
+            range(start, start + len(uids)),
+            self._first_text[first].tolist(), self._last_text[last].tolist(),
+            np.where(b['missing_position'], 'null', self._position_json[b['position']]).tolist(),
+            company_json,
+            np.where(b['missing_location'], 'null', self._location_json[b['location']]).tolist(),
+            np.where(b['missing_industry'], 'null', self._industry_json[b['industry']]).tolist(),
+            url_json, b['connections'].tolist(), b['profile_score'].tolist(), timestamps, timestamps,
+            url_keys, name_keys
+        )]
+        return {'lines': lines, 'url_keys': url_keys, 'name_keys': name_keys, 'duplicate': b['duplicate'].tolist()}
+
+    def _iter_lines(self, count):
+        start = 0
+        while start < count:
+            n = min(self.batch_size, count - start)
+            yield self._copy_lines(start, self._sample_batch(start, n))
+            start += n
+
+    def iter_copy_chunks(self, count):
+        """Blocs COPY (format texte, séparateur tabulation) prêts pour COPY ... FROM STDIN (un bloc par lot)"""
+        for batch in self._iter_lines(count):
+            yield '\n'.join(batch['lines']) + '\n'
+
+    def iter_batches(self, count):
+        """Lots de dictionnaires prospects (même format que les agents LinkedIn), relus depuis les lignes COPY"""
+        for batch in self._iter_lines(count):
+            prospects = []
+            for line, duplicate in zip(batch['lines'], batch['duplicate']):
+                prospect_id, personal_info, linkedin_info, _, _, _, timestamp, _, url_key, name_key = line.split('\t')
+                prospects.append({
+                    'id': prospect_id,
+                    'personal_info': json.loads(personal_info),
+                    'linkedin_info': json.loads(linkedin_info),
+                    'enrichment_data': {'email': None, 'sources': ['synthetic']},
+                    'status': 'new',
+                    'source': 'synthetic',
+                    'timestamp': timestamp,
+                    'icp_id': self.icp_id,
+                    'identity_keys': {
+                        'url': None if url_key == COPY_NULL else url_key,
+                        'name': None if name_key == COPY_NULL else name_key
+                    },
+                    'metadata': {'synthetic_duplicate': duplicate}
+                })
+            yield prospects
+
+    def iter_prospects(self, count):
+        for batch in self.iter_batches(count):
+            yield from batch
+
+    def measure_collisions(self, count):
+        """
+        Part mesurée des lignes dont une clé d'identité (URL ou nom|entreprise) reprend celle d'une ligne antérieure,
+        à comparer à duplicate_rate (écart attendu: doublons dont les deux clés sont absentes, ~missing_rate²)
+        """
+        seen, collisions, flagged = set(), 0, 0
+        for batch in self._iter_lines(count):
+            flagged += sum(batch['duplicate'])
+            for url_key, name_key in zip(batch['url_keys'], batch['name_keys']):
+                keys = [key for key in (f"url:{url_key}", f"name:{name_key}") if not key.endswith(COPY_NULL)]
+                if any(key in seen for key in keys):
+                    collisions += 1
+                seen.update(keys)
+        return {'rows': count, 'flagged_duplicates': flagged, 'collisions': collisions,
+                'collision_rate': collisions / count if count else 0.0, 'configured_rate': self.duplicate_rate}
+
+    def copy_to_postgres(self, conn, count):
+        """
+        Charge `count` prospects via COPY dans une table temporaire puis INSERT ... ON CONFLICT DO NOTHING
+        (les doublons volontaires sont écartés par les index d'identité). Retourne le nombre inséré.
+        """
+        inserted = 0
+        columns = ', '.join(COPY_COLUMNS)
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS prospects_staging (LIKE prospects INCLUDING DEFAULTS)")
+            for chunk in self.iter_copy_chunks(count):
+                cur.execute("TRUNCATE prospects_staging")
+                cur.copy_expert(f"COPY prospects_staging ({columns}) FROM STDIN", io.StringIO(chunk))
+                cur.execute(f"""
+                    INSERT INTO prospects ({columns})
+                    SELECT {columns} FROM prospects_staging
+                    ON CONFLICT DO NOTHING
+                """)
+                inserted += cur.rowcount
+        return inserted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Générateur synthétique de prospects (tests de charge)")
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--duplicate-rate', type=float, default=0.05)
+    parser.add_argument('--missing-rate', type=float, default=0.02)
+    parser.add_argument('--batch-size', type=int, default=50000)
+    parser.add_argument('--copy', action='store_true', help="Charge directement dans PostgreSQL via COPY")
+    parser.add_argument('--check', action='store_true', help="Mesure le taux réel de collisions d'identité")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    generator = SyntheticProspectGenerator(args.seed, args.duplicate_rate, args.missing_rate, args.batch_size)
+    started = time.perf_counter()
+
+    if args.check:
+        result = generator.measure_collisions(args.count)
+        print(f"✅ {result['collisions']}/{args.count} collisions d'identité ({result['collision_rate']:.2%}, "
+              f"configuré {args.duplicate_rate:.2%}, {result['flagged_duplicates']} doublons générés)", file=sys.stderr)
+    elif args.copy:
+        from database_fixed import db
+        if not db.conn:
+            sys.exit("❌ PostgreSQL indisponible")
+        inserted = generator.copy_to_postgres(db.conn, args.count)
+        elapsed = time.perf_counter() - started
+        print(f"✅ {inserted}/{args.count} prospects insérés en {elapsed:.1f}s ({args.count / elapsed:,.0f} lignes/s)",
+              file=sys.stderr)
+    else:
+        for chunk in generator.iter_copy_chunks(args.count):
+            sys.stdout.write(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"✅ {args.count} prospects générés en {elapsed:.1f}s", file=sys.stderr)
@@ -0,0 +1,67 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class WarmUp:
+    """
+    Préchauffage du processus en arrière-plan
+    - l'import et le démarrage du worker ne font aucune E/S: le serveur accepte les requêtes immédiatement
+    - connexions, index et clients préparés ensuite dans un thread, tâche par tâche, dans l'ordre d'enregistrement
+    - état par tâche (pending / running / ready / failed, durée, erreur) exposé par /api/health
+    - prêt quand toutes les tâches requises sont terminées (un échec n'empêche pas de servir: modes dégradés)
+    """
+
+    def __init__(self):
+        self._tasks = OrderedDict()     # nom → {'fn', 'required', 'status', 'seconds', 'error', 'done'}
+        self._thread = None
+        self._lock = threading.Lock()
+        self._started_at = None
+
+    def register(self, name, fn, required=True):
+        self._tasks[name] = {'fn': fn, 'required': required, 'status': 'pending', 'seconds': None,
+                             'error': None, 'done': threading.Event()}
+
+    def start(self):
+        """Lance le préchauffage (une fois par processus; à appeler après le fork des workers)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        for name, task in self._tasks.items():
+            task['status'] = 'running'
+            started = time.perf_counter()
+            try:
+                task['fn']()
+                task['status'] = 'ready'
+            except Exception as e:
+                task['status'] = 'failed'
+                task['error'] = str(e)
+                logger.warning(f"⚠️ Préchauffage {name} en échec: {e}")
+            finally:
+                task['seconds'] = round(time.perf_counter() - started, 3)
+                task['done'].set()
+        summary = ', '.join(f"{name}: {task['status']}" for name, task in self._tasks.items())
+        logger.info(f"🔥 Préchauffage terminé en {time.monotonic() - self._started_at:.2f}s ({summary})")
+
+    def wait(self, name, timeout=None):
+        """Attend la fin d'une tâche; False si le délai expire"""
+        return self._tasks[name]['done'].wait(timeout)
+
+    def is_ready(self):
+        return all(task['done'].is_set() for task in self._tasks.values() if task['required'])
+
+    def get_status(self):
+        return {
+            'started': self._thread is not None,
+            'ready': self.is_ready(),
+            'uptime_seconds': round(time.monotonic() - self._started_at, 1) if self._started_at else None,
+            'tasks': {name: {key: task[key] for key in ('status', 'required', 'seconds', 'error')}
+                      for name, task in self._tasks.items()}
+        }
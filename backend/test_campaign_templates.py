@@ -0,0 +1,92 @@
+# test_campaign_templates.py
+import os
+import sys
+
+# Ajouter le chemin actuel pour importer vos modules
+sys.path.append(os.path.dirname(__file__))
+
+from services.campaign_templates import TemplateRegistry, preview_intact, rendered_messages
+from services.email_outbox import EmailOutbox
+
+class FakeOutboxDatabase:
+    """Table email_outbox simulée: INSERT ... ON CONFLICT (idempotency_key) DO NOTHING"""
+
+    conn = None
+
+    def __init__(self):
+        self.rows = {}
+
+    def enqueue_outbox_messages(self, rows):
+        inserted = []
+        for row in rows:
+            if row['idempotency_key'] not in self.rows:
+                self.rows[row['idempotency_key']] = {'status': 'pending', 'attempts': 0, 'last_error': None, **row}
+                inserted.append(row['idempotency_key'])
+        return inserted
+
+    def get_outbox_messages(self, campaign_id):
+        return [row for row in self.rows.values() if row['campaign_id'] == campaign_id]
+
+def make_prospects():
+    return [
+        {'id': 'p1', 'personal_info': {'full_name': 'Jean Martin', 'company': 'Acme'},
+         'enrichment_data': {'email': 'jean@acme.fr'}},
+        {'id': 'p2', 'personal_info': {'full_name': 'Lucie Bernard', 'company': 'Globex'},
+         'enrichment_data': {'email': 'lucie@globex.fr'}},
+        {'id': 'p3', 'personal_info': {'full_name': 'Paul Durand', 'company': 'Initech'}, 'enrichment_data': {}}
+    ]
+
+def test_previews_rendered_once():
+    """Prévisualisations rendues en bloc, empreintes calculées, modifications du relecteur ré-empreintées"""
+    print("📝 TEST RENDU DES PRÉVISUALISATIONS")
+    print("=" * 50)
+
+    registry = TemplateRegistry()
+    previews = registry.render_campaign(make_prospects(), 'standard', modifications={'p2': {'subject': 'Bonjour Lucie'}})
+    assert [p['prospect_id'] for p in previews] == ['p1', 'p2']  # sans email: aucun aperçu
+    assert previews[0]['subject'] == 'Collaboration Acme' and previews[0]['body'].startswith('Bonjour Jean Martin')
+    assert previews[1]['subject'] == 'Bonjour Lucie' and previews[1]['user_modified']
+    assert all(preview_intact(p) for p in previews)
+    print("✅ Aperçus rendus et empreintes cohérentes")
+
+def test_tampered_previews_rejected():
+    """Contenu modifié après l'approbation: jamais envoyé, enregistré en dead-letter (content_hash_mismatch)"""
+    print("\n🔒 TEST REJET PAR EMPREINTE")
+    print("=" * 50)
+
+    previews = TemplateRegistry().render_campaign(make_prospects(), 'standard')
+    previews[1]['body'] += "\nPS: lien modifié"
+    messages, rejected = rendered_messages(previews)
+    assert [m['prospect_id'] for m in messages] == ['p1'] and [r['prospect_id'] for r in rejected] == ['p2']
+
+    db = FakeOutboxDatabase()
+    outbox = EmailOutbox(db)
+    queued = outbox.enqueue_campaign('c1', make_prospects(), previews=previews)
+    assert queued == {'queued': 1, 'duplicates': 0, 'rejected': 1}, queued
+
+    dead = db.rows[outbox.idempotency_key('c1', 'p2')]
+    assert dead['status'] == 'dead' and dead['last_error'] == 'content_hash_mismatch'
+    results = outbox.campaign_results('c1')
+    assert (results['sent'], results['failed'], results['pending']) == (0, 1, 1), results
+
+    # Nouvelle mise en file (reprise): rien n'est dupliqué ni recompté comme rejeté
+    again = outbox.enqueue_campaign('c1', make_prospects(), previews=previews)
+    assert again == {'queued': 0, 'duplicates': 2, 'rejected': 0}, again
+    print("✅ Aperçu altéré bloqué et compté en échec")
+
+def main():
+    """Fonction principale de test"""
+    tests = [test_previews_rendered_once, test_tampered_previews_rejected]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print(f"\n🎯 TOTAL: {len(tests) - failures}/{len(tests)} tests réussis")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
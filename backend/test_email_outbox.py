@@ -0,0 +1,191 @@
+# test_email_outbox.py
+import os
+import sys
+
+# Ajouter le chemin actuel pour importer vos modules
+sys.path.append(os.path.dirname(__file__))
+
+from services.email_outbox import EmailOutbox
+
+class FakeOutboxDatabase:
+    """
+    Table email_outbox simulée avec une horloge manuelle (secondes):
+    mêmes règles que les requêtes SQL (échéance, bail d'envoi, garde locked_by)
+    """
+
+    conn = object()
+
+    def __init__(self):
+        self.now = 0.0
+        self.rows = {}
+
+    def enqueue_outbox_messages(self, rows):
+        inserted = []
+        for row in rows:
+            key = row['idempotency_key']
+            if key not in self.rows:
+                self.rows[key] = {**row, 'id': len(self.rows) + 1, 'status': row.get('status', 'pending'),
+                                  'attempts': 0, 'next_attempt_at': self.now, 'locked_by': None,
+                                  'locked_until': None, 'last_error': row.get('last_error')}
+                inserted.append(key)
+        return inserted
+
+    def _by_id(self, message_id):
+        return next(row for row in self.rows.values() if row['id'] == message_id)
+
+    def claim_outbox_messages(self, worker_id, limit, lease_seconds, campaign_id=None):
+        due = [row for row in self.rows.values()
+               if (row['status'] == 'pending' and row['next_attempt_at'] <= self.now)
+               or (row['status'] == 'sending' and row['locked_until'] < self.now)]
+        claimed = []
+        for row in sorted(due, key=lambda r: (r['next_attempt_at'], r['id']))[:limit]:
+            row.update(status='sending', locked_by=worker_id, locked_until=self.now + lease_seconds,
+                       attempts=row['attempts'] + 1)
+            claimed.append(dict(row))
+        return claimed
+
+    def mark_outbox_sent(self, message_id, worker_id):
+        row = self._by_id(message_id)
+        if row['locked_by'] == worker_id:
+            row.update(status='sent', last_error=None, locked_by=None, locked_until=None)
+
+    def mark_outbox_failed(self, message_id, worker_id, error, retry_in_seconds=None):
+        row = self._by_id(message_id)
+        if row['locked_by'] == worker_id:
+            row.update(status='dead' if retry_in_seconds is None else 'pending',
+                       next_attempt_at=self.now + (retry_in_seconds or 0), last_error=error,
+                       locked_by=None, locked_until=None)
+
+class ScriptedSender:
+    """Expéditeur simulé: résultats successifs par destinataire (le dernier se répète)"""
+
+    from_address = 'sales@example.com'
+
+    def __init__(self, script):
+        self.script = script
+        self.sent_headers = []
+
+    def send_many(self, messages, on_result=None):
+        results = []
+        for index, message in enumerate(messages):
+            outcomes = self.script[message['to']]
+            result = outcomes.pop(0) if len(outcomes) > 1 else outcomes[0]
+            self.sent_headers.append((message['to'], message['headers']['Message-ID']))
+            results.append(result)
+            if on_result:
+                on_result(index, result)
+        return results
+
+TEMPORARY = {'status': 'failed', 'retryable': True, 'error': '451 4.7.1 Greylisted'}
+PERMANENT = {'status': 'failed', 'retryable': False, 'error': '550 5.1.1 Unknown user'}
+SENT = {'status': 'sent', 'attempts': 1}
+
+def make_messages(*recipients):
+    return [{'prospect_id': recipient.split('@')[0], 'to': recipient, 'subject': 'Bonjour', 'body': 'Message'}
+            for recipient in recipients]
+
+def make_outbox(db, sender, **options):
+    return EmailOutbox(db, sender=sender, worker_id='worker_a', base_backoff=60, max_backoff=3600, **options)
+
+def test_retry_backoff_then_dead_letter():
+    """Échec temporaire (4xx): nouvel essai avec backoff croissant, dead-letter au dernier essai"""
+    print("🔁 TEST NOUVEAUX ESSAIS ET DEAD-LETTER")
+    print("=" * 50)
+
+    db = FakeOutboxDatabase()
+    sender = ScriptedSender({'a@acme.fr': [TEMPORARY]})
+    outbox = make_outbox(db, sender, max_attempts=3)
+    outbox.enqueue('c1', make_messages('a@acme.fr'))
+    row = db.rows['c1:a']
+
+    delays = []
+    for attempt in (1, 2):
+        assert outbox.process_batch() == 1
+        assert row['status'] == 'pending' and row['attempts'] == attempt, row
+        delays.append(row['next_attempt_at'] - db.now)
+        assert outbox.process_batch() == 0          # pas encore échu
+        db.now = row['next_attempt_at']
+    assert 48 <= delays[0] <= 72 and 96 <= delays[1] <= 144, delays   # 60s puis 120s (±20%)
+
+    assert outbox.process_batch() == 1
+    assert row['status'] == 'dead' and row['attempts'] == 3 and row['last_error'].startswith('451'), row
+    assert outbox.stats == {'claimed': 3, 'sent': 0, 'retried': 2, 'dead': 1}, outbox.stats
+    # Même Message-ID à chaque essai: les serveurs destinataires dédupliquent un renvoi
+    assert len({message_id for _, message_id in sender.sent_headers}) == 1
+    print(f"✅ Backoff {delays[0]:.0f}s puis {delays[1]:.0f}s, puis dead-letter")
+
+def test_permanent_failure_and_recovery():
+    """Échec définitif (5xx): dead-letter immédiat; échec temporaire suivi d'un succès: envoyé"""
+    print("\n📮 TEST ÉCHEC DÉFINITIF ET REPRISE")
+    print("=" * 50)
+
+    db = FakeOutboxDatabase()
+    sender = ScriptedSender({'bad@acme.fr': [PERMANENT], 'slow@acme.fr': [TEMPORARY, SENT]})
+    outbox = make_outbox(db, sender, max_attempts=5)
+    outbox.enqueue('c1', make_messages('bad@acme.fr', 'slow@acme.fr'))
+
+    assert outbox.process_batch() == 2
+    assert db.rows['c1:bad']['status'] == 'dead' and db.rows['c1:bad']['attempts'] == 1
+    db.now += 3600
+    assert outbox.drain() == 1
+    assert db.rows['c1:slow']['status'] == 'sent' and db.rows['c1:slow']['last_error'] is None
+    assert outbox.stats == {'claimed': 3, 'sent': 1, 'retried': 1, 'dead': 1}, outbox.stats
+
+    # Backoff plafonné par max_backoff
+    assert all(outbox._backoff(20) <= 3600 * 1.2 for _ in range(50))
+    print("✅ Dead-letter immédiat pour 5xx, envoi après reprise pour 4xx")
+
+def test_expired_lease_is_reclaimed():
+    """Expéditeur arrêté en plein envoi: message repris après expiration du bail, résultat tardif ignoré"""
+    print("\n⏳ TEST EXPIRATION DU BAIL")
+    print("=" * 50)
+
+    db = FakeOutboxDatabase()
+    EmailOutbox(db).enqueue('c1', make_messages('a@acme.fr'))
+    claimed = db.claim_outbox_messages('crashed_worker', 10, 120)
+    assert len(claimed) == 1
+
+    outbox = make_outbox(db, ScriptedSender({'a@acme.fr': [SENT]}))
+    assert outbox.process_batch() == 0              # bail encore valide
+    db.now += 121
+    assert outbox.process_batch() == 1
+    row = db.rows['c1:a']
+    assert row['status'] == 'sent' and row['attempts'] == 2, row
+
+    # Le processus initial répond trop tard: son statut n'écrase rien (garde locked_by)
+    db.mark_outbox_failed(row['id'], 'crashed_worker', 'timeout', 60)
+    assert row['status'] == 'sent'
+    print("✅ Message repris par un autre expéditeur, envoyé une seule fois")
+
+def test_demo_mode_without_sender():
+    """Sans expéditeur SMTP (mode démo): envois simulés, marqués envoyés"""
+    print("\n🎭 TEST MODE DÉMO")
+    print("=" * 50)
+
+    db = FakeOutboxDatabase()
+    outbox = EmailOutbox(db, batch_size=2)
+    queued = outbox.enqueue('c1', make_messages('a@acme.fr', 'b@acme.fr', 'c@acme.fr'))
+    assert queued == {'queued': 3, 'duplicates': 0, 'rejected': 0}, queued
+    assert outbox.drain() == 3
+    assert all(row['status'] == 'sent' and row['attempts'] == 1 for row in db.rows.values())
+    assert outbox.stats['sent'] == 3 and outbox.stats['claimed'] == 3
+    assert db.rows['c1:a']['account'] == 'demo'
+    print("✅ Lots vidés en mode démo")
+
+def main():
+    """Fonction principale de test"""
+    tests = [test_retry_backoff_then_dead_letter, test_permanent_failure_and_recovery,
+             test_expired_lease_is_reclaimed, test_demo_mode_without_sender]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print(f"\n🎯 TOTAL: {len(tests) - failures}/{len(tests)} tests réussis")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,85 @@
+# test_icp_index.py
+import os
+import sys
+
+# Ajouter le chemin actuel pour importer vos modules
+sys.path.append(os.path.dirname(__file__))
+
+from services.icp_index import ICPIndex
+
+ICPS = [
+    {'id': 'tech_paris', 'keywords': ['CTO', 'VP Engineering'], 'locations': ['Paris'], 'exclusions': ['stagiaire'],
+     'limit': 10},
+    {'id': 'founders', 'keywords': ['founder'], 'limit': 5},
+    {'id': 'fintech', 'keywords': ['CTO'], 'industries': ['Finance'], 'limit': 20},
+]
+
+def make_prospect(prospect_id, position, location='', industry='', headline=''):
+    return {
+        'id': prospect_id,
+        'personal_info': {'full_name': 'Test Prospect', 'position': position, 'company': 'Acme',
+                          'location': location, 'industry': industry},
+        'linkedin_info': {'headline': headline}
+    }
+
+def test_match_requires_declared_criteria():
+    """Keyword obligatoire; localisation / industrie seulement si l'ICP les précise; exclusion = veto"""
+    print("🎯 TEST CORRESPONDANCE ICP")
+    print("=" * 50)
+
+    index = ICPIndex(ICPS)
+    assert set(index.match(make_prospect('a', 'Directeur Technique', 'Paris, France'))) == {'tech_paris'}
+    assert index.match(make_prospect('b', 'CTO', 'Lyon, France')) == {}
+    assert set(index.match(make_prospect('c', 'CTO', 'Lyon', 'Finance'))) == {'fintech'}
+    assert index.match(make_prospect('d', 'CTO stagiaire', 'Paris')) == {}
+    # Headline évaluée comme le titre
+    assert set(index.match(make_prospect('e', 'Président', headline='Co-fondateur et CEO'))) == {'founders'}
+    print("✅ Critères et exclusions appliqués par ICP")
+
+def test_route_assigns_primary_icp():
+    """Un prospect routé vers tous ses ICPs; ICP principal = meilleur score; sans ICP = écarté"""
+    print("\n🔀 TEST ROUTAGE MULTI-ICP")
+    print("=" * 50)
+
+    index = ICPIndex(ICPS)
+    prospects = [make_prospect('both', 'CTO', 'Paris', 'Finance'),
+                 make_prospect('founder', 'Founder', 'Nantes'),
+                 make_prospect('none', 'Comptable', 'Paris')]
+    routed, counts = index.route(prospects)
+
+    assert [p['id'] for p in routed] == ['both', 'founder']
+    assert counts == {'tech_paris': 1, 'fintech': 1, 'founders': 1}, counts
+    both = routed[0]
+    assert set(both['enrichment_data']['icp_matches']) == {'tech_paris', 'fintech'}
+    scores = both['enrichment_data']['icp_matches']
+    assert both['icp_id'] == max(scores, key=lambda icp_id: (scores[icp_id], icp_id))
+    assert routed[1]['icp_id'] == 'founders'
+    print(f"✅ Répartition: {counts}")
+
+def test_merged_config_covers_all_icps():
+    """Une seule découverte pour tous les ICPs: termes dédoublonnés, limite cumulée (plafonnée)"""
+    print("\n🧺 TEST CONFIGURATION FUSIONNÉE")
+    print("=" * 50)
+
+    merged = ICPIndex(ICPS).merged_config(limit_cap=30)
+    assert merged['keywords'] == ['CTO', 'VP Engineering', 'founder'], merged['keywords']
+    assert merged['locations'] == ['Paris'] and merged['industries'] == ['Finance']
+    assert merged['limit'] == 30 and ICPIndex(ICPS).merged_config()['limit'] == 35
+    print("✅ Configuration de découverte unique")
+
+def main():
+    """Fonction principale de test"""
+    tests = [test_match_requires_declared_criteria, test_route_assigns_primary_icp, test_merged_config_covers_all_icps]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print(f"\n🎯 TOTAL: {len(tests) - failures}/{len(tests)} tests réussis")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,112 @@
+# test_icp_matcher.py
+import os
+import sys
+
+# Ajouter le chemin actuel pour importer vos modules
+sys.path.append(os.path.dirname(__file__))
+
+from services.icp_matcher import AhoCorasick, CompiledICPMatcher, ICPMatcherRegistry, TermMatcher, normalize_text
+
+def make_icp(icp_id, **criteria):
+    return {'id': icp_id, 'name': icp_id, **criteria}
+
+def test_automaton_finds_overlapping_patterns():
+    """Tous les motifs en une passe, y compris imbriqués ou chevauchants"""
+    print("🔤 TEST AUTOMATE AHO-CORASICK")
+    print("=" * 50)
+
+    automaton = AhoCorasick()
+    for pattern in ('he', 'she', 'his', 'hers'):
+        automaton.add(pattern, pattern)
+    assert sorted(automaton.iter_matches('ushers')) == ['he', 'hers', 'she']
+    assert list(automaton.iter_matches('xyz')) == []
+
+    # Motif ajouté après une recherche: automate reconstruit automatiquement
+    automaton.add('us', 'us')
+    assert 'us' in automaton.iter_matches('ushers')
+    print("✅ Motifs chevauchants trouvés")
+
+def test_term_matcher_words_accents_prefixes():
+    """Mots entiers (uk ≠ Ukraine), accents et casse ignorés, 'tech*' pour les préfixes de mots"""
+    print("\n🔎 TEST TERMES (MOTS, ACCENTS, PRÉFIXES)")
+    print("=" * 50)
+
+    assert normalize_text('Directeur Général (Île-de-France)') == 'directeur general ile de france'
+
+    matcher = TermMatcher({'uk': ['uk'], 'dg': ['directeur général'], 'tech': ['tech*'], 'paris': ['Paris']})
+    assert matcher.labels('London, UK') == ['uk']
+    assert matcher.labels('Kyiv, Ukraine') == []
+    assert matcher.labels('DIRECTEUR GENERAL') == ['dg']
+    assert matcher.labels('Responsable Technologie') == ['tech']
+    assert matcher.labels('Biotech startup') == []          # préfixe de mot, pas sous-chaîne
+    assert matcher.labels('Parisian office') == []
+    # Ordre de déclaration conservé (priorité), quel que soit l'ordre dans le texte
+    assert matcher.labels('Technique, Paris, UK') == ['uk', 'tech', 'paris']
+    print("✅ Bornes de mots, accents et préfixes respectés")
+
+def test_compiled_icp_criteria():
+    """Synonymes sur les keywords, exclusions sans synonymes, résultats par ICP"""
+    print("\n🧩 TEST CRITÈRES ICP COMPILÉS")
+    print("=" * 50)
+
+    matcher = CompiledICPMatcher([
+        make_icp('tech', keywords=['CTO'], locations=['Paris'], exclusions=['stagiaire']),
+        make_icp('finance', keywords=['CFO'], synonyms={'CFO': ['responsable financier']}),
+        make_icp('consult', keywords=['CTO'], exclusions=['freelance'])
+    ])
+    hits = matcher.scan('keywords', 'Directrice Technique')
+    assert hits == {'tech': {'CTO'}, 'consult': {'CTO'}}, hits
+    assert matcher.scan('keywords', 'Responsable Financier') == {'finance': {'CFO'}}
+    assert matcher.scan('locations', 'Paris, Île-de-France') == {'tech': {'Paris'}}
+
+    # Exclusion: terme exact de l'ICP qui la déclare, jamais étendu aux synonymes
+    assert matcher.scan('exclusions', 'CTO stagiaire') == {'tech': {'stagiaire'}}
+    assert matcher.scan('exclusions', 'CTO indépendant') == {}
+
+    hits = matcher.scan('keywords', 'CTO', {})
+    matcher.scan('keywords', 'CFO', hits)
+    assert set(hits) == {'tech', 'consult', 'finance'}
+    print("✅ Synonymes, exclusions et cumul des résultats corrects")
+
+def test_registry_recompiles_on_change_only():
+    """Même ensemble d'ICPs: matcher réutilisé; ICP modifié ou invalidé: recompilé"""
+    print("\n🗂️ TEST CACHE DES MATCHERS")
+    print("=" * 50)
+
+    registry = ICPMatcherRegistry(max_entries=2)
+    icps = [make_icp('a', keywords=['ceo'], updated_at='2026-10-01T10:00:00'),
+            make_icp('b', keywords=['cto'], updated_at='2026-10-01T10:00:00')]
+    first = registry.for_icps(icps)
+    assert registry.for_icps(list(reversed(icps))) is first
+
+    icps[1] = {**icps[1], 'keywords': ['cfo'], 'updated_at': '2026-10-02T09:00:00'}
+    second = registry.for_icps(icps)
+    assert second is not first and second.scan('keywords', 'CFO') == {'b': {'cfo'}}
+
+    # Sans updated_at: version = empreinte du contenu
+    draft = make_icp('c', keywords=['founder'])
+    assert registry.for_icp(draft) is registry.for_icp(dict(draft))
+    assert registry.for_icp({**draft, 'keywords': ['ceo']}) is not registry.for_icp(draft)
+
+    registry.invalidate('b')
+    assert registry.for_icps(icps) is not second
+    assert registry.stats['compiled'] >= 5 and len(registry._cache) <= 2, registry.stats
+    print(f"✅ Statistiques: {registry.stats}")
+
+def main():
+    """Fonction principale de test"""
+    tests = [test_automaton_finds_overlapping_patterns, test_term_matcher_words_accents_prefixes,
+             test_compiled_icp_criteria, test_registry_recompiles_on_change_only]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print(f"\n🎯 TOTAL: {len(tests) - failures}/{len(tests)} tests réussis")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
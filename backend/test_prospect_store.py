@@ -0,0 +1,91 @@
+# test_prospect_store.py
+import os
+import sys
+
+# Ajouter le chemin actuel pour importer vos modules
+sys.path.append(os.path.dirname(__file__))
+
+from services.prospect_store import ProspectStore
+
+def make_prospect(prospect_id, status=None):
+    prospect = {'id': prospect_id, 'personal_info': {'full_name': f"Contact {prospect_id}"}}
+    if status:
+        prospect['status'] = status
+    return prospect
+
+def test_lru_eviction():
+    """Capacité fixe: le moins récemment utilisé est évincé, une lecture rafraîchit un prospect"""
+    print("🧹 TEST ÉVICTION LRU")
+    print("=" * 50)
+
+    store = ProspectStore(capacity=3)
+    store.extend([make_prospect(i) for i in ('a', 'b', 'c')])
+    assert store.get('a') is not None          # 'a' redevient récent: 'b' est le plus ancien
+    store.add(make_prospect('d'))
+    assert [p['id'] for p in store.list()] == ['c', 'a', 'd'], store.list()
+    assert store.get('b') is None and len(store) == 3
+
+    store.extend([make_prospect(i) for i in ('e', 'f', 'g', 'h')])
+    assert [p['id'] for p in store] == ['f', 'g', 'h']
+    stats = store.get_stats()
+    assert stats['evicted'] == 5 and stats['size'] == 3, stats
+    assert store.count('new') == 3 and stats['by_status'] == {'new': 3}
+    print(f"✅ Statistiques: {stats}")
+
+def test_status_index_follows_writes():
+    """Index par statut tenu à jour par l'ajout, le remplacement, les transitions et l'éviction"""
+    print("\n🗂️ TEST INDEX PAR STATUT")
+    print("=" * 50)
+
+    store = ProspectStore(capacity=10)
+    store.extend([make_prospect('a'), make_prospect('b'), make_prospect('c', 'approved')])
+    assert store.count('new') == 2 and store.count('approved') == 1
+
+    # Remplacement (même id): l'ancien statut est retiré de l'index
+    store.add(make_prospect('a', 'rejected'))
+    assert store.count('new') == 1 and [p['id'] for p in store.list('rejected')] == ['a']
+    assert store.get_stats()['updated'] == 1
+
+    # Garde optimiste: seuls les prospects dans un statut attendu changent
+    updated = store.transition(['a', 'b', 'c', 'unknown'], 'approved', expected_statuses=('new', 'rejected'))
+    assert updated == ['a', 'b'], updated
+    assert store.count('approved') == 3 and store.count('new') == 0 and store.count('rejected') == 0
+    assert 'approved_at' in store.get('a')['enrichment_data']
+    assert store.transition(['a'], 'contacted', expected_statuses=('new',)) == []
+    assert store.get_stats()['by_status'] == {'approved': 3}
+    print("✅ Comptages par statut cohérents")
+
+def test_listener_events():
+    """Événements du dashboard: nouveaux prospects seulement, transitions effectives seulement"""
+    print("\n📡 TEST ÉVÉNEMENTS")
+    print("=" * 50)
+
+    events = []
+    store = ProspectStore(capacity=10)
+    store.listener = lambda event_type, data: events.append((event_type, data))
+    store.extend([make_prospect('a'), make_prospect('b')])
+    store.add(make_prospect('a', 'approved'))            # mise à jour: pas d'événement 'prospects'
+    store.transition(['b'], 'rejected')
+    store.transition(['missing'], 'rejected')            # rien de modifié: pas d'événement
+
+    assert [event_type for event_type, _ in events] == ['prospects', 'prospect_status'], events
+    assert [p['id'] for p in events[0][1]] == ['a', 'b']
+    assert events[1][1] == {'status': 'rejected', 'ids': ['b'], 'count': 1}
+    print("✅ Événements émis après chaque écriture effective")
+
+def main():
+    """Fonction principale de test"""
+    tests = [test_lru_eviction, test_status_index_follows_writes, test_listener_events]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print(f"\n🎯 TOTAL: {len(tests) - failures}/{len(tests)} tests réussis")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,83 @@
+# test_rate_limiter.py
+import os
+import sys
+
+# Ajouter le chemin actuel pour importer vos modules
+sys.path.append(os.path.dirname(__file__))
+
+from services.rate_limiter import LocalTokenBucket, TokenBucketLimiter
+
+def rewind(bucket, seconds):
+    """Simule l'écoulement du temps sans attendre"""
+    bucket.updated_at -= seconds
+
+def test_bucket_burst_then_refill():
+    """Rafale jusqu'à la capacité, refus, puis recharge au débit configuré (plafonnée à la capacité)"""
+    print("🪣 TEST SEAU À JETONS")
+    print("=" * 50)
+
+    bucket = LocalTokenBucket(rate=2.0, capacity=3)
+    assert all(bucket.take()[0] for _ in range(3))
+    granted, remaining = bucket.take()
+    assert not granted and remaining < 1, remaining
+
+    rewind(bucket, 0.5)  # 0.5 s à 2 jetons/s → 1 jeton
+    assert bucket.take()[0]
+    assert not bucket.take()[0]
+
+    rewind(bucket, 3600)
+    granted, remaining = bucket.take()
+    assert granted and abs(remaining - 2) < 0.01, remaining
+    print("✅ Rafale de 3, refus, recharge à 2 jetons/s plafonnée")
+
+def test_limiter_delay_and_unconfigured_sources():
+    """try_acquire: 0 si accordé, sinon délai avant le prochain jeton; source non configurée jamais limitée"""
+    print("\n⏱️ TEST LIMITEUR (REPLI MÉMOIRE)")
+    print("=" * 50)
+
+    limiter = TokenBucketLimiter(None)
+    limiter.configure('linkedin', rate=0.5, burst=2)
+    assert limiter.try_acquire('linkedin', 'a') == 0 and limiter.try_acquire('linkedin', 'a') == 0
+    delay = limiter.try_acquire('linkedin', 'a')
+    print(f"✅ Délai annoncé après la rafale: {delay:.2f}s")
+    assert 1.9 < delay <= 2.0, delay
+
+    # Un seau par compte; les sources non configurées passent toujours
+    assert limiter.try_acquire('linkedin', 'b') == 0
+    assert all(limiter.try_acquire('unknown') == 0 for _ in range(100))
+    assert limiter.get_stats()['backend'] == 'memory'
+
+def test_penalize_blocks_source():
+    """penalize (ex: HTTP 429): plus aucun jeton pendant la durée demandée, rafale comprise"""
+    print("\n🚫 TEST PÉNALITÉ")
+    print("=" * 50)
+
+    limiter = TokenBucketLimiter(None)
+    limiter.configure('hunter', rate=1.0, burst=5)
+    limiter.penalize('hunter', seconds=30)
+    delay = limiter.try_acquire('hunter')
+    assert 30 < delay <= 31, delay
+
+    bucket = limiter._local[limiter.bucket_key('hunter', None)]
+    rewind(bucket, 31)
+    assert limiter.try_acquire('hunter') == 0
+    assert limiter.acquire('hunter', timeout=0.1) is False
+    print("✅ Source bloquée 30s puis débloquée")
+
+def main():
+    """Fonction principale de test"""
+    tests = [test_bucket_burst_then_refill, test_limiter_delay_and_unconfigured_sources,
+             test_penalize_blocks_source]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print(f"\n🎯 TOTAL: {len(tests) - failures}/{len(tests)} tests réussis")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
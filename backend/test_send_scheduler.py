@@ -0,0 +1,111 @@
+# test_send_scheduler.py
+import os
+import sys
+from datetime import datetime, date, timezone
+
+# Ajouter le chemin actuel pour importer vos modules
+sys.path.append(os.path.dirname(__file__))
+
+from services.send_scheduler import SendWindowScheduler, recipient_timezone
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+def test_recipient_timezone():
+    """Fuseau déduit de la localisation libre; villes prioritaires sur les pays"""
+    print("🌍 TEST FUSEAU DU DESTINATAIRE")
+    print("=" * 50)
+
+    assert recipient_timezone('Lyon, France').key == 'Europe/Paris'
+    assert recipient_timezone('Greater Montréal Metropolitan Area').key == 'America/Toronto'
+    assert recipient_timezone('Boston, United States').key == 'America/New_York'
+    assert recipient_timezone('Seattle, United States').key == 'America/Los_Angeles'
+    assert recipient_timezone('', default='Africa/Casablanca').key == 'Africa/Casablanca'
+    print("✅ Fuseaux corrects")
+
+def test_weekend_and_dst_rollover():
+    """Demande hors fenêtre le vendredi soir → lundi 9h locale, heure UTC suivant le changement d'heure"""
+    print("\n📅 TEST WEEK-END ET CHANGEMENT D'HEURE")
+    print("=" * 50)
+
+    scheduler = SendWindowScheduler(pace=False)
+    # Paris: 9h CEST = 7h UTC avant le 25/10/2026, 9h CET = 8h UTC après
+    assert scheduler.send_time('Paris', 'a', utc(2026, 10, 23, 5, 0)) == utc(2026, 10, 23, 7, 0)
+    assert scheduler.send_time('Paris', 'a', utc(2026, 10, 23, 17, 0)) == utc(2026, 10, 26, 8, 0)
+    assert scheduler.send_time('Paris', 'a', utc(2026, 10, 24, 12, 0)) == utc(2026, 10, 26, 8, 0)
+    # New York: fin de l'heure d'été le 01/11/2026 (9h EDT = 13h UTC, 9h EST = 14h UTC)
+    assert scheduler.send_time('New York', 'a', utc(2026, 10, 30, 12, 0)) == utc(2026, 10, 30, 13, 0)
+    assert scheduler.send_time('New York', 'a', utc(2026, 10, 30, 23, 0)) == utc(2026, 11, 2, 14, 0)
+    # Dans la fenêtre: envoi immédiat
+    assert scheduler.send_time('Paris', 'a', utc(2026, 10, 26, 10, 30)) == utc(2026, 10, 26, 10, 30)
+
+    weekend = SendWindowScheduler(pace=False, weekdays_only=False)
+    assert weekend.send_time('Paris', 'a', utc(2026, 10, 24, 5, 0)) == utc(2026, 10, 24, 7, 0)
+    print("✅ Lundi 9h locale, décalage UTC correct de part et d'autre du changement d'heure")
+
+def test_daily_cap_and_pacing():
+    """Plafond journalier par compte puis jour suivant; envois espacés sur la fenêtre"""
+    print("\n🚦 TEST PLAFOND ET LISSAGE")
+    print("=" * 50)
+
+    capped = SendWindowScheduler(daily_cap=2, pace=False)
+    start = utc(2026, 10, 26, 9, 0)  # lundi 10h Paris
+    times = [capped.send_time('Paris', 'acct', start) for _ in range(3)]
+    assert times == [start, start, utc(2026, 10, 27, 8, 0)], times
+    assert capped.send_time('Paris', 'other', start) == start  # plafond par compte
+
+    paced = SendWindowScheduler(daily_cap=9)  # fenêtre de 9h → un envoi par heure
+    times = [paced.send_time('Paris', 'acct', start) for _ in range(3)]
+    assert times == [start, utc(2026, 10, 26, 10, 0), utc(2026, 10, 26, 11, 0)], times
+    # Le lissage est propre à chaque fuseau destinataire
+    assert paced.send_time('London', 'acct', start) == start
+    print("✅ Plafond respecté et envois espacés d'une heure")
+
+def test_seed_from_database():
+    """seed reprend les envois déjà planifiés (autres workers): plafond et prochain créneau"""
+    print("\n🌱 TEST REPRISE DE L'ÉTAT PLANIFIÉ")
+    print("=" * 50)
+
+    start = utc(2026, 10, 26, 9, 0)
+    scheduler = SendWindowScheduler(daily_cap=9)
+    scheduler.send_time('Paris', 'acct', start)
+    scheduler.seed('acct', {date(2026, 10, 26): 9}, {})
+    assert scheduler.send_time('Paris', 'acct', start) == utc(2026, 10, 27, 8, 0)
+
+    scheduler.seed('acct', {date(2026, 10, 26): 3}, {'Europe/Paris': utc(2026, 10, 26, 12, 0)})
+    assert scheduler.send_time('Paris', 'acct', start) == utc(2026, 10, 26, 13, 0)
+    assert scheduler.send_time('Berlin', 'acct', start) == start
+    print("✅ Compteurs et créneaux remplacés par l'état de la base")
+
+def test_pop_due_in_send_order():
+    """La file rend les messages échus dans l'ordre de leur heure d'envoi"""
+    print("\n📬 TEST FILE D'ENVOI")
+    print("=" * 50)
+
+    scheduler = SendWindowScheduler(pace=False)
+    scheduler.schedule('ny', 'New York', 'a', utc(2026, 10, 26, 9, 0))
+    scheduler.schedule('paris', 'Paris', 'a', utc(2026, 10, 26, 9, 0))
+    assert scheduler.pop_due(now=utc(2026, 10, 26, 12, 0)) == ['paris']
+    # New York encore à l'heure d'été le 26/10: 9h EDT = 13h UTC
+    assert scheduler.seconds_until_next(now=utc(2026, 10, 26, 12, 0)) == 3600
+    assert scheduler.pop_due(now=utc(2026, 10, 26, 13, 0)) == ['ny']
+    assert len(scheduler) == 0
+    print("✅ Ordre d'envoi respecté")
+
+def main():
+    """Fonction principale de test"""
+    tests = [test_recipient_timezone, test_weekend_and_dst_rollover, test_daily_cap_and_pacing,
+             test_seed_from_database, test_pop_due_in_send_order]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e}")
+
+    print(f"\n🎯 TOTAL: {len(tests) - failures}/{len(tests)} tests réussis")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
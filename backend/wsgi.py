@@ -0,0 +1,7 @@
+# ✅ POINT D'ENTRÉE PRODUCTION (WSGI)
+# gunicorn -c gunicorn.conf.py wsgi:app   (depuis backend/)
+from main import app, ensure_monitoring_worker, shutdown_workers
+
+application = app
+
+__all__ = ['app', 'application', 'ensure_monitoring_worker', 'shutdown_workers']